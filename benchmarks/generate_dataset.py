@@ -0,0 +1,79 @@
+"""生成用于性能测试的合成数据集
+
+    python benchmarks/generate_dataset.py -r 100000 -c 20 -u 50 -o data.csv
+"""
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+
+# 文本列的取值来源，包含中文、"Not performed"和空值
+TEXT_VALUES = ['阳性', '阴性', '弱阳性', '未检测', 'Not performed', '正常', '异常', '待复查']
+INVALID_RATE = 0.1  # "Not performed"的比例
+MISSING_RATE = 0.1  # 空值的比例
+
+
+def make_dataset(rows, cols, cardinality, seed=0):
+    """生成数据框：文本列、整数列和小数列轮流出现
+
+    cardinality 为每个文本列的唯一值数量（不含空值和"Not performed"）。
+    """
+    rng = np.random.default_rng(seed)
+    data = {}
+    for col in range(cols):
+        kind = col % 3
+        if kind == 0:
+            # 中文文本，超过预设取值的部分加上编号
+            pool = np.array([
+                TEXT_VALUES[i % len(TEXT_VALUES)] + (str(i // len(TEXT_VALUES)) if i >= len(TEXT_VALUES) else '')
+                for i in range(cardinality)
+            ], dtype=object)
+            values = pool[rng.integers(0, cardinality, rows)]
+            values[rng.random(rows) < INVALID_RATE] = 'Not performed'
+        elif kind == 1:
+            values = rng.integers(0, cardinality, rows).astype(float)
+        else:
+            values = np.round(rng.normal(100, 15, rows), 2)
+        values = pd.Series(values)
+        values[rng.random(rows) < MISSING_RATE] = None
+        data[f'字段{col + 1}'] = values
+    return pd.DataFrame(data)
+
+
+def write_dataset(data, file_name):
+    """按扩展名写出CSV或XLSX文件"""
+    if file_name.endswith('.xlsx'):
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(list(data.columns))
+        for row in data.astype(object).where(data.notna(), None).itertuples(index=False):
+            sheet.append(list(row))
+        workbook.save(file_name)
+    else:
+        data.to_csv(file_name, index=False, encoding='utf-8')
+
+
+def generate(file_name, rows, cols, cardinality, seed=0):
+    """生成数据集文件并返回文件大小（字节）"""
+    write_dataset(make_dataset(rows, cols, cardinality, seed), file_name)
+    return os.path.getsize(file_name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成用于性能测试的合成数据集')
+    parser.add_argument('-r', '--rows', type=int, default=100000, help='行数')
+    parser.add_argument('-c', '--cols', type=int, default=20, help='列数')
+    parser.add_argument('-u', '--cardinality', type=int, default=50, help='每列的唯一值数量')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='随机数种子')
+    parser.add_argument('-o', '--output', required=True, help='输出文件（.csv 或 .xlsx）')
+    args = parser.parse_args(argv)
+
+    size = generate(args.output, args.rows, args.cols, args.cardinality, args.seed)
+    print(f'已生成 {args.output}（{args.rows} 行, {args.cols} 列, {size / 1024 ** 2:.1f} MB）')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+"""核心操作的性能测试
+
+不需要图形界面，直接调用界面背后的同一套函数：加载、应用配置（值替换）、
+取值计数、行排序、预览取数、以各种格式导出（记录每秒写出的行数）、
+配置的保存和读取，以及在新的Python进程中导入界面模块的冷启动时间。每个操作
+重复运行取最短时间，再单独运行一次记录峰值内存，结果保存为JSON，并与
+保存的基准结果比较，变慢或内存增加超过阈值的操作会被标记出来。
+
+    python benchmarks/run_benchmarks.py -r 50000 -c 20
+    python benchmarks/run_benchmarks.py --save-baseline
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from generate_dataset import generate
+from dataset_io import iter_dataset_chunks, combine_chunks
+from transform_plan import TransformPlan
+from export_writers import EXPORT_FORMATS
+from config_store import ConfigStore
+
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+PREVIEW_ROWS = 50  # 预览窗口一屏显示的行数
+
+
+def make_config(data, fields):
+    """为选中的字段生成配置：重命名，并把文本列一半的唯一值替换为新值"""
+    field_states = {
+        field: {'display_name': f'{field}_新', 'is_checked': field in fields, 'order': i}
+        for i, field in enumerate(data.columns)
+    }
+    value_mapping = {}
+    for field in fields:
+        if not pd.api.types.is_numeric_dtype(data[field]):
+            uniques = data[field].dropna().unique()
+            value_mapping[field] = {str(value): f'{value}_改' for value in uniques[::2]}
+    return {
+        'name': '性能测试',
+        'description': '',
+        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'field_states': field_states,
+        'value_mapping': value_mapping,
+    }
+
+
+def configured_plan(ctx):
+    plan = TransformPlan(ctx['data'])
+    plan.apply_config(ctx['config'], plan.field_order)
+    return plan
+
+
+# ---- 各项操作：setup(ctx) 准备不计时的输入，run(ctx, prepared) 为计时部分 ----
+
+def setup_nothing(ctx):
+    return None
+
+
+def run_load(ctx, _):
+    chunks = [chunk for chunk, _, _ in iter_dataset_chunks(ctx['file_name'])]
+    ctx['data'] = combine_chunks(chunks)
+
+
+def run_build_index(ctx, plan):
+    for field in plan.base.columns:
+        plan.index.build(field)
+
+
+def run_apply_config(ctx, _):
+    plan = configured_plan(ctx)
+    # 值替换只在用到列时计算，这里计算所有选中的列
+    plan.columns(ctx['fields'])
+
+
+def run_value_counts(ctx, plan):
+    for field in ctx['fields']:
+        plan.value_counts(field)
+
+
+def run_sort(ctx, plan):
+    plan.sort_by_valid_count(ctx['fields'], ascending=False)
+
+
+def setup_sorted_plan(ctx):
+    plan = configured_plan(ctx)
+    plan.sort_by_valid_count(ctx['fields'], ascending=False)
+    plan.columns(ctx['fields'])
+    return plan
+
+
+def run_preview(ctx, plan):
+    # 与预览表格模型相同的取数方式：按行顺序逐个读取可见单元格
+    arrays = [column.array for column in plan.columns(ctx['fields'])]
+    row_order = plan.row_order
+    total = len(plan)
+    for start in (0, max(0, total // 2 - PREVIEW_ROWS // 2), max(0, total - PREVIEW_ROWS)):
+        for row in range(start, min(start + PREVIEW_ROWS, total)):
+            position = row_order[row] if row_order is not None else row
+            for array in arrays:
+                str(array[position])
+
+
+def export_benchmark(format_name):
+    """以指定格式导出选中字段的测试"""
+    def run_export(ctx, plan):
+        fields = ctx['fields']
+        _, extension, writer = EXPORT_FORMATS[format_name]
+        writer(plan.columns(fields), [plan.display_name(field) for field in fields],
+               os.path.join(ctx['work_dir'], 'export' + extension), row_order=plan.row_order)
+    return run_export
+
+
+# 导出测试名 -> 格式名，没有安装依赖的格式不测试
+EXPORT_BENCHMARKS = {
+    'export_excel': 'xlsx',
+    'export_csv': 'csv',
+    'export_csv_gz': 'csv.gz',
+    'export_parquet': 'parquet',
+    'export_feather': 'feather',
+    'export_jsonl': 'jsonl',
+}
+
+
+def setup_config_store(ctx):
+    db_file = os.path.join(ctx['work_dir'], 'configs.db')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+    return ConfigStore(db_file)
+
+
+def run_config_save_load(ctx, store):
+    for _ in range(20):
+        store.save(ctx['config'])
+    for config_id, _ in store.list_configs():
+        store.get(config_id)
+
+
+def run_cold_import(ctx, _):
+    # 在新进程中导入界面模块，pandas等应延迟到显示窗口之后才导入
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    subprocess.run([sys.executable, '-c', 'import file_info_system'],
+                   cwd=ctx['work_dir'], env=env, check=True)
+
+
+BENCHMARKS = [
+    ('cold_import', setup_nothing, run_cold_import),
+    ('load', setup_nothing, run_load),
+    ('build_index', lambda ctx: TransformPlan(ctx['data']), run_build_index),
+    ('apply_config', setup_nothing, run_apply_config),
+    ('value_counts', configured_plan, run_value_counts),
+    ('sort_rows', configured_plan, run_sort),
+    ('preview', setup_sorted_plan, run_preview),
+    *[(name, setup_sorted_plan, export_benchmark(format_name))
+      for name, format_name in EXPORT_BENCHMARKS.items() if format_name in EXPORT_FORMATS],
+    ('config_save_load', setup_config_store, run_config_save_load),
+]
+
+
+def measure(ctx, setup, run, repeat):
+    """返回 (每次运行的秒数, 峰值内存MB)"""
+    seconds = []
+    for _ in range(repeat):
+        prepared = setup(ctx)
+        start = time.perf_counter()
+        run(ctx, prepared)
+        seconds.append(time.perf_counter() - start)
+
+    # 跟踪内存分配会拖慢运行，峰值内存单独运行一次测量
+    prepared = setup(ctx)
+    tracemalloc.start()
+    try:
+        run(ctx, prepared)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak / 1024 ** 2
+
+
+def run_benchmarks(params, repeat, selected=None, work_dir=None):
+    work_dir = work_dir or tempfile.mkdtemp(prefix='file_info_bench_')
+    file_name = os.path.join(work_dir, 'dataset.' + params['format'])
+    generate(file_name, params['rows'], params['cols'], params['cardinality'], params['seed'])
+
+    ctx = {'file_name': file_name, 'work_dir': work_dir}
+    run_load(ctx, None)
+    ctx['fields'] = list(ctx['data'].columns[:params['selected']])
+    ctx['config'] = make_config(ctx['data'], ctx['fields'])
+
+    results = {}
+    try:
+        for name, setup, run in BENCHMARKS:
+            if selected and name not in selected:
+                continue
+            seconds, peak_mb = measure(ctx, setup, run, repeat)
+            results[name] = {'seconds': min(seconds), 'runs': seconds, 'peak_mb': peak_mb}
+            throughput = ''
+            if name in EXPORT_BENCHMARKS:
+                # 导出的吞吐量：每秒写出的行数
+                results[name]['rows_per_second'] = params['rows'] / min(seconds)
+                throughput = f' {results[name]["rows_per_second"]:>12,.0f} 行/秒'
+            print(f'{name:<18} {min(seconds):>9.3f} s {peak_mb:>9.1f} MB{throughput}')
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'params': params,
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold, min_seconds=0.05):
+    """与基准结果比较，返回回归的操作列表"""
+    if baseline['params'] != report['params']:
+        print('警告: 基准结果的测试参数不同，不进行比较')
+        return []
+
+    regressions = []
+    print(f'\n{"操作":<16} {"基准 (s)":>10} {"本次 (s)":>10} {"变化":>8} {"内存变化":>10}')
+    for name, result in report['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        time_ratio = result['seconds'] / base['seconds'] if base['seconds'] else 1.0
+        memory_ratio = result['peak_mb'] / base['peak_mb'] if base['peak_mb'] else 1.0
+        # 很短的操作受计时误差影响大，只有同时超过最小差值才算变慢
+        slower = time_ratio > 1 + threshold and result['seconds'] - base['seconds'] > min_seconds
+        larger = memory_ratio > 1 + threshold and result['peak_mb'] - base['peak_mb'] > 1
+        flag = '  <-- 回归' if slower or larger else ''
+        print(f'{name:<18} {base["seconds"]:>10.3f} {result["seconds"]:>10.3f} '
+              f'{time_ratio - 1:>+8.0%} {memory_ratio - 1:>+10.0%}{flag}')
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='测试核心操作的耗时和峰值内存')
+    parser.add_argument('-r', '--rows', type=int, default=50000, help='行数')
+    parser.add_argument('-c', '--cols', type=int, default=20, help='列数')
+    parser.add_argument('-u', '--cardinality', type=int, default=50, help='每列的唯一值数量')
+    parser.add_argument('--selected', type=int, default=10, help='选中（处理和导出）的字段数量')
+    parser.add_argument('-f', '--format', choices=['csv', 'xlsx'], default='csv', help='数据集文件格式')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='随机数种子')
+    parser.add_argument('-n', '--repeat', type=int, default=3, help='每个操作的重复次数')
+    parser.add_argument('-b', '--benchmark', action='append', choices=[name for name, _, _ in BENCHMARKS],
+                        help='只运行指定的操作，可多次指定')
+    parser.add_argument('-o', '--output', help='结果JSON文件')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基准结果JSON文件')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为基准结果')
+    parser.add_argument('--threshold', type=float, default=0.2, help='判定为回归的变化比例（默认20%%）')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    params = {
+        'rows': args.rows,
+        'cols': args.cols,
+        'cardinality': args.cardinality,
+        'selected': min(args.selected, args.cols),
+        'format': args.format,
+        'seed': args.seed,
+    }
+    print(f'测试参数: {params}')
+    report = run_benchmarks(params, args.repeat, args.benchmark)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'已保存基准结果: {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('没有基准结果，使用 --save-baseline 保存本次结果作为基准')
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.threshold)
+    if regressions:
+        print(f'\n{len(regressions)} 个操作出现回归: {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+from value_mapping import map_unique_values
+
+
+# 默认视为无效元素的取值（NaN之外）
+DEFAULT_INVALID_TOKENS = frozenset(['Not performed'])
+
+
+def compact_codes(codes, n_uniques):
+    """用能容纳所有编码的最小整数类型保存编码"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_uniques <= np.iinfo(dtype).max:
+            return codes.astype(dtype, copy=False)
+    return codes
+
+
+def encode_column(series):
+    """将列分解为 (编码, 唯一值)，缺失值也作为一个唯一值"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    uniques = np.asarray(uniques, dtype=object)
+    return compact_codes(codes, len(uniques)), uniques
+
+
+def valid_uniques(uniques, invalid_tokens=DEFAULT_INVALID_TOKENS):
+    """判断每个唯一值是否有效（非NaN且不属于无效值集合）
+
+    无效值是用户输入的文本，按值的字符串形式比较（与编辑界面中显示的
+    一致），数值列中的 -1 等取值也可以设为无效值。
+    """
+    uniques = pd.Series(uniques, dtype=object)
+    tokens = [str(token) for token in invalid_tokens]
+    return (uniques.notna() & ~uniques.map(str).isin(tokens)).to_numpy()
+
+
+def unique_ranks(uniques, ascending=True):
+    """计算唯一值的排序名次，相同的值名次相同，缺失值总是排在最后
+
+    数值按大小排在文本之前，其余的值按字符串排序，因此混合类型的列
+    也可以排序。
+    """
+    values = pd.Series(uniques, dtype=object)
+    is_na = values.isna().to_numpy()
+    numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+    is_number = ~np.isnan(numbers) & ~is_na
+    texts = np.where(is_na, '', values.map(str).to_numpy(dtype=str))
+    numbers = np.where(is_number, numbers, 0.0)
+
+    order = np.lexsort((texts, numbers, ~is_number, is_na))
+    changed = np.ones(len(order), dtype=bool)
+    changed[1:] = ((texts[order][1:] != texts[order][:-1])
+                   | (is_na[order][1:] != is_na[order][:-1]))
+    ranks = np.empty(len(order), dtype=np.int64)
+    ranks[order] = np.cumsum(changed) - 1
+
+    if not ascending:
+        max_rank = ranks[~is_na].max() if (~is_na).any() else 0
+        ranks = np.where(is_na, max_rank + 1, max_rank - ranks)
+    return ranks
+
+
+class ColumnIndex:
+    """原始数据各列的编码、取值计数和有效性位图索引
+
+    原始数据不会被修改，因此每列只需分解和计数一次。替换后的取值计数
+    和有效性都只取决于替换后的唯一值，替换规则变化时只需在唯一值上
+    重新汇总或判断，不需要重新扫描每一行。有效性再通过编码得到每行的
+    结果，并以压缩位图（每行1位）保存。
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self._codes = {}  # 字段 -> (编码, 唯一值, 每个唯一值的出现次数)
+        self._value_counts = {}  # 字段 -> (替换规则, 替换后的取值计数)
+        self._bitmaps = {}  # 字段 -> (替换规则, 无效值集合, 压缩位图)
+
+    def set_base(self, base):
+        """原始数据追加了新列，已有列的索引仍然有效"""
+        self.base = base
+
+    def build(self, field_name):
+        """分解字段并统计每个唯一值的出现次数，可以在后台线程中调用"""
+        if field_name not in self._codes:
+            codes, uniques = encode_column(self.base[field_name])
+            counts = np.bincount(codes, minlength=len(uniques))
+            self._codes[field_name] = (codes, uniques, counts)
+        return self._codes[field_name]
+
+    def is_built(self, field_name):
+        return field_name in self._codes
+
+    def codes(self, field_name):
+        """返回字段的 (编码, 唯一值)"""
+        codes, uniques, _ = self.build(field_name)
+        return codes, uniques
+
+    def mapped_uniques(self, field_name, mapping):
+        """返回应用替换规则后的唯一值"""
+        _, uniques = self.codes(field_name)
+        if not mapping:
+            return uniques
+        new_uniques, _ = map_unique_values(uniques, mapping)
+        return new_uniques
+
+    def value_counts(self, field_name, mapping=None):
+        """返回应用替换规则后每个取值的出现次数，按次数从多到少排列
+
+        替换后相同的取值只需把原始唯一值的计数相加，因此修改替换规则后
+        只在唯一值上重新汇总。
+        """
+        cached = self._value_counts.get(field_name)
+        if cached is not None and cached[0] is mapping:
+            return cached[1]
+        _, uniques, counts = self.build(field_name)
+        if mapping:
+            groups, uniques = pd.factorize(
+                pd.Series(self.mapped_uniques(field_name, mapping), dtype=object),
+                use_na_sentinel=False)
+            counts = np.bincount(groups, weights=counts, minlength=len(uniques)).astype(np.int64)
+        value_counts = pd.Series(counts, index=pd.Index(uniques, dtype=object), name='count')
+        value_counts = value_counts[value_counts > 0].sort_values(ascending=False, kind='stable')
+        self._value_counts[field_name] = (mapping, value_counts)
+        return value_counts
+
+    def validity_bitmap(self, field_name, mapping=None, invalid_tokens=DEFAULT_INVALID_TOKENS):
+        """返回字段的有效性压缩位图"""
+        invalid_tokens = frozenset(invalid_tokens)
+        cached = self._bitmaps.get(field_name)
+        if cached is not None and cached[0] is mapping and cached[1] == invalid_tokens:
+            return cached[2]
+        codes, _ = self.codes(field_name)
+        valid = valid_uniques(self.mapped_uniques(field_name, mapping), invalid_tokens)
+        bitmap = np.packbits(valid[codes])
+        self._bitmaps[field_name] = (mapping, invalid_tokens, bitmap)
+        return bitmap
+
+    def valid_counts(self, fields, value_mapping, invalid_tokens=None):
+        """计算每行在指定字段中的有效元素数量
+
+        invalid_tokens 为 {字段: 无效值集合}，未给出的字段使用默认的无效值。
+        """
+        invalid_tokens = invalid_tokens or {}
+        n_rows = len(self.base)
+        counts = np.zeros(n_rows, dtype=np.int32)
+        for field_name in fields:
+            bitmap = self.validity_bitmap(field_name, value_mapping.get(field_name),
+                                          invalid_tokens.get(field_name, DEFAULT_INVALID_TOKENS))
+            counts += np.unpackbits(bitmap, count=n_rows)
+        return counts
+
+    def sort_key(self, field_name, mapping=None, ascending=True):
+        """返回按替换后的值排序时每行的排序键"""
+        codes, _ = self.codes(field_name)
+        return unique_ranks(self.mapped_uniques(field_name, mapping), ascending)[codes]
@@ -0,0 +1,445 @@
+import os
+import json
+import shutil
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from dataset_io import iter_dataset_chunks, read_header, is_csv_file
+from dataset_cache import DEFAULT_CACHE_DIR, file_fingerprint
+from column_index import ColumnIndex, DEFAULT_INVALID_TOKENS, valid_uniques
+from transform_plan import TransformPlan
+from value_mapping import map_unique_values
+
+
+DEFAULT_STORE_DIR = os.path.join(DEFAULT_CACHE_DIR, 'stores')
+DEFAULT_MEMORY_BUDGET = 1024 ** 3
+# 读取的数据块只占内存预算的一部分，解析和编码时还需要临时内存
+CHUNK_BUDGET_SHARE = 0.25
+MIN_CHUNK_ROWS = 1000
+SAMPLE_ROWS = 1000
+# 文件解析为数据框后大约占用的内存倍数，用于判断是否需要磁盘列存储
+MEMORY_EXPANSION = {'csv': 4, 'excel': 20}
+# 分块排序时每行大约需要的临时内存（行位置、计数和排序的中间结果）
+SORT_BYTES_PER_ROW = 64
+STORE_VERSION = 1
+# 同时映射的编码文件数量上限，每个内存映射都占用一个文件描述符
+MAX_MAPPED_COLUMNS = 64
+
+
+class BuildCancelled(Exception):
+    """建立列存储被用户取消"""
+
+
+def estimated_memory(file_name):
+    """粗略估计文件完整读入内存后占用的字节数"""
+    kind = 'csv' if is_csv_file(file_name) else 'excel'
+    return os.path.getsize(file_name) * MEMORY_EXPANSION[kind]
+
+
+def needs_store(file_name, memory_budget=DEFAULT_MEMORY_BUDGET):
+    """文件读入内存后预计会超过内存预算时返回True"""
+    return estimated_memory(file_name) > memory_budget
+
+
+def chunk_rows_for_budget(file_name, memory_budget):
+    """根据样本行的内存占用估算每块读取的行数"""
+    sample, _, _ = next(iter_dataset_chunks(file_name, SAMPLE_ROWS), (None, 0, 0))
+    if sample is None or len(sample) == 0:
+        return MIN_CHUNK_ROWS
+    bytes_per_row = max(1, sample.memory_usage(deep=True).sum() / len(sample))
+    return max(MIN_CHUNK_ROWS, int(memory_budget * CHUNK_BUDGET_SHARE / bytes_per_row))
+
+
+class _NA:
+    """编码时代表缺失值的键（NaN之间互不相等，不能直接作为字典的键）"""
+
+
+def build_store(file_name, store_dir, memory_budget=DEFAULT_MEMORY_BUDGET, progress=None):
+    """分块读取数据集，建立磁盘列存储
+
+    每列在读取时逐块分解为全局的整数编码，编码追加写入磁盘文件，只在
+    内存中保留各列的唯一值和出现次数，因此内存占用取决于数据块的大小
+    和唯一值的数量，而不是文件的行数。progress(已读行数, 已完成量, 总量)
+    返回False时取消。
+    """
+    chunk_rows = chunk_rows_for_budget(file_name, memory_budget)
+    tmp_dir = store_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = None
+    dtypes = {}
+    tables = []  # 每列的 {值: 编码}，按编码顺序插入
+    counts = []
+    rows = 0
+    try:
+        for chunk, done, total in iter_dataset_chunks(file_name, chunk_rows):
+            if columns is None:
+                columns = list(chunk.columns)
+                tables = [{} for _ in columns]
+                counts = [np.zeros(0, dtype=np.int64) for _ in columns]
+            for i, col in enumerate(columns):
+                series = chunk[col]
+                dtype = str(series.dtype)
+                if dtypes.setdefault(col, dtype) != dtype:
+                    dtypes[col] = 'object'
+                codes, uniques = pd.factorize(series)
+                table = tables[i]
+                # 块内的唯一值映射为全局编码，块内编码-1（缺失值）对应最后一项
+                keys = list(np.asarray(uniques, dtype=object))
+                if (codes < 0).any():
+                    keys.append(_NA)
+                mapping = np.fromiter((table.setdefault(key, len(table)) for key in keys),
+                                      dtype=np.int64, count=len(keys))
+                global_codes = mapping[codes]
+                # 每块追加写入后立即关闭，宽表（上千列）也不会超过打开文件数的限制
+                with open(os.path.join(tmp_dir, f'{i}.codes'), 'ab') as f:
+                    f.write(global_codes.astype(np.int32).tobytes())
+                column_counts = np.bincount(global_codes, minlength=len(table))
+                column_counts[:len(counts[i])] += counts[i]
+                counts[i] = column_counts
+            rows += len(chunk)
+            if progress is not None and progress(rows, done, total) is False:
+                raise BuildCancelled()
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    if columns is None:
+        columns = read_header(file_name)
+        for i in range(len(columns)):
+            open(os.path.join(tmp_dir, f'{i}.codes'), 'wb').close()
+            tables.append({})
+            counts.append(np.zeros(0, dtype=np.int64))
+
+    code_dtypes = []
+    for i, table in enumerate(tables):
+        uniques = np.empty(len(table), dtype=object)
+        for key, code in table.items():
+            uniques[code] = np.nan if key is _NA else key
+        with open(os.path.join(tmp_dir, f'{i}.uniques'), 'wb') as f:
+            pickle.dump((uniques, counts[i]), f, protocol=pickle.HIGHEST_PROTOCOL)
+        code_dtypes.append(_compact_code_file(os.path.join(tmp_dir, f'{i}.codes'), len(uniques),
+                                              chunk_rows))
+
+    meta = {
+        'version': STORE_VERSION,
+        'source': os.path.abspath(file_name),
+        'rows': rows,
+        'columns': columns,
+        'dtypes': {col: dtypes.get(col, 'object') for col in columns},
+        'code_dtypes': code_dtypes,
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    return ColumnStore(store_dir)
+
+
+def _compact_code_file(path, n_uniques, chunk_rows):
+    """唯一值较少时把int32编码文件分块改写为更小的整数类型，返回类型名"""
+    for dtype in (np.int8, np.int16):
+        if n_uniques <= np.iinfo(dtype).max:
+            break
+    else:
+        return 'int32'
+    source = np.memmap(path, dtype=np.int32, mode='r') if os.path.getsize(path) else np.zeros(0, np.int32)
+    compact_path = path + '.compact'
+    with open(compact_path, 'wb') as f:
+        for start in range(0, len(source), chunk_rows):
+            f.write(source[start:start + chunk_rows].astype(dtype).tobytes())
+    del source
+    os.replace(compact_path, path)
+    return np.dtype(dtype).name
+
+
+class CodeFile:
+    """一列的编码文件，访问时才映射到内存
+
+    映射由列存储统一管理，只保留最近用到的 MAX_MAPPED_COLUMNS 个，
+    上千列的宽表同时使用所有列时也不会超过打开文件数的限制。
+    """
+
+    def __init__(self, store, path, dtype, length):
+        self.store = store
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.shape = (length,)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        return self.store.mapped(self.path, self.dtype)[key]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.store.mapped(self.path, self.dtype), dtype=dtype)
+
+
+class StoredColumn:
+    """列存储中的一列：内存映射的编码和（替换后的）唯一值
+
+    只实现预览和导出用到的Series接口：len()、iloc切片、take() 以及按位置
+    取单个值的 array[位置]，每次只读取用到的行。
+    """
+
+    def __init__(self, codes, uniques, name=None):
+        self.codes = codes
+        self.uniques = uniques
+        self.name = name
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def iloc(self):
+        return self
+
+    @property
+    def array(self):
+        return self
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            # 直接切片编码文件，只读取切片内的行
+            return self._values(self.codes[key])
+        return self.uniques[self.codes[key]]
+
+    def take(self, positions):
+        return self._values(self.codes[np.asarray(positions)])
+
+    def _values(self, codes):
+        values = self.uniques.take(np.asarray(codes))
+        return pd.Series(values, name=self.name, dtype=object)
+
+
+class ColumnStore:
+    """磁盘上的列存储，代替完整读入内存的数据框
+
+    每列保存为一个整数编码文件和该列的唯一值（及出现次数）。编码以内存
+    映射方式读取，由操作系统按需换入换出；唯一值在第一次用到该列时才
+    载入。排序结果等与行数成正比的数组也保存在临时的映射文件中。
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f'不支持的列存储版本: {meta.get("version")}')
+        self.source = meta['source']
+        self.rows = meta['rows']
+        self.columns = meta['columns']
+        self.dtypes = meta['dtypes']
+        self.code_dtypes = dict(zip(self.columns, meta['code_dtypes']))
+        self.positions = {col: i for i, col in enumerate(self.columns)}
+        self._encoded = {}  # 字段 -> (编码, 唯一值, 出现次数)
+        self._mapped = OrderedDict()  # 编码文件 -> 内存映射，按最近使用的顺序排列
+        self._mapped_lock = threading.Lock()  # 导出在后台线程中读取
+
+    def __len__(self):
+        return self.rows
+
+    def encoded(self, field_name):
+        """返回字段的 (内存映射的编码, 唯一值, 每个唯一值的出现次数)"""
+        if field_name not in self._encoded:
+            i = self.positions[field_name]
+            with open(os.path.join(self.store_dir, f'{i}.uniques'), 'rb') as f:
+                uniques, counts = pickle.load(f)
+            dtype = np.dtype(self.code_dtypes[field_name])
+            if self.rows:
+                codes = CodeFile(self, os.path.join(self.store_dir, f'{i}.codes'), dtype, self.rows)
+            else:
+                codes = np.zeros(0, dtype=dtype)
+            self._encoded[field_name] = (codes, uniques, counts)
+        return self._encoded[field_name]
+
+    def mapped(self, path, dtype):
+        """返回编码文件的内存映射，超过上限时释放最久未用的映射"""
+        with self._mapped_lock:
+            array = self._mapped.get(path)
+            if array is None:
+                array = np.memmap(path, dtype=dtype, mode='r')
+                self._mapped[path] = array
+                while len(self._mapped) > MAX_MAPPED_COLUMNS:
+                    self._mapped.popitem(last=False)
+            else:
+                self._mapped.move_to_end(path)
+            return array
+
+    def __getitem__(self, field_name):
+        codes, uniques, _ = self.encoded(field_name)
+        return StoredColumn(codes, uniques, field_name)
+
+    def new_array(self, dtype, length):
+        """创建与行数成正比的临时数组，保存在映射文件中，不再引用时自动删除"""
+        if length == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(tempfile.TemporaryFile(dir=self.store_dir), dtype=dtype,
+                         mode='w+', shape=(length,))
+
+    def nbytes(self):
+        """列存储在磁盘上占用的字节数"""
+        return sum(os.path.getsize(os.path.join(self.store_dir, name))
+                   for name in os.listdir(self.store_dir))
+
+
+def _read_meta(store_dir):
+    try:
+        with open(os.path.join(store_dir, 'meta.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def remove_stores(file_name=None, store_root=DEFAULT_STORE_DIR, keep=None):
+    """删除某个源文件的列存储，不指定文件时删除全部，返回删除的数量
+
+    keep 为正在使用的列存储目录，不会被删除。
+    """
+    if not os.path.isdir(store_root):
+        return 0
+    source = os.path.abspath(file_name) if file_name else None
+    keep = os.path.abspath(keep) if keep else None
+    removed = 0
+    for name in os.listdir(store_root):
+        path = os.path.join(store_root, name)
+        if not os.path.isdir(path) or os.path.abspath(path) == keep:
+            continue
+        meta = _read_meta(path)
+        if source is None or meta is None or meta.get('source') == source:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def stores_bytes(store_root=DEFAULT_STORE_DIR):
+    """所有列存储在磁盘上占用的字节数"""
+    total = 0
+    for root, _, names in os.walk(store_root):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def open_store(file_name, store_root=DEFAULT_STORE_DIR, memory_budget=DEFAULT_MEMORY_BUDGET,
+               progress=None):
+    """打开源文件的列存储，没有或源文件已变化时重新建立"""
+    store_dir = os.path.join(store_root, file_fingerprint(file_name))
+    meta = _read_meta(store_dir)
+    if meta is not None and meta.get('version') == STORE_VERSION:
+        store = ColumnStore(store_dir)
+        if progress is not None:
+            progress(len(store), 1, 1)
+        return store
+    # 同一源文件只保留最新的列存储
+    remove_stores(file_name, store_root)
+    os.makedirs(store_root, exist_ok=True)
+    return build_store(file_name, store_dir, memory_budget, progress)
+
+
+class StoreIndex(ColumnIndex):
+    """直接使用列存储中已有的编码和计数，不需要再分解列"""
+
+    def build(self, field_name):
+        if field_name not in self._codes:
+            self._codes[field_name] = self.base.encoded(field_name)
+        return self._codes[field_name]
+
+
+class StorePlan(TransformPlan):
+    """基于磁盘列存储的变换计划
+
+    值替换只作用于各列的唯一值，预览和导出按行位置从编码文件中读取；
+    按有效元素数量排序时分块计算每行的计数，再用稳定的计数排序得到
+    行顺序，与行数成正比的数组都保存在映射文件中，内存占用受内存预算
+    限制。附加排序键需要在内存中排序，超过预算时抛出MemoryError。
+    """
+
+    def __init__(self, store, columns=None, display_names=None,
+                 memory_budget=DEFAULT_MEMORY_BUDGET, history_limit=100):
+        super().__init__(store, columns, display_names, history_limit)
+        self.index = StoreIndex(store)
+        self.memory_budget = memory_budget
+        self.chunk_rows = max(MIN_CHUNK_ROWS, memory_budget // SORT_BYTES_PER_ROW)
+
+    def column(self, field_name):
+        mapping = self.value_mapping.get(field_name)
+        codes, uniques = self.index.codes(field_name)
+        if not mapping:
+            return StoredColumn(codes, uniques, field_name)
+        cached = self._column_cache.get(field_name)
+        if cached is not None and cached[0] is mapping:
+            return cached[1]
+        new_uniques, _ = map_unique_values(uniques, mapping)
+        column = StoredColumn(codes, new_uniques, field_name)
+        self._column_cache[field_name] = (mapping, column)
+        return column
+
+    def sort_by_valid_count(self, fields, ascending=False, invalid_tokens=None, sort_keys=()):
+        if sort_keys:
+            required = len(self) * 8 * (len(sort_keys) + 3)
+            if required > self.memory_budget:
+                raise MemoryError(f'附加排序键需要约 {required / 1024 ** 2:.0f} MB 内存，'
+                                  f'超过了内存预算 {self.memory_budget / 1024 ** 2:.0f} MB')
+            return super().sort_by_valid_count(fields, ascending, invalid_tokens, sort_keys)
+
+        invalid_tokens = invalid_tokens or {}
+        valid = []
+        for field in fields:
+            codes, _ = self.index.codes(field)
+            mapped = self.index.mapped_uniques(field, self.value_mapping.get(field))
+            tokens = invalid_tokens.get(field, DEFAULT_INVALID_TOKENS)
+            valid.append((codes, valid_uniques(mapped, tokens).astype(np.int32)))
+
+        # 第一遍按当前行顺序分块计算有效元素数量，并统计每个数量的行数
+        n_rows = len(self)
+        order = self.row_order
+        counts = self.base.new_array(np.int32, n_rows)
+        histogram = np.zeros(len(fields) + 1, dtype=np.int64)
+        for start in range(0, n_rows, self.chunk_rows):
+            stop = min(start + self.chunk_rows, n_rows)
+            positions = np.arange(start, stop) if order is None else np.asarray(order[start:stop])
+            chunk_counts = np.zeros(stop - start, dtype=np.int32)
+            for codes, is_valid in valid:
+                chunk_counts += is_valid[codes[positions]]
+            counts[start:stop] = chunk_counts
+            histogram += np.bincount(chunk_counts, minlength=len(histogram))
+
+        # 第二遍稳定的计数排序：每个数量的行按当前顺序写入各自的区间
+        keys = np.arange(len(histogram)) if ascending else np.arange(len(histogram))[::-1]
+        offsets = np.zeros(len(histogram), dtype=np.int64)
+        offsets[keys] = np.concatenate([[0], np.cumsum(histogram[keys])[:-1]])
+        new_order = self.base.new_array(np.int64, n_rows)
+        for start in range(0, n_rows, self.chunk_rows):
+            stop = min(start + self.chunk_rows, n_rows)
+            positions = np.arange(start, stop) if order is None else np.asarray(order[start:stop])
+            chunk_counts = np.asarray(counts[start:stop])
+            sort_by = chunk_counts if ascending else -chunk_counts
+            sorted_positions = positions[np.argsort(sort_by, kind='stable')]
+            chunk_histogram = np.bincount(chunk_counts, minlength=len(histogram))
+            begin = 0
+            for key in keys:
+                size = chunk_histogram[key]
+                if size:
+                    new_order[offsets[key]:offsets[key] + size] = sorted_positions[begin:begin + size]
+                    offsets[key] += size
+                    begin += size
+        del counts
+        self.update(row_order=new_order)
+
+    def materialize(self, fields):
+        positions = self.row_order if self.row_order is not None else np.arange(len(self))
+        data = pd.concat([self.column(field).take(positions).reset_index(drop=True) for field in fields],
+                         axis=1, keys=range(len(fields)))
+        data.columns = [self.display_name(field) for field in fields]
+        return data.infer_objects()
@@ -0,0 +1,167 @@
+import os
+import json
+import sqlite3
+from datetime import datetime
+
+
+# 配置数据库的默认路径，以及旧版本使用的JSON配置文件
+DEFAULT_CONFIG_DB = 'file_info_system_configs.db'
+LEGACY_CONFIG_FILE = 'file_info_system_configs.json'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS configs (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS configs_name ON configs (name);
+CREATE TABLE IF NOT EXISTS config_bodies (
+    id TEXT PRIMARY KEY REFERENCES configs (id) ON DELETE CASCADE,
+    field_states TEXT NOT NULL,
+    value_mapping TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+
+class ConfigStore:
+    """基于SQLite的配置存储
+
+    配置的名称、描述和日期与字段状态、值替换规则分表保存，列出配置时
+    只读取前者，选中配置后再读取完整内容。每次保存或删除只修改一条
+    记录并在事务中完成；数据库使用WAL模式，多个程序同时读写时不会
+    互相覆盖。首次打开时自动导入旧版本的JSON配置文件（原文件保留）。
+    """
+
+    def __init__(self, db_file=DEFAULT_CONFIG_DB, legacy_file=None, timeout=30):
+        self.db_file = db_file
+        self.timeout = timeout
+        # sqlite3连接的上下文管理器只提交事务，不关闭连接，需要显式关闭
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+        if legacy_file is not None and os.path.exists(legacy_file):
+            self.migrate_json(legacy_file)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=self.timeout)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    def _transaction(self, func):
+        """在写事务中执行 func(conn)，出错时回滚"""
+        conn = self._connect()
+        try:
+            # 立即获取写锁，避免两个程序同时读取后再各自写入
+            conn.execute('BEGIN IMMEDIATE')
+            result = func(conn)
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _query(self, sql, params=()):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _insert(conn, config_id, config):
+        conn.execute(
+            'INSERT OR REPLACE INTO configs (id, name, description, date) VALUES (?, ?, ?, ?)',
+            (config_id, config['name'], config.get('description', ''), config.get('date', '')))
+        conn.execute(
+            'INSERT OR REPLACE INTO config_bodies (id, field_states, value_mapping) VALUES (?, ?, ?)',
+            (config_id,
+             json.dumps(config.get('field_states', {}), ensure_ascii=False),
+             json.dumps(config.get('value_mapping', {}), ensure_ascii=False)))
+
+    # ---- 读取 ----
+
+    def __len__(self):
+        return self._query('SELECT COUNT(*) FROM configs')[0][0]
+
+    def list_configs(self):
+        """返回所有配置的 (配置ID, 名称、描述和日期)，不读取配置内容"""
+        rows = self._query('SELECT id, name, description, date FROM configs ORDER BY rowid')
+        return [(cid, {'name': name, 'description': description, 'date': date})
+                for cid, name, description, date in rows]
+
+    def get(self, config_id):
+        """读取完整的配置，不存在时返回None"""
+        rows = self._query(
+            'SELECT c.name, c.description, c.date, b.field_states, b.value_mapping '
+            'FROM configs c JOIN config_bodies b ON b.id = c.id WHERE c.id = ?',
+            (config_id,))
+        if not rows:
+            return None
+        name, description, date, field_states, value_mapping = rows[0]
+        return {
+            'name': name,
+            'description': description,
+            'date': date,
+            'field_states': json.loads(field_states),
+            'value_mapping': json.loads(value_mapping),
+        }
+
+    def find(self, key):
+        """按配置ID或配置名称查找配置，返回 (配置ID, 配置)"""
+        config = self.get(key)
+        if config is not None:
+            return key, config
+        ids = [row[0] for row in self._query('SELECT id FROM configs WHERE name = ? ORDER BY rowid', (key,))]
+        if not ids:
+            raise ValueError(f'找不到配置 "{key}"')
+        if len(ids) > 1:
+            raise ValueError(f'存在多个名为 "{key}" 的配置，请使用配置ID: {", ".join(ids)}')
+        return ids[0], self.get(ids[0])
+
+    # ---- 写入 ----
+
+    def save(self, config):
+        """保存新配置，返回配置ID"""
+        def insert(conn):
+            count = conn.execute('SELECT COUNT(*) FROM configs').fetchone()[0]
+            config_id = f"config_{count + 1}_{int(datetime.now().timestamp())}"
+            suffix = 1
+            while conn.execute('SELECT 1 FROM configs WHERE id = ?', (config_id,)).fetchone():
+                suffix += 1
+                config_id = f"config_{count + 1}_{int(datetime.now().timestamp())}_{suffix}"
+            self._insert(conn, config_id, config)
+            return config_id
+        return self._transaction(insert)
+
+    def delete(self, config_id):
+        """删除配置，返回是否存在该配置"""
+        return self._transaction(
+            lambda conn: conn.execute('DELETE FROM configs WHERE id = ?', (config_id,)).rowcount > 0)
+
+    def migrate_json(self, json_file):
+        """导入旧版本的JSON配置文件，同一文件只导入一次，返回导入的配置数量"""
+        key = 'migrated:' + os.path.abspath(json_file)
+
+        def migrate(conn):
+            if conn.execute('SELECT 1 FROM meta WHERE key = ?', (key,)).fetchone():
+                return 0
+            with open(json_file, 'r', encoding='utf-8') as f:
+                configs = json.load(f)
+            for config_id, config in configs.items():
+                # 已存在的同ID配置保留数据库中的版本
+                if not conn.execute('SELECT 1 FROM configs WHERE id = ?', (config_id,)).fetchone():
+                    self._insert(conn, config_id, config)
+            conn.execute('INSERT INTO meta (key, value) VALUES (?, ?)',
+                         (key, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            return len(configs)
+        return self._transaction(migrate)
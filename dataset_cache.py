@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import hashlib
+import importlib.util
+
+from lazy_imports import lazy_import
+
+# 缓存对象在程序启动时创建，pandas在第一次读写缓存时才导入
+pd = lazy_import('pandas')
+
+# feather格式需要pyarrow，只检查是否安装而不导入
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+
+DEFAULT_CACHE_DIR = 'file_info_system_cache'
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+# 解析数据集文件的方式改变（读出的数据可能不同）时增加，之前的缓存和
+# 列存储随之失效。2: 自动识别CSV的编码、分隔符、表头所在行和列类型
+PARSER_VERSION = 2
+
+
+def file_fingerprint(file_name):
+    """根据文件路径、大小、修改时间和解析方式的版本生成缓存键"""
+    path = os.path.abspath(file_name)
+    stat = os.stat(path)
+    text = f'{path}|{stat.st_size}|{stat.st_mtime_ns}|{PARSER_VERSION}'
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class DatasetCache:
+    """以二进制列式格式缓存解析后的数据集
+
+    缓存键由源文件的路径、大小、修改时间和解析方式的版本确定，源文件
+    或解析方式变化后旧缓存自动失效。缓存总大小超过上限时按最近最少使用的顺序淘汰。
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_file = os.path.join(cache_dir, 'index.json')
+
+    def _load_index(self):
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _save_index(self, index):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp_file, self.index_file)
+
+    def _remove_entry(self, index, key):
+        entry = index.pop(key, None)
+        if entry:
+            try:
+                os.remove(os.path.join(self.cache_dir, entry['file']))
+            except OSError:
+                pass
+
+    def get(self, file_name):
+        """读取缓存的数据集，未命中时返回None"""
+        try:
+            key = file_fingerprint(file_name)
+        except OSError:
+            return None
+        index = self._load_index()
+        entry = index.get(key)
+        if entry is None:
+            return None
+
+        path = os.path.join(self.cache_dir, entry['file'])
+        try:
+            if entry['format'] == 'feather':
+                data = pd.read_feather(path)
+            else:
+                data = pd.read_pickle(path)
+        except Exception:
+            # 缓存文件损坏时丢弃该条目
+            self._remove_entry(index, key)
+            self._save_index(index)
+            return None
+
+        entry['last_access'] = time.time()
+        self._save_index(index)
+        return data
+
+    def put(self, file_name, data):
+        """将数据集写入缓存"""
+        key = file_fingerprint(file_name)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        index = self._load_index()
+
+        # 同一源文件只保留最新的缓存
+        source = os.path.abspath(file_name)
+        for old_key in [k for k, e in index.items() if e['source'] == source]:
+            self._remove_entry(index, old_key)
+
+        data = data.reset_index(drop=True)
+        path = None
+        cache_format = None
+        if HAS_PYARROW and all(isinstance(col, str) for col in data.columns):
+            path = os.path.join(self.cache_dir, key + '.feather')
+            try:
+                data.to_feather(path)
+                cache_format = 'feather'
+            except Exception:
+                # 混合类型的列无法写为feather，改用pickle
+                if os.path.exists(path):
+                    os.remove(path)
+        if cache_format is None:
+            path = os.path.join(self.cache_dir, key + '.pkl')
+            data.to_pickle(path)
+            cache_format = 'pickle'
+
+        size = os.path.getsize(path)
+        if size > self.max_bytes:
+            os.remove(path)
+            self._save_index(index)
+            return
+
+        index[key] = {
+            'source': source,
+            'file': os.path.basename(path),
+            'format': cache_format,
+            'bytes': size,
+            'last_access': time.time(),
+        }
+        self._evict(index)
+        self._save_index(index)
+
+    def _evict(self, index):
+        total = sum(entry['bytes'] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            total -= index[key]['bytes']
+            self._remove_entry(index, key)
+
+    def invalidate(self, file_name):
+        """删除某个源文件的缓存"""
+        source = os.path.abspath(file_name)
+        index = self._load_index()
+        keys = [k for k, e in index.items() if e['source'] == source]
+        for key in keys:
+            self._remove_entry(index, key)
+        if keys:
+            self._save_index(index)
+        return len(keys)
+
+    def clear(self):
+        """清空全部缓存"""
+        index = self._load_index()
+        for key in list(index):
+            self._remove_entry(index, key)
+        self._save_index(index)
+
+    def total_bytes(self):
+        return sum(entry['bytes'] for entry in self._load_index().values())
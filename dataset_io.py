@@ -0,0 +1,419 @@
+import os
+import io
+import csv
+import codecs
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+
+# 每次读取的行数
+CHUNK_ROWS = 100000
+# 支持的数据集文件扩展名
+DATASET_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+# 合并多个文件时记录每行来源文件的列名
+SOURCE_COLUMN = '来源文件'
+# 识别CSV格式时读取的文件开头和结尾的字节数，以及用于推断列类型的行数
+SNIFF_HEAD_BYTES = 4 * 1024 ** 2
+SNIFF_TAIL_BYTES = 1024 ** 2
+SNIFF_ROWS = 10000
+SNIFF_LINES = 50  # 判断分隔符和表头所在行时使用的行数
+CSV_ENCODINGS = ('utf-8', 'gbk', 'gb18030')
+CSV_DELIMITERS = (',', '\t')
+
+
+def is_csv_file(file_name):
+    return file_name.lower().endswith('.csv')
+
+
+def is_xlsx_file(file_name):
+    return file_name.lower().endswith('.xlsx')
+
+
+def normalize_header(header):
+    """按照pandas的规则处理空列名和重复列名"""
+    columns = []
+    seen = {}
+    for i, name in enumerate(header):
+        if name is None or (isinstance(name, str) and not name.strip()):
+            name = f'Unnamed: {i}'
+        if name in seen:
+            seen[name] += 1
+            new_name = f'{name}.{seen[name]}'
+            while new_name in seen:
+                seen[name] += 1
+                new_name = f'{name}.{seen[name]}'
+            seen[new_name] = 0
+            name = new_name
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def detect_encoding(head, tail=b'', complete=False):
+    """根据文件开头（和结尾）的字节判断编码
+
+    依次尝试UTF-8和GBK（GB18030），有BOM时为 utf-8-sig。complete 为
+    False时 head 只是文件开头的一部分，最后一行可能不完整，不参与判断；
+    tail 从第一个换行之后开始判断。换行符不会出现在这些编码的多字节
+    字符中间，按换行截断不会切开字符。
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if not complete:
+        head = head[:head.rfind(b'\n') + 1]
+    tail = tail[tail.find(b'\n') + 1:]
+    for encoding in CSV_ENCODINGS:
+        try:
+            head.decode(encoding)
+            tail.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    raise ValueError('无法识别文件编码，支持UTF-8、带BOM的UTF-8和GBK')
+
+
+def detect_delimiter(lines):
+    """返回使各行字段数最一致且最多的分隔符，以及该分隔符下的字段数"""
+    best = (',', 1)
+    best_score = None
+    for delimiter in CSV_DELIMITERS:
+        counts = Counter(len(row) for row in csv.reader(lines, delimiter=delimiter) if row)
+        if not counts:
+            continue
+        fields, rows = counts.most_common(1)[0]
+        score = (fields > 1, rows, fields)
+        if best_score is None or score > best_score:
+            best, best_score = (delimiter, fields), score
+    return best
+
+
+def detect_header_row(lines, delimiter, fields):
+    """返回表头之前要跳过的行数
+
+    文件开头的标题、说明或空行的字段数不到各行字段数的一半，跳过这些
+    行；表头必须出现在前 SNIFF_LINES 行中，否则不跳过。
+    """
+    reader = csv.reader(lines, delimiter=delimiter)
+    skipped = 0
+    for row in reader:
+        if len(row) * 2 > fields:
+            return skipped
+        skipped = reader.line_num
+    return 0
+
+
+def _sniff_csv(file_name):
+    size = os.path.getsize(file_name)
+    with open(file_name, 'rb') as f:
+        head = f.read(SNIFF_HEAD_BYTES)
+        tail = b''
+        if size > SNIFF_HEAD_BYTES:
+            f.seek(max(SNIFF_HEAD_BYTES, size - SNIFF_TAIL_BYTES))
+            tail = f.read()
+    complete = size <= SNIFF_HEAD_BYTES
+    encoding = detect_encoding(head, tail, complete)
+    if not complete:
+        head = head[:head.rfind(b'\n') + 1]
+    text = head.decode(encoding)
+
+    lines = text.splitlines(keepends=True)[:SNIFF_LINES]
+    delimiter, fields = detect_delimiter(lines)
+    skiprows = detect_header_row(lines, delimiter, fields)
+
+    # 样本中为文本的列指定为字符串，分块读取时各块的类型一致，
+    # 不会出现一块为数值、另一块为文本的混合类型列
+    try:
+        sample = pd.read_csv(io.StringIO(text), sep=delimiter, skiprows=skiprows, nrows=SNIFF_ROWS)
+    except ValueError:
+        # 样本截断处可能在跨行的引号字段中间，这时只读取表头
+        sample = pd.read_csv(io.StringIO(text), sep=delimiter, skiprows=skiprows, nrows=0)
+    dtype = {i: str for i, col in enumerate(sample.columns)
+             if not (pd.api.types.is_numeric_dtype(sample[col])
+                     or pd.api.types.is_bool_dtype(sample[col])
+                     or sample[col].isna().all())}
+    return {
+        'encoding': encoding,
+        'sep': delimiter,
+        'skiprows': skiprows,
+        'dtype': dtype,
+        'columns': list(sample.columns),
+        'dtypes': {col: str(sample[col].dtype) for col in sample.columns},
+    }
+
+
+_sniffed = {}
+
+
+def sniff_csv(file_name):
+    """只读取文件开头几MB（和结尾1MB），识别CSV文件的格式
+
+    返回 {'encoding', 'sep', 'skiprows', 'dtype', 'columns', 'dtypes'}：
+    编码、分隔符（逗号或制表符）、表头之前跳过的行数、按列位置指定的
+    读取类型，以及样本推断的列名和各列类型名。结果按文件大小和修改
+    时间缓存，同一文件的表头、样本和分块读取只识别一次。
+    """
+    stat = os.stat(file_name)
+    key = (os.path.abspath(file_name), stat.st_size, stat.st_mtime_ns)
+    result = _sniffed.get(key)
+    if result is None:
+        result = _sniff_csv(file_name)
+        if len(_sniffed) >= 64:
+            _sniffed.clear()
+        _sniffed[key] = result
+    return result
+
+
+def csv_options(file_name):
+    """按识别的格式读取CSV文件时传给 pd.read_csv 的参数"""
+    sniffed = sniff_csv(file_name)
+    return {key: sniffed[key] for key in ('encoding', 'sep', 'skiprows', 'dtype')}
+
+
+def read_csv(file_name, **kwargs):
+    """按识别的编码、分隔符、表头位置和列类型读取CSV文件"""
+    return pd.read_csv(file_name, **csv_options(file_name), **kwargs)
+
+
+def read_header(file_name):
+    """只读取数据集的表头"""
+    if is_csv_file(file_name):
+        return list(sniff_csv(file_name)['columns'])
+    if is_xlsx_file(file_name):
+        from openpyxl import load_workbook
+        workbook = load_workbook(file_name, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(max_row=1, values_only=True):
+                return normalize_header(row)
+            return []
+        finally:
+            workbook.close()
+    return list(pd.read_excel(file_name, nrows=0).columns)
+
+
+def _read_xlsx_rows(file_name, positions=None, max_rows=None):
+    """用只读模式逐行读取xlsx文件，返回 (表头, 数据行列表)"""
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_name, read_only=True, data_only=True)
+    try:
+        rows_iter = workbook.active.iter_rows(values_only=True)
+        header = next(rows_iter, None)
+        if header is None:
+            return [], []
+        columns = normalize_header(header)
+        if positions is not None:
+            columns = [columns[p] for p in positions]
+        rows = []
+        for row in rows_iter:
+            if max_rows is not None and len(rows) >= max_rows:
+                break
+            if positions is not None:
+                row = tuple(row[p] if p < len(row) else None for p in positions)
+            rows.append(row)
+        return columns, rows
+    finally:
+        workbook.close()
+
+
+def sniff_schema(file_name, sample_rows=1000):
+    """只读取表头和少量样本行，返回 (列名列表, {列名: 类型名})"""
+    if is_csv_file(file_name):
+        # 识别格式时已经读取并推断了样本
+        sniffed = sniff_csv(file_name)
+        return list(sniffed['columns']), dict(sniffed['dtypes'])
+    if is_xlsx_file(file_name):
+        columns, rows = _read_xlsx_rows(file_name, max_rows=sample_rows)
+        sample = pd.DataFrame(rows, columns=columns).infer_objects()
+    else:
+        sample = pd.read_excel(file_name, nrows=sample_rows)
+    columns = list(sample.columns)
+    return columns, {col: str(sample[col].dtype) for col in columns}
+
+
+def read_columns(file_name, columns):
+    """只读取指定的列，列顺序与参数一致"""
+    header = read_header(file_name)
+    positions = [header.index(col) for col in columns]
+    if is_xlsx_file(file_name):
+        names, rows = _read_xlsx_rows(file_name, positions=positions)
+        return pd.DataFrame(rows, columns=names).infer_objects()
+
+    if is_csv_file(file_name):
+        data = read_csv(file_name, usecols=positions)
+    else:
+        data = pd.read_excel(file_name, usecols=positions)
+    # usecols按文件中的顺序返回列，这里按位置重新对应列名
+    data.columns = [header[p] for p in sorted(positions)]
+    return data[list(columns)]
+
+
+def _iter_csv_chunks(file_name, chunksize):
+    total = os.path.getsize(file_name)
+    options = csv_options(file_name)
+    with open(file_name, 'rb') as f:
+        for chunk in pd.read_csv(f, chunksize=chunksize, **options):
+            yield chunk, f.tell(), total
+
+
+def _iter_xlsx_chunks(file_name, chunksize):
+    from openpyxl import load_workbook
+    workbook = load_workbook(file_name, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        total = max((sheet.max_row or 1) - 1, 0)
+        rows_iter = sheet.iter_rows(values_only=True)
+        header = next(rows_iter, None)
+        if header is None:
+            return
+        columns = normalize_header(header)
+        rows = []
+        done = 0
+        for row in rows_iter:
+            rows.append(row)
+            if len(rows) >= chunksize:
+                done += len(rows)
+                yield pd.DataFrame(rows, columns=columns), done, max(total, done)
+                rows = []
+        done += len(rows)
+        # 即使没有数据行也要返回一个空块，保证表头可用
+        if rows or done == 0:
+            yield pd.DataFrame(rows, columns=columns), done, max(total, done)
+    finally:
+        workbook.close()
+
+
+def iter_dataset_chunks(file_name, chunksize=CHUNK_ROWS):
+    """分块读取数据集
+
+    每次产生 (数据块, 已完成量, 总量)。CSV文件的进度单位为字节，
+    Excel文件为行数。
+    """
+    if is_csv_file(file_name):
+        yield from _iter_csv_chunks(file_name, chunksize)
+    elif is_xlsx_file(file_name):
+        yield from _iter_xlsx_chunks(file_name, chunksize)
+    else:
+        # xls格式由xlrd一次性解析
+        data = pd.read_excel(file_name)
+        yield data, len(data), len(data)
+
+
+def combine_chunks(chunks):
+    """合并分块读取的数据"""
+    if not chunks:
+        return pd.DataFrame()
+    if len(chunks) == 1:
+        data = chunks[0]
+    else:
+        data = pd.concat(chunks, ignore_index=True)
+    # openpyxl逐行读取的列均为object类型，需要重新推断
+    return data.infer_objects()
+
+
+def read_dataset(file_name):
+    """一次性读取整个数据集"""
+    return combine_chunks([chunk for chunk, _, _ in iter_dataset_chunks(file_name)])
+
+
+def list_dataset_files(directory):
+    """列出目录及其子目录中的数据集文件，按路径排序"""
+    files = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            # 跳过Excel打开文件时产生的临时文件
+            if name.lower().endswith(DATASET_EXTENSIONS) and not name.startswith('~$'):
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def source_names(files):
+    """每个文件在来源列中的名称：相对于所有文件共同目录的路径"""
+    paths = [os.path.abspath(f) for f in files]
+    try:
+        common = os.path.commonpath(paths)
+    except ValueError:
+        # Windows下位于不同盘符的文件没有共同目录
+        return paths
+    if len(paths) == 1:
+        common = os.path.dirname(common)
+    return [os.path.relpath(path, common) for path in paths]
+
+
+def union_columns(headers):
+    """合并多个表头，列按首次出现的顺序排列"""
+    columns = []
+    seen = set()
+    for header in headers:
+        for col in header:
+            if col not in seen:
+                seen.add(col)
+                columns.append(col)
+    return columns
+
+
+def source_column_name(columns):
+    """来源列的列名，与已有的列重名时加上编号"""
+    name = SOURCE_COLUMN
+    i = 1
+    while name in columns:
+        name = f'{SOURCE_COLUMN}.{i}'
+        i += 1
+    return name
+
+
+def iter_shards(files, workers=None, mp_context=None):
+    """在进程池中并行解析多个文件，按完成的先后产生 (序号, 数据)
+
+    只有一个文件或一个进程时直接在当前进程中读取。提前关闭生成器
+    （例如取消加载）时不再等待尚未完成的文件。
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+    if workers == 1:
+        for i, file_name in enumerate(files):
+            yield i, read_dataset(file_name)
+        return
+
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=mp_context)
+    try:
+        futures = {executor.submit(read_dataset, file_name): i for i, file_name in enumerate(files)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                data = future.result()
+            except Exception as e:
+                raise RuntimeError(f'读取 {files[i]} 时出错: {e}') from e
+            yield i, data
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def merge_shards(frames, sources):
+    """按列名合并多个文件的数据，并增加记录每行来源文件的列
+
+    列取所有文件的并集，按首次出现的顺序排列，文件中缺少的列填充
+    空值；同名列在不同文件中类型不同时由pandas统一为兼容的类型。
+    来源列为category类型，放在最后一列。
+    """
+    columns = union_columns([frame.columns for frame in frames])
+    aligned = [frame if list(frame.columns) == columns else frame.reindex(columns=columns)
+               for frame in frames]
+    if len(aligned) == 1:
+        data = aligned[0].reset_index(drop=True)
+    else:
+        data = pd.concat(aligned, ignore_index=True)
+    data = data.infer_objects()
+
+    codes = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+    data[source_column_name(columns)] = pd.Categorical.from_codes(codes, categories=sources)
+    return data
+
+
+def read_dataset_files(files, workers=None, mp_context=None):
+    """并行读取多个文件并合并为一个数据集"""
+    frames = [None] * len(files)
+    for i, data in iter_shards(files, workers, mp_context):
+        frames[i] = data
+    return merge_shards(frames, source_names(files))
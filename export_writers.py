@@ -0,0 +1,420 @@
+import os
+import gzip
+import json
+import queue
+import threading
+import importlib.util
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+
+# 每批写入的行数
+EXPORT_CHUNK_ROWS = 20000
+# Excel每个工作表最多 1048576 行，其中一行是表头
+EXCEL_MAX_ROWS = 1048576
+EXCEL_MAX_DATA_ROWS = EXCEL_MAX_ROWS - 1
+# 拆分方式：多个工作表（只用于Excel）或多个文件
+SPLIT_SHEETS = 'sheets'
+SPLIT_FILES = 'files'
+PART_POLL_SECONDS = 0.2  # 等待部分文件写完时检查取消的间隔
+
+
+class ExportCancelled(Exception):
+    """导出被用户取消"""
+
+
+def column_chunk(series, start, stop, row_order=None):
+    """取出第 start 到 stop 行的列数据
+
+    row_order 为行在列中的位置，给出时按该顺序取出。
+    """
+    if row_order is None:
+        return series.iloc[start:stop]
+    return series.take(row_order[start:stop])
+
+
+def column_values(series, start, stop, row_order=None):
+    """取出一段列数据并转换为Python对象，缺失值转换为None"""
+    chunk = column_chunk(series, start, stop, row_order)
+    values = chunk.astype(object)
+    return values.where(chunk.notna(), None).tolist()
+
+
+def split_ranges(total, rows_per_part):
+    """把 total 行按每部分 rows_per_part 行拆分，返回 [(起始行, 结束行)]
+
+    没有数据时返回一个空的部分，输出仍然包含表头。
+    """
+    if rows_per_part < 1:
+        raise ValueError('每部分的行数必须大于0')
+    if total == 0:
+        return [(0, 0)]
+    return [(start, min(start + rows_per_part, total)) for start in range(0, total, rows_per_part)]
+
+
+def write_excel_streaming(columns, headers, file_name, row_order=None,
+                          chunk_rows=EXPORT_CHUNK_ROWS, progress=None, rows_per_sheet=None):
+    """以openpyxl只写模式分批写出Excel文件
+
+    columns 为各列的Series，不会复制整个数据集；每次只转换
+    chunk_rows 行。row_order 给出时按该行顺序写出。
+    progress(已写行数, 总行数) 返回False时取消导出。
+    超过 rows_per_sheet 行（默认为Excel工作表的行数上限）时写入多个
+    工作表，每个工作表都有表头。返回 [(工作表名, 起始行, 结束行)]。
+    """
+    from openpyxl import Workbook
+
+    rows_per_sheet = min(rows_per_sheet or EXCEL_MAX_DATA_ROWS, EXCEL_MAX_DATA_ROWS)
+    total = len(columns[0]) if columns else 0
+    ranges = split_ranges(total, rows_per_sheet)
+
+    workbook = Workbook(write_only=True)
+    sheets = []
+    for part, (part_start, part_stop) in enumerate(ranges, 1):
+        title = f'Sheet{part}' if len(ranges) > 1 else None
+        sheet = workbook.create_sheet(title)
+        sheet.append([str(header) for header in headers])
+        for start in range(part_start, part_stop, chunk_rows):
+            stop = min(start + chunk_rows, part_stop)
+            block = [column_values(column, start, stop, row_order) for column in columns]
+            for row in zip(*block):
+                sheet.append(row)
+            if progress is not None and progress(stop, total) is False:
+                # 结束工作表的临时文件，未完成的写入在回收时才结束会报错
+                sheet.close()
+                raise ExportCancelled()
+        sheets.append((sheet.title, part_start, part_stop))
+
+    workbook.save(file_name)
+    return sheets
+
+
+def iter_blocks(columns, headers, row_order=None, chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """按行分批取出数据，生成以 headers 为列名的DataFrame
+
+    每批写出后（生成器恢复时）调用 progress(已写行数, 总行数)，返回
+    False时抛出ExportCancelled。
+    """
+    names = [str(header) for header in headers]
+    total = len(columns[0]) if columns else 0
+    for start in range(0, total, chunk_rows):
+        stop = min(start + chunk_rows, total)
+        block = pd.DataFrame({
+            i: column_chunk(column, start, stop, row_order).array
+            for i, column in enumerate(columns)
+        })
+        block.columns = names
+        yield block
+        if progress is not None and progress(stop, total) is False:
+            raise ExportCancelled()
+
+
+def write_csv_streaming(columns, headers, file_name, row_order=None,
+                        chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """分批写出CSV文件，文件名以 .gz 结尾时用gzip压缩
+
+    编码为带BOM的UTF-8，Excel可以直接打开中文内容。参数与
+    write_excel_streaming 相同。
+    """
+    if file_name.lower().endswith('.gz'):
+        f = gzip.open(file_name, 'wt', compresslevel=6, encoding='utf-8-sig', newline='')
+    else:
+        f = open(file_name, 'w', encoding='utf-8-sig', newline='')
+    with f:
+        pd.DataFrame(columns=[str(header) for header in headers]).to_csv(f, index=False)
+        for block in iter_blocks(columns, headers, row_order, chunk_rows, progress):
+            block.to_csv(f, index=False, header=False)
+
+
+def write_jsonl_streaming(columns, headers, file_name, row_order=None,
+                          chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """分批写出JSON Lines文件，每行一条记录，缺失值写为null"""
+    with open(file_name, 'w', encoding='utf-8', newline='\n') as f:
+        for block in iter_blocks(columns, headers, row_order, chunk_rows, progress):
+            if len(block):
+                text = block.to_json(orient='records', lines=True, force_ascii=False,
+                                     date_format='iso')
+                # 较新的pandas在最后一条记录后已经换行，较旧的版本没有
+                f.write(text if text.endswith('\n') else text + '\n')
+
+
+def column_dtype(column):
+    """列的dtype；磁盘列存储的列没有dtype，由各个不同取值推断"""
+    dtype = getattr(column, 'dtype', None)
+    if dtype is None and hasattr(column, 'uniques'):
+        dtype = pd.Series(column.uniques, dtype=object).infer_objects().dtype
+    return dtype
+
+
+def arrow_schema(columns, headers):
+    """Parquet/Feather输出的表结构
+
+    数值、布尔和日期时间列保留原来的类型，其余的列（文本、混合类型、
+    值替换后的列）都写为字符串。
+    """
+    import pyarrow as pa
+
+    fields = []
+    for column, header in zip(columns, headers):
+        dtype = column_dtype(column)
+        arrow_type = pa.string()
+        if dtype is not None and (pd.api.types.is_numeric_dtype(dtype)
+                                  or pd.api.types.is_bool_dtype(dtype)
+                                  or pd.api.types.is_datetime64_any_dtype(dtype)):
+            try:
+                arrow_type = pa.Array.from_pandas(pd.Series([], dtype=dtype)).type
+            except (TypeError, ValueError, pa.ArrowException):
+                pass
+        fields.append(pa.field(str(header), arrow_type))
+    return pa.schema(fields)
+
+
+def arrow_batch(block, schema):
+    """把一批数据转换为符合表结构的RecordBatch"""
+    import pyarrow as pa
+
+    arrays = []
+    for i, field in enumerate(schema):
+        values = block.iloc[:, i]
+        if pa.types.is_string(field.type):
+            arrays.append(pa.array(values.astype(str).to_numpy(object), type=field.type,
+                                   mask=values.isna().to_numpy()))
+        else:
+            arrays.append(pa.Array.from_pandas(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_parquet_streaming(columns, headers, file_name, row_order=None,
+                            chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """分批写出Parquet文件（snappy压缩），每批为一个行组"""
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(columns, headers)
+    with pq.ParquetWriter(file_name, schema, compression='snappy') as writer:
+        for block in iter_blocks(columns, headers, row_order, chunk_rows, progress):
+            writer.write_batch(arrow_batch(block, schema))
+
+
+def write_feather_streaming(columns, headers, file_name, row_order=None,
+                            chunk_rows=EXPORT_CHUNK_ROWS, progress=None):
+    """分批写出Feather (Arrow IPC) 文件，用lz4压缩"""
+    import pyarrow as pa
+
+    schema = arrow_schema(columns, headers)
+    options = pa.ipc.IpcWriteOptions(compression='lz4')
+    with pa.OSFile(file_name, 'wb') as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+        for block in iter_blocks(columns, headers, row_order, chunk_rows, progress):
+            writer.write_batch(arrow_batch(block, schema))
+
+
+# 导出格式: 格式名 -> (说明, 扩展名, 写出函数)，只包含依赖已安装的格式
+EXPORT_FORMATS = {}
+
+
+def register_format(name, description, extension, writer, requires=None):
+    """注册导出格式
+
+    writer(columns, headers, file_name, row_order=None, progress=None)
+    分批写出选中的列。requires 为写出需要的模块名，没有安装时不注册
+    （只检查是否安装，不导入）。返回是否注册。
+    """
+    if requires is not None and importlib.util.find_spec(requires) is None:
+        return False
+    EXPORT_FORMATS[name] = (description, extension, writer)
+    return True
+
+
+register_format('xlsx', 'Excel工作簿', '.xlsx', write_excel_streaming)
+register_format('csv', 'CSV', '.csv', write_csv_streaming)
+register_format('csv.gz', '压缩的CSV (gzip)', '.csv.gz', write_csv_streaming)
+register_format('parquet', 'Parquet', '.parquet', write_parquet_streaming, requires='pyarrow')
+register_format('feather', 'Feather', '.feather', write_feather_streaming, requires='pyarrow')
+register_format('jsonl', 'JSON Lines', '.jsonl', write_jsonl_streaming)
+
+
+def manifest_file_name(file_name):
+    return file_name + '.manifest.json'
+
+
+def write_manifest(file_name, format_name, headers, parts, total):
+    """写出拆分导出的清单，列出每个部分（工作表或文件）包含的行
+
+    parts 为 [(部分名, 起始行, 结束行)]，清单中的行号从1开始，不含表头。
+    返回清单文件名。
+    """
+    manifest = manifest_file_name(file_name)
+    content = {
+        'file': os.path.basename(file_name),
+        'format': format_name,
+        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'total_rows': total,
+        'columns': [str(header) for header in headers],
+        'parts': [
+            {'name': name, 'first_row': start + 1, 'last_row': stop, 'rows': stop - start}
+            for name, start, stop in parts
+        ],
+    }
+    with open(manifest, 'w', encoding='utf-8') as f:
+        json.dump(content, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def part_file_name(file_name, format_name, part, digits=3):
+    """第 part 个部分的文件名：在扩展名前加上 _part001"""
+    extension = EXPORT_FORMATS[format_name][1]
+    if file_name.lower().endswith(extension):
+        return f'{file_name[:-len(extension)]}_part{part:0{digits}d}{extension}'
+    return f'{file_name}_part{part:0{digits}d}'
+
+
+def _write_part(format_name, data, headers, file_name):
+    """在工作进程中写出一个部分，data 为该部分已按行顺序取出的数据"""
+    writer = EXPORT_FORMATS[format_name][2]
+    writer([data[i] for i in data.columns], headers, file_name)
+
+
+def remove_files(file_names):
+    for file_name in file_names:
+        try:
+            os.remove(file_name)
+        except OSError:
+            pass
+
+
+def write_parts(columns, headers, file_name, format_name, rows_per_part, row_order=None,
+                workers=None, mp_context=None, progress=None):
+    """按每部分 rows_per_part 行拆分为多个文件，由多个进程并行写出
+
+    每个部分的数据在当前线程中按行顺序取出后交给工作进程写出，同时
+    取出的部分不超过进程数，内存占用约为进程数个部分的数据。全部写完
+    后写出清单。progress(已写行数, 总行数) 在每个部分写完时、以及等待
+    期间定期调用，返回False时终止工作进程并删除已写出的文件。
+    返回写出的文件列表，最后一个为清单。
+    """
+    total = len(columns[0]) if columns else 0
+    ranges = split_ranges(total, rows_per_part)
+    digits = max(3, len(str(len(ranges))))
+    files = [part_file_name(file_name, format_name, part, digits)
+             for part in range(1, len(ranges) + 1)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(ranges)))
+
+    finished = queue.Queue()  # 写完的部分: (部分序号, 错误)
+    try:
+        pool = (mp_context or multiprocessing).Pool(workers)
+        try:
+            done = 0
+            remaining = len(ranges)
+            submitted = 0
+            in_flight = 0
+            while remaining:
+                while submitted < len(ranges) and in_flight < workers:
+                    start, stop = ranges[submitted]
+                    data = pd.DataFrame({
+                        i: column_chunk(column, start, stop, row_order).to_numpy()
+                        for i, column in enumerate(columns)
+                    })
+                    pool.apply_async(_write_part, (format_name, data, headers, files[submitted]),
+                                     callback=lambda _, part=submitted: finished.put((part, None)),
+                                     error_callback=lambda e, part=submitted: finished.put((part, e)))
+                    submitted += 1
+                    in_flight += 1
+                try:
+                    part, error = finished.get(timeout=PART_POLL_SECONDS)
+                except queue.Empty:
+                    pass
+                else:
+                    if error is not None:
+                        raise RuntimeError(f'写出 {files[part]} 时出错: {error}') from error
+                    in_flight -= 1
+                    remaining -= 1
+                    start, stop = ranges[part]
+                    done += stop - start
+                if progress is not None and progress(done, total) is False:
+                    raise ExportCancelled()
+        finally:
+            # 取消或出错时直接终止正在写出的进程
+            pool.terminate()
+            pool.join()
+        parts = [(os.path.basename(part_file), start, stop)
+                 for part_file, (start, stop) in zip(files, ranges)]
+        manifest = write_manifest(file_name, format_name, headers, parts, total)
+    except BaseException:
+        remove_files(files + [manifest_file_name(file_name)])
+        raise
+    return files + [manifest]
+
+
+def write_output(columns, headers, format_name, file_name, row_order=None, split=None,
+                 mp_context=None, progress=None):
+    """写出一个输出，返回写出的文件列表
+
+    split 为 None 时Excel在超过行数上限时自动分为多个工作表；为
+    {'mode': SPLIT_SHEETS 或 SPLIT_FILES, 'rows_per_part': 行数} 时按
+    每部分的行数拆分为多个工作表（只用于Excel）或多个并行写出的文件。
+    拆分为多个部分时同时写出清单。
+    """
+    total = len(columns[0]) if columns else 0
+    if split is not None and split['mode'] == SPLIT_FILES and total > split['rows_per_part']:
+        return write_parts(columns, headers, file_name, format_name, split['rows_per_part'],
+                           row_order=row_order, mp_context=mp_context, progress=progress)
+
+    writer = EXPORT_FORMATS[format_name][2]
+    if writer is not write_excel_streaming:
+        writer(columns, headers, file_name, row_order=row_order, progress=progress)
+        return [file_name]
+    rows_per_sheet = None
+    if split is not None and split['mode'] == SPLIT_SHEETS:
+        rows_per_sheet = split['rows_per_part']
+    sheets = writer(columns, headers, file_name, row_order=row_order, progress=progress,
+                    rows_per_sheet=rows_per_sheet)
+    if len(sheets) > 1:
+        return [file_name, write_manifest(file_name, format_name, headers, sheets, total)]
+    return [file_name]
+
+
+def export_outputs(columns, headers, outputs, row_order=None, progress=None, cancel_event=None,
+                   split=None, mp_context=None):
+    """从同一份选中的列同时写出多个文件
+
+    outputs 为 [(格式名, 文件名)]。所有输出共用 columns 和 row_order，
+    不复制数据，每个输出在单独的线程中分批读取和写出。split 见
+    write_output()，拆分为多个文件时由 mp_context 的进程池并行写出。
+    progress(输出序号, 已写行数, 总行数) 在写出线程中调用。cancel_event
+    被设置或任一输出出错时，所有输出都停止并删除已写出的文件，
+    取消时抛出ExportCancelled，出错时抛出第一个错误。
+    返回所有写出的文件。
+    """
+    cancel_event = cancel_event or threading.Event()
+
+    def write(i, format_name, file_name):
+        def update(done, total):
+            if progress is not None:
+                progress(i, done, total)
+            return not cancel_event.is_set()
+        return write_output(columns, headers, format_name, file_name, row_order=row_order,
+                            split=split, mp_context=mp_context, progress=update)
+
+    error = None
+    written = []
+    with ThreadPoolExecutor(max_workers=max(1, len(outputs))) as executor:
+        futures = [executor.submit(write, i, format_name, file_name)
+                   for i, (format_name, file_name) in enumerate(outputs)]
+        for future in as_completed(futures):
+            try:
+                written.extend(future.result())
+            except ExportCancelled:
+                pass
+            except Exception as e:
+                if error is None:
+                    error = e
+                cancel_event.set()
+
+    if error is not None or cancel_event.is_set():
+        remove_files(written + [file_name for _, file_name in outputs])
+        if error is not None:
+            raise error
+        raise ExportCancelled()
+    return written
@@ -0,0 +1,99 @@
+"""批量处理命令行工具
+
+将保存的配置（字段选择、显示名称、值替换规则）应用到多个数据集文件，
+不需要图形界面。例如：
+
+    python file_info_batch.py -c 月度导出 -o output --sort descending "incoming/*.csv"
+    python file_info_batch.py -c 月度导出 -o output -f parquet "incoming/*.csv"
+"""
+import os
+import sys
+import glob
+import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pipeline import load_config, process_file, output_names, duplicate_outputs
+from config_store import DEFAULT_CONFIG_DB
+from export_writers import EXPORT_FORMATS
+
+
+def expand_inputs(patterns):
+    """展开输入的通配符，去除重复的文件"""
+    files = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+        for file_name in matches:
+            path = os.path.abspath(file_name)
+            if path not in seen and os.path.isfile(path):
+                seen.add(path)
+                files.append(file_name)
+    return files
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='将保存的配置批量应用到数据集文件并导出')
+    parser.add_argument('inputs', nargs='+', help='输入文件或通配符（支持 ** 递归匹配）')
+    parser.add_argument('-c', '--config', required=True, help='配置ID或配置名称')
+    parser.add_argument('-o', '--output-dir', required=True, help='输出目录')
+    parser.add_argument('-f', '--format', choices=list(EXPORT_FORMATS), default='xlsx',
+                        help='导出格式（默认为xlsx）')
+    parser.add_argument('--config-file', default=DEFAULT_CONFIG_DB,
+                        help='配置数据库路径（也可以是旧版本的 .json 配置文件）')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='并行处理的进程数（默认为CPU核数）')
+    parser.add_argument('--sort', choices=['ascending', 'descending'],
+                        help='按选中字段的有效元素数量排序')
+    parser.add_argument('--invalid-token', action='append', dest='invalid_tokens',
+                        help='排序时视为无效的取值，可多次指定（默认为 "Not performed"）')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    try:
+        config_id, config = load_config(args.config_file, args.config)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f'错误: {e}', file=sys.stderr)
+        return 2
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print('错误: 没有找到匹配的输入文件', file=sys.stderr)
+        return 2
+
+    # 多个进程同时写出同名的文件会互相覆盖，提交之前检查
+    names = output_names(files)
+    duplicates = duplicate_outputs(names)
+    if duplicates:
+        print(f'错误: 多个输入文件的输出文件名相同: {", ".join(duplicates)}', file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    print(f'使用配置 "{config["name"]}" ({config_id}) 处理 {len(files)} 个文件')
+
+    failed = 0
+    workers = max(1, min(args.workers, len(files)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(process_file, file_name, config, args.output_dir,
+                            args.sort, args.invalid_tokens, args.format, name): file_name
+            for file_name, name in zip(files, names)
+        }
+        for future in as_completed(futures):
+            file_name = futures[future]
+            try:
+                output_file = future.result()
+                print(f'完成: {file_name} -> {output_file}')
+            except Exception as e:
+                failed += 1
+                print(f'失败: {file_name}: {e}', file=sys.stderr)
+
+    print(f'共处理 {len(files)} 个文件，成功 {len(files) - failed} 个，失败 {failed} 个')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
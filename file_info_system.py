@@ -1,19 +1,192 @@
+import time
+
+# 程序启动时间，用于记录窗口显示前的耗时
+STARTUP_TIME = time.perf_counter()
+
 import sys
 import os
-import json
-import pandas as pd
-import numpy as np
-import xlrd
+import re
+import threading
+import multiprocessing
 
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                           QPushButton, QFileDialog, QListWidget, QLabel, 
+                           QPushButton, QFileDialog, QListView, QLabel, 
                            QMessageBox, QCheckBox, QHBoxLayout, QDialog,
-                           QLineEdit, QListWidgetItem, QTableWidget, 
+                           QLineEdit, QTableWidget, 
                            QTableWidgetItem, QHeaderView, QComboBox,
                            QSpinBox, QDialogButtonBox, QInputDialog, QMenu,
-                           QGroupBox, QRadioButton, QButtonGroup)
-from PyQt5.QtCore import Qt
+                           QGroupBox, QRadioButton, QButtonGroup,
+                           QProgressBar, QTableView,
+                           QAbstractItemView, QStyledItemDelegate, QStyle,
+                           QStyleOptionButton, QStyleOptionViewItem, QPlainTextEdit)
+from PyQt5.QtCore import (Qt, QThread, pyqtSignal, QAbstractTableModel,
+                          QAbstractListModel, QSortFilterProxyModel,
+                          QModelIndex, QRect, QSize, QEvent)
+from PyQt5.QtGui import QKeySequence
+
+from dataset_cache import DatasetCache, file_fingerprint
+from config_store import ConfigStore, DEFAULT_CONFIG_DB, LEGACY_CONFIG_FILE
+from perf_trace import TRACER
+from lazy_imports import lazy_import, warm_up, import_report, IMPORT_TIMES
+
+# pandas、numpy以及依赖它们的模块在窗口显示后由后台线程预加载，
+# 在预加载完成前用到时再就地导入
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+dataset_io = lazy_import('dataset_io')
+memory_optimizer = lazy_import('memory_optimizer')
+export_writers = lazy_import('export_writers')
+transform_plan = lazy_import('transform_plan')
+column_index = lazy_import('column_index')
+value_mapping = lazy_import('value_mapping')
+column_store = lazy_import('column_store')
+WARM_UP_MODULES = ['numpy', 'pandas', 'openpyxl', 'dataset_io', 'memory_optimizer',
+                   'export_writers', 'transform_plan', 'column_index', 'value_mapping',
+                   'column_store']
+
+
+class DatasetLoader(QThread):
+    """在后台线程中分块加载数据集"""
+    header_ready = pyqtSignal(list)
+    progress = pyqtSignal('qint64', 'qint64', 'qint64')  # 已读行数, 已完成量, 总量
+    loaded = pyqtSignal(object, list)  # 数据集, 内存优化报告
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, file_name, cache=None, optimize=False, parent=None):
+        super().__init__(parent)
+        self.file_name = file_name
+        self.cache = cache
+        self.optimize = optimize
+
+    def run(self):
+        try:
+            # 优先从缓存读取
+            if self.cache is not None:
+                dataset = self.cache.get(self.file_name)
+                if dataset is not None:
+                    self.header_ready.emit(list(dataset.columns))
+                    self.progress.emit(len(dataset), 1, 1)
+                    self.finish(dataset)
+                    return
+
+            # 先读取表头，让字段列表尽快显示
+            self.header_ready.emit(dataset_io.read_header(self.file_name))
+
+            chunks = []
+            rows_read = 0
+            for chunk, done, total in dataset_io.iter_dataset_chunks(self.file_name):
+                if self.isInterruptionRequested():
+                    self.cancelled.emit()
+                    return
+                chunks.append(chunk)
+                rows_read += len(chunk)
+                self.progress.emit(rows_read, done, total)
+
+            if self.isInterruptionRequested():
+                self.cancelled.emit()
+                return
+            dataset = dataset_io.combine_chunks(chunks)
+            if self.cache is not None:
+                try:
+                    self.cache.put(self.file_name, dataset)
+                except Exception:
+                    # 缓存写入失败不影响本次加载
+                    pass
+            self.finish(dataset)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+    def finish(self, dataset):
+        report = []
+        if self.optimize:
+            dataset, report = memory_optimizer.optimize_memory(dataset)
+        self.loaded.emit(dataset, report)
+
+
+class StoreLoader(DatasetLoader):
+    """在后台线程中打开或建立磁盘列存储，用于读入内存后会超过内存预算的文件
+    
+    进度与普通加载相同（CSV为字节数，Excel为行数），列存储已存在时直接打开。
+    """
+    
+    def __init__(self, file_name, memory_budget, parent=None):
+        super().__init__(file_name, parent=parent)
+        self.memory_budget = memory_budget
+    
+    def run(self):
+        try:
+            self.header_ready.emit(dataset_io.read_header(self.file_name))
+            
+            def update_progress(rows_read, done, total):
+                self.progress.emit(rows_read, done, total)
+                return not self.isInterruptionRequested()
+            
+            store = column_store.open_store(self.file_name, memory_budget=self.memory_budget,
+                                            progress=update_progress)
+            self.loaded.emit(store, [])
+        except column_store.BuildCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class ShardedDatasetLoader(DatasetLoader):
+    """在进程池中并行加载多个分片文件，合并为一个数据集
+    
+    进度的单位为文件数。每个分片单独缓存，未改变的分片不再重新解析。
+    """
+    
+    def __init__(self, file_names, cache=None, optimize=False, parent=None):
+        super().__init__(file_names[0], cache, optimize, parent)
+        self.file_names = file_names
+    
+    def run(self):
+        try:
+            headers = [dataset_io.read_header(file_name) for file_name in self.file_names]
+            columns = dataset_io.union_columns(headers)
+            self.header_ready.emit(columns + [dataset_io.source_column_name(columns)])
+            
+            frames = [None] * len(self.file_names)
+            pending = []
+            for i, file_name in enumerate(self.file_names):
+                if self.cache is not None:
+                    frames[i] = self.cache.get(file_name)
+                if frames[i] is None:
+                    pending.append(i)
+            rows_read = sum(len(frame) for frame in frames if frame is not None)
+            done = len(frames) - len(pending)
+            self.progress.emit(rows_read, done, len(frames))
+            
+            # Qt程序中有多个线程，子进程用spawn方式启动而不是fork
+            shards = dataset_io.iter_shards([self.file_names[i] for i in pending],
+                                            mp_context=multiprocessing.get_context('spawn'))
+            try:
+                for j, frame in shards:
+                    if self.isInterruptionRequested():
+                        self.cancelled.emit()
+                        return
+                    i = pending[j]
+                    frames[i] = frame
+                    if self.cache is not None:
+                        try:
+                            self.cache.put(self.file_names[i], frame)
+                        except Exception:
+                            pass
+                    rows_read += len(frame)
+                    done += 1
+                    self.progress.emit(rows_read, done, len(frames))
+            finally:
+                shards.close()
+            
+            if self.isInterruptionRequested():
+                self.cancelled.emit()
+                return
+            self.finish(dataset_io.merge_shards(frames, dataset_io.source_names(self.file_names)))
+        except Exception as e:
+            self.failed.emit(str(e))
+
 
 class SaveConfigDialog(QDialog):
     def __init__(self, parent=None):
@@ -76,7 +249,7 @@ class LoadConfigDialog(QDialog):
         
         # 填充配置列表
         self.config_table.setRowCount(len(self.configs))
-        for i, (config_id, config) in enumerate(self.configs.items()):
+        for i, (config_id, config) in enumerate(self.configs):
             self.config_table.setItem(i, 0, QTableWidgetItem(config['name']))
             self.config_table.setItem(i, 1, QTableWidgetItem(config.get('date', '')))
             self.config_table.setItem(i, 2, QTableWidgetItem(config.get('description', '')))
@@ -110,15 +283,27 @@ class LoadConfigDialog(QDialog):
     def get_selected_config(self):
         return self.selected_config
 
+def parse_tokens(text):
+    """解析用逗号分隔的取值列表"""
+    return [token.strip() for token in re.split('[,，]', text) if token.strip()]
+
 class SortRowsDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, fields, display_names, settings=None, parent=None):
         super().__init__(parent)
         self.setWindowTitle('行排序设置')
-        self.setGeometry(300, 300, 400, 180)
+        self.setGeometry(300, 300, 500, 560)
+        self.fields = fields
+        self.display_names = display_names
         self.sort_settings = {
             'method': 'valid_count',  # 默认按有效元素数量排序
             'order': 'descending',    # 默认降序
+            'default_invalid_tokens': sorted(column_index.DEFAULT_INVALID_TOKENS),
+            'empty_is_invalid': False,
+            'field_invalid_tokens': {},  # 字段 -> 无效值列表，未设置的字段使用默认值
+            'sort_keys': [],  # 有效元素数量相同时的 (字段, 顺序)
         }
+        if settings:
+            self.sort_settings.update(settings)
         self.initUI()
         
     def initUI(self):
@@ -142,7 +327,10 @@ class SortRowsDialog(QDialog):
         
         self.ascending_radio = QRadioButton('升序 (少 → 多)')
         self.descending_radio = QRadioButton('降序 (多 → 少)')
-        self.descending_radio.setChecked(True)
+        if self.sort_settings['order'] == 'ascending':
+            self.ascending_radio.setChecked(True)
+        else:
+            self.descending_radio.setChecked(True)
         
         self.ascending_radio.toggled.connect(self.update_settings)
         self.descending_radio.toggled.connect(self.update_settings)
@@ -153,6 +341,59 @@ class SortRowsDialog(QDialog):
         order_group.setLayout(order_layout)
         layout.addWidget(order_group)
         
+        # 无效值设置
+        invalid_group = QGroupBox('无效值（NaN总是视为无效）')
+        invalid_layout = QVBoxLayout()
+        
+        invalid_layout.addWidget(QLabel('默认无效值（多个值用逗号分隔）:'))
+        self.default_tokens_input = QLineEdit(', '.join(self.sort_settings['default_invalid_tokens']))
+        invalid_layout.addWidget(self.default_tokens_input)
+        
+        self.empty_checkbox = QCheckBox('空字符串视为无效')
+        self.empty_checkbox.setChecked(self.sort_settings['empty_is_invalid'])
+        invalid_layout.addWidget(self.empty_checkbox)
+        
+        invalid_layout.addWidget(QLabel('按字段设置无效值（留空则使用默认值）:'))
+        self.tokens_table = QTableWidget(len(self.fields), 2)
+        self.tokens_table.setHorizontalHeaderLabels(['字段', '无效值'])
+        field_tokens = self.sort_settings['field_invalid_tokens']
+        for row, (field, display_name) in enumerate(zip(self.fields, self.display_names)):
+            name_item = QTableWidgetItem(str(display_name))
+            name_item.setFlags(name_item.flags() & ~Qt.ItemIsEditable)
+            self.tokens_table.setItem(row, 0, name_item)
+            self.tokens_table.setItem(row, 1, QTableWidgetItem(', '.join(field_tokens.get(field, []))))
+        header = self.tokens_table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+        invalid_layout.addWidget(self.tokens_table)
+        
+        invalid_group.setLayout(invalid_layout)
+        layout.addWidget(invalid_group)
+        
+        # 次要排序键
+        keys_group = QGroupBox('有效元素数量相同时依次按以下字段排序')
+        keys_layout = QVBoxLayout()
+        
+        self.keys_table = QTableWidget(0, 2)
+        self.keys_table.setHorizontalHeaderLabels(['字段', '顺序'])
+        self.keys_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        keys_layout.addWidget(self.keys_table)
+        for field, order in self.sort_settings['sort_keys']:
+            if field in self.fields:
+                self.add_sort_key(field, order)
+        
+        keys_button_layout = QHBoxLayout()
+        add_key_button = QPushButton('添加排序字段')
+        add_key_button.clicked.connect(lambda: self.add_sort_key())
+        remove_key_button = QPushButton('删除排序字段')
+        remove_key_button.clicked.connect(self.remove_sort_key)
+        keys_button_layout.addWidget(add_key_button)
+        keys_button_layout.addWidget(remove_key_button)
+        keys_layout.addLayout(keys_button_layout)
+        
+        keys_group.setLayout(keys_layout)
+        layout.addWidget(keys_group)
+        
         # 添加按钮
         button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         button_box.accepted.connect(self.accept)
@@ -161,6 +402,30 @@ class SortRowsDialog(QDialog):
         
         self.setLayout(layout)
     
+    def add_sort_key(self, field=None, order='ascending'):
+        """添加一个次要排序字段"""
+        row = self.keys_table.rowCount()
+        self.keys_table.insertRow(row)
+        
+        field_combo = QComboBox()
+        field_combo.addItems([str(name) for name in self.display_names])
+        if field in self.fields:
+            field_combo.setCurrentIndex(self.fields.index(field))
+        self.keys_table.setCellWidget(row, 0, field_combo)
+        
+        order_combo = QComboBox()
+        order_combo.addItems(['升序', '降序'])
+        order_combo.setCurrentIndex(0 if order == 'ascending' else 1)
+        self.keys_table.setCellWidget(row, 1, order_combo)
+    
+    def remove_sort_key(self):
+        """删除选中的（或最后一个）次要排序字段"""
+        row = self.keys_table.currentRow()
+        if row < 0:
+            row = self.keys_table.rowCount() - 1
+        if row >= 0:
+            self.keys_table.removeRow(row)
+    
     def update_settings(self):
         # 更新排序方法
         if self.valid_count_radio.isChecked():
@@ -173,12 +438,71 @@ class SortRowsDialog(QDialog):
             self.sort_settings['order'] = 'descending'
     
     def get_sort_settings(self):
+        self.update_settings()
+        self.sort_settings['default_invalid_tokens'] = parse_tokens(self.default_tokens_input.text())
+        self.sort_settings['empty_is_invalid'] = self.empty_checkbox.isChecked()
+        
+        field_tokens = {}
+        for row, field in enumerate(self.fields):
+            tokens = parse_tokens(self.tokens_table.item(row, 1).text())
+            if tokens:
+                field_tokens[field] = tokens
+        self.sort_settings['field_invalid_tokens'] = field_tokens
+        
+        sort_keys = []
+        for row in range(self.keys_table.rowCount()):
+            field = self.fields[self.keys_table.cellWidget(row, 0).currentIndex()]
+            order = 'ascending' if self.keys_table.cellWidget(row, 1).currentIndex() == 0 else 'descending'
+            sort_keys.append((field, order))
+        self.sort_settings['sort_keys'] = sort_keys
         return self.sort_settings
+    
+    def get_invalid_tokens(self):
+        """返回每个字段实际使用的无效值集合"""
+        settings = self.get_sort_settings()
+        invalid_tokens = {}
+        for field in self.fields:
+            tokens = set(settings['field_invalid_tokens'].get(field, settings['default_invalid_tokens']))
+            if settings['empty_is_invalid']:
+                tokens.add('')
+            invalid_tokens[field] = tokens
+        return invalid_tokens
+
+class DataFrameModel(QAbstractTableModel):
+    """直接基于数据列的只读表格模型，只在显示时读取可见的单元格"""
+    def __init__(self, columns, headers, row_order=None, parent=None):
+        super().__init__(parent)
+        # 保存底层数组，避免逐个单元格调用iloc
+        self.arrays = [column.array for column in columns]
+        self.headers = list(headers)
+        self.row_order = row_order  # 行在列中的位置，None表示原始顺序
+        self.row_count = len(columns[0]) if columns else 0
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.arrays)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            row = index.row()
+            if self.row_order is not None:
+                row = self.row_order[row]
+            return str(self.arrays[index.column()][row])
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return str(self.headers[section])
+        return str(section + 1)
 
 class PreviewDataDialog(QDialog):
-    def __init__(self, data, parent=None):
+    def __init__(self, columns, headers, row_order=None, parent=None):
         super().__init__(parent)
-        self.data = data
+        self.model = DataFrameModel(columns, headers, row_order, self)
         self.initUI()
         
     def initUI(self):
@@ -186,33 +510,41 @@ class PreviewDataDialog(QDialog):
         self.setGeometry(100, 100, 900, 600)
         
         layout = QVBoxLayout()
+        row_count = self.model.rowCount()
         
         # 添加控制面板
         control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel(f'共 {row_count} 行'))
         
-        # 预览行数选择
-        control_layout.addWidget(QLabel('预览行数:'))
+        # 跳转到指定行
+        control_layout.addWidget(QLabel('跳转到行:'))
         self.row_spinbox = QSpinBox()
-        self.row_spinbox.setRange(1, min(100, len(self.data)))
-        self.row_spinbox.setValue(min(10, len(self.data)))
-        self.row_spinbox.valueChanged.connect(self.update_preview)
+        self.row_spinbox.setRange(1, max(1, row_count))
+        self.row_spinbox.editingFinished.connect(self.jump_to_row)
         control_layout.addWidget(self.row_spinbox)
         
-        # 预览位置选择
+        # 快速定位
         control_layout.addWidget(QLabel('预览位置:'))
         self.position_combo = QComboBox()
         self.position_combo.addItems(['开头', '中间', '结尾'])
-        self.position_combo.currentIndexChanged.connect(self.update_preview)
+        self.position_combo.currentIndexChanged.connect(self.jump_to_position)
         control_layout.addWidget(self.position_combo)
         
         control_layout.addStretch()
         layout.addLayout(control_layout)
         
-        # 创建表格
-        self.table = QTableWidget()
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)  # 设置为只读
+        # 创建表格，只有可见的单元格会被读取
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setEditTriggers(QTableView.NoEditTriggers)  # 设置为只读
         
-        # 设置表格
+        # 固定行高，避免为计算行高遍历所有行
+        vertical_header = self.table.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(self.fontMetrics().height() + 8)
+        
+        # 按可见行调整列宽
+        self.table.resizeColumnsToContents()
         layout.addWidget(self.table)
         
         # 添加按钮
@@ -221,47 +553,485 @@ class PreviewDataDialog(QDialog):
         layout.addWidget(button_box)
         
         self.setLayout(layout)
-        
-        # 初始加载预览数据
-        self.update_preview()
     
-    def update_preview(self):
-        """更新预览表格"""
-        rows_to_show = self.row_spinbox.value()
+    def scroll_to_row(self, row):
+        """滚动到指定行（从0开始）"""
+        if self.model.rowCount() == 0:
+            return
+        index = self.model.index(row, 0)
+        self.table.scrollTo(index, QTableView.PositionAtTop)
+        self.table.selectRow(row)
+    
+    def jump_to_row(self):
+        self.scroll_to_row(self.row_spinbox.value() - 1)
+    
+    def jump_to_position(self):
+        """跳转到开头、中间或结尾"""
+        row_count = self.model.rowCount()
         position = self.position_combo.currentText()
-        
-        # 根据选择的位置获取数据
         if position == '开头':
-            preview_data = self.data.head(rows_to_show)
+            row = 0
         elif position == '结尾':
-            preview_data = self.data.tail(rows_to_show)
+            row = row_count - 1
         else:  # 中间
-            middle_idx = len(self.data) // 2
-            start_idx = max(0, middle_idx - rows_to_show // 2)
-            preview_data = self.data.iloc[start_idx:start_idx + rows_to_show]
-        
-        # 更新表格
-        self.table.setRowCount(len(preview_data))
-        self.table.setColumnCount(len(preview_data.columns))
-        self.table.setHorizontalHeaderLabels(preview_data.columns)
-        
-        # 填充数据
-        for row in range(len(preview_data)):
-            for col in range(len(preview_data.columns)):
-                value = str(preview_data.iloc[row, col])
-                item = QTableWidgetItem(value)
-                self.table.setItem(row, col, item)
-        
-        # 调整列宽
-        header = self.table.horizontalHeader()
-        for col in range(len(preview_data.columns)):
+            row = row_count // 2
+        self.row_spinbox.setValue(row + 1)
+        self.scroll_to_row(row)
+
+class ColumnIndexBuilder(QThread):
+    """加载完成后在后台为各列建立编码和取值计数索引"""
+    
+    def __init__(self, index, fields, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.fields = list(fields)
+    
+    def run(self):
+        for field_name in self.fields:
+            if self.isInterruptionRequested():
+                return
+            try:
+                self.index.build(field_name)
+            except Exception:
+                # 建立失败的列在使用时再建立，并在那时报告错误
+                continue
+
+class ModuleWarmup(QThread):
+    """窗口显示后在后台预加载导入耗时较长的模块"""
+    
+    def __init__(self, names, parent=None):
+        super().__init__(parent)
+        self.names = names
+    
+    def run(self):
+        threading.current_thread().name = 'ModuleWarmup'
+        warm_up(self.names)
+
+class ExportJob(QThread):
+    """后台导出任务：从同一份选中数据的快照同时写出多个文件
+    
+    快照只保存选中的列和行顺序的引用。原始数据不会被修改，之后的编辑、
+    排序都生成新的列和行顺序，因此不需要复制数据。
+    """
+    progress = pyqtSignal(int, 'qint64', 'qint64')  # 输出序号, 已写行数, 总行数
+    succeeded = pyqtSignal()
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    
+    def __init__(self, columns, headers, outputs, row_order=None, split=None, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.headers = headers
+        self.outputs = outputs  # [(格式名, 文件名)]
+        self.row_order = row_order
+        self.split = split  # 拆分设置，见 export_writers.write_output()
+        self.cancel_event = threading.Event()
+    
+    def row_count(self):
+        return len(self.columns[0]) if self.columns else 0
+    
+    def run(self):
+        try:
+            # Qt程序中有多个线程，写出部分文件的子进程用spawn方式启动
+            export_writers.export_outputs(self.columns, self.headers, self.outputs, self.row_order,
+                                          self.progress.emit, self.cancel_event, split=self.split,
+                                          mp_context=multiprocessing.get_context('spawn'))
+            self.succeeded.emit()
+        except export_writers.ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+    
+    def cancel(self):
+        self.cancel_event.set()
+
+class ExportDialog(QDialog):
+    """选择导出的文件名和格式，可以同时导出多个格式"""
+    def __init__(self, rows, cols, parent=None):
+        super().__init__(parent)
+        self.rows = rows
+        self.cols = cols
+        self.format_checkboxes = {}
+        self.initUI()
+    
+    def initUI(self):
+        self.setWindowTitle('导出数据')
+        self.setMinimumWidth(500)
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(f'导出选中的 {self.cols} 个字段, 共 {self.rows} 行'))
+        
+        # 文件名（不含扩展名），每个格式使用各自的扩展名
+        path_layout = QHBoxLayout()
+        path_layout.addWidget(QLabel('文件名:'))
+        self.path_input = QLineEdit()
+        path_layout.addWidget(self.path_input)
+        browse_button = QPushButton('浏览...')
+        browse_button.clicked.connect(self.browse)
+        path_layout.addWidget(browse_button)
+        layout.addLayout(path_layout)
+        
+        format_group = QGroupBox('格式（可多选，同时写出）')
+        format_layout = QVBoxLayout()
+        for format_name, (description, extension, _) in export_writers.EXPORT_FORMATS.items():
+            checkbox = QCheckBox(f'{description} ({extension})')
+            checkbox.setChecked(format_name == 'xlsx')
+            format_layout.addWidget(checkbox)
+            self.format_checkboxes[format_name] = checkbox
+        format_group.setLayout(format_layout)
+        layout.addWidget(format_group)
+        
+        # 拆分：Excel每个工作表最多 1048575 行数据，超过时自动分为多个工作表
+        split_group = QGroupBox('拆分')
+        split_layout = QHBoxLayout()
+        self.split_combo = QComboBox()
+        self.split_combo.addItem('自动（Excel超过行数上限时分为多个工作表）', None)
+        self.split_combo.addItem('多个工作表（仅Excel）', export_writers.SPLIT_SHEETS)
+        self.split_combo.addItem('多个文件（多进程并行写出）', export_writers.SPLIT_FILES)
+        self.split_combo.currentIndexChanged.connect(self.update_split_rows)
+        split_layout.addWidget(self.split_combo)
+        split_layout.addWidget(QLabel('每部分行数:'))
+        self.split_rows_spin = QSpinBox()
+        self.split_rows_spin.setRange(1000, export_writers.EXCEL_MAX_DATA_ROWS)
+        self.split_rows_spin.setSingleStep(100000)
+        self.split_rows_spin.setValue(export_writers.EXCEL_MAX_DATA_ROWS)
+        split_layout.addWidget(self.split_rows_spin)
+        split_group.setLayout(split_layout)
+        layout.addWidget(split_group)
+        self.update_split_rows()
+        
+        button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        button_box.accepted.connect(self.on_accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+        self.setLayout(layout)
+    
+    def browse(self):
+        file_name, _ = QFileDialog.getSaveFileName(self, '选择导出文件名', self.path_input.text())
+        if file_name:
+            self.path_input.setText(self.base_name(file_name))
+    
+    def base_name(self, file_name):
+        """去掉已知格式的扩展名"""
+        for _, extension, _ in export_writers.EXPORT_FORMATS.values():
+            if file_name.lower().endswith(extension):
+                return file_name[:-len(extension)]
+        return file_name
+    
+    def on_accept(self):
+        if not self.path_input.text().strip():
+            QMessageBox.warning(self, '警告', '请输入文件名!')
+            return
+        if not self.get_outputs():
+            QMessageBox.warning(self, '警告', '请至少选择一种格式!')
+            return
+        self.accept()
+    
+    def get_outputs(self):
+        """返回 [(格式名, 文件名)]"""
+        base = self.base_name(self.path_input.text().strip())
+        return [(format_name, base + export_writers.EXPORT_FORMATS[format_name][1])
+                for format_name, checkbox in self.format_checkboxes.items() if checkbox.isChecked()]
+    
+    def update_split_rows(self):
+        self.split_rows_spin.setEnabled(self.split_combo.currentData() is not None)
+    
+    def get_split(self):
+        """返回拆分设置，自动拆分时返回None"""
+        mode = self.split_combo.currentData()
+        if mode is None:
+            return None
+        return {'mode': mode, 'rows_per_part': self.split_rows_spin.value()}
+
+class ExportJobsPanel(QDialog):
+    """导出任务队列（非模态）
+    
+    任务按提交的顺序依次执行，每个任务的多个输出同时写出。每个输出显示
+    一个进度条，排队中和进行中的任务都可以取消。
+    """
+    HEADERS = ['任务', '格式', '文件', '进度', '状态']
+    FINISHED = ('完成', '已取消', '出错')
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries = []  # 每个任务: {'id', 'job', 'status', 'bars', 'status_items', 'span'}
+        self.next_id = 1
+        self.running = None
+        self.initUI()
+    
+    def initUI(self):
+        self.setWindowTitle('导出任务')
+        self.setGeometry(250, 250, 800, 400)
+        layout = QVBoxLayout()
+        
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+        
+        button_layout = QHBoxLayout()
+        cancel_button = QPushButton('取消所选任务')
+        cancel_button.clicked.connect(self.cancel_selected)
+        button_layout.addWidget(cancel_button)
+        clear_button = QPushButton('清除已结束的任务')
+        clear_button.clicked.connect(self.clear_finished)
+        button_layout.addWidget(clear_button)
+        button_layout.addStretch()
+        close_button = QPushButton('关闭')
+        close_button.clicked.connect(self.hide)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+        
+        self.setLayout(layout)
+    
+    def add_job(self, job):
+        """添加任务到队列末尾，没有正在进行的任务时立即开始"""
+        entry = {'id': self.next_id, 'job': job, 'status': '排队中',
+                 'bars': [], 'status_items': [], 'span': None}
+        self.next_id += 1
+        for format_name, file_name in job.outputs:
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            id_item = QTableWidgetItem(str(entry['id']))
+            id_item.setData(Qt.UserRole, entry['id'])
+            self.table.setItem(row, 0, id_item)
+            self.table.setItem(row, 1, QTableWidgetItem(format_name))
+            self.table.setItem(row, 2, QTableWidgetItem(file_name))
+            bar = QProgressBar()
+            bar.setRange(0, 1000)
+            bar.setValue(0)
+            self.table.setCellWidget(row, 3, bar)
+            status_item = QTableWidgetItem('排队中')
+            self.table.setItem(row, 4, status_item)
+            entry['bars'].append(bar)
+            entry['status_items'].append(status_item)
+        
+        job.progress.connect(lambda i, done, total: self.on_progress(entry, i, done, total))
+        job.succeeded.connect(lambda: self.on_job_finished(entry, '完成'))
+        job.cancelled.connect(lambda: self.on_job_finished(entry, '已取消'))
+        job.failed.connect(lambda message: self.on_job_finished(entry, '出错', message))
+        self.entries.append(entry)
+        self.start_next()
+        return entry['id']
+    
+    def set_status(self, entry, status, message=''):
+        entry['status'] = status
+        for item in entry['status_items']:
+            item.setText(status)
+            item.setToolTip(message)
+    
+    def start_next(self):
+        if self.running is not None:
+            return
+        for entry in self.entries:
+            if entry['status'] == '排队中':
+                job = entry['job']
+                # 导出在后台线程中进行，不做cProfile分析
+                entry['span'] = TRACER.span(
+                    'export_data', rows=job.row_count(), cols=len(job.columns),
+                    formats=','.join(format_name for format_name, _ in job.outputs),
+                    split=job.split)
+                self.set_status(entry, '进行中')
+                self.running = entry
+                job.start()
+                return
+    
+    def on_progress(self, entry, i, done, total):
+        if total > 0:
+            entry['bars'][i].setValue(int(done * 1000 / total))
+        entry['bars'][i].setFormat(f'{done}/{total} 行')
+    
+    def on_job_finished(self, entry, status, message=''):
+        entry['job'].wait()
+        span_status = {'完成': 'ok', '已取消': 'cancelled', '出错': 'error'}[status]
+        if message:
+            entry['span'].finish(span_status, error=message)
+        else:
+            entry['span'].finish(span_status)
+        self.set_status(entry, status, message)
+        if status == '完成':
+            for bar in entry['bars']:
+                bar.setValue(1000)
+        self.running = None
+        parent = self.parent()
+        if parent is not None:
+            text = f'导出任务 {entry["id"]} {status}' + (f': {message}' if message else '')
+            parent.statusBar().showMessage(text)
+        self.start_next()
+    
+    def selected_entries(self):
+        ids = {self.table.item(index.row(), 0).data(Qt.UserRole)
+               for index in self.table.selectionModel().selectedRows()}
+        return [entry for entry in self.entries if entry['id'] in ids]
+    
+    def cancel_entry(self, entry):
+        if entry['status'] == '排队中':
+            self.set_status(entry, '已取消')
+        elif entry['status'] == '进行中':
+            entry['job'].cancel()
+            self.set_status(entry, '正在取消...')
+    
+    def cancel_selected(self):
+        for entry in self.selected_entries():
+            self.cancel_entry(entry)
+    
+    def has_active_jobs(self):
+        return any(entry['status'] not in self.FINISHED for entry in self.entries)
+    
+    def cancel_all(self):
+        """取消所有任务并等待正在进行的任务结束（关闭程序时调用）"""
+        for entry in self.entries:
+            self.cancel_entry(entry)
+        if self.running is not None:
+            self.running['job'].wait()
+    
+    def clear_finished(self):
+        finished = {entry['id'] for entry in self.entries if entry['status'] in self.FINISHED}
+        for row in reversed(range(self.table.rowCount())):
+            if self.table.item(row, 0).data(Qt.UserRole) in finished:
+                self.table.removeRow(row)
+        for entry in self.entries:
+            if entry['id'] in finished:
+                entry['job'].deleteLater()
+        self.entries = [entry for entry in self.entries if entry['id'] not in finished]
+
+class PerformancePanel(QDialog):
+    """显示最近操作的耗时、数据规模和内存变化"""
+    HEADERS = ['时间', '操作', '耗时 (ms)', '行数', '列数', '内存变化 (MB)', '状态']
+    
+    def __init__(self, tracer, parent=None):
+        super().__init__(parent)
+        self.tracer = tracer
+        self.summaries = []  # 每行的性能分析摘要
+        self.initUI()
+        for record, summary in tracer.recent:
+            self.add_record(record, summary)
+        tracer.listeners.append(self.add_record)
+        self.finished.connect(self.stop_listening)
+    
+    def initUI(self):
+        self.setWindowTitle('性能记录')
+        self.setGeometry(200, 200, 800, 500)
+        
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(f'最近的操作（完整记录见 {os.path.abspath(self.tracer.log_file)}）：'))
+        
+        # 创建表格
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.currentCellChanged.connect(self.show_summary)
+        layout.addWidget(self.table)
+        
+        # 性能分析摘要
+        self.summary_text = QPlainTextEdit()
+        self.summary_text.setReadOnly(True)
+        self.summary_text.setPlaceholderText('选中带有性能分析的操作后在此显示耗时最多的函数')
+        layout.addWidget(self.summary_text)
+        
+        # 添加按钮
+        button_layout = QHBoxLayout()
+        self.profile_button = QPushButton('分析下一个操作 (cProfile)')
+        self.profile_button.setCheckable(True)
+        self.profile_button.setChecked(self.tracer.profile_next)
+        self.profile_button.toggled.connect(self.tracer.request_profile)
+        button_layout.addWidget(self.profile_button)
+        import_button = QPushButton('模块导入耗时')
+        import_button.clicked.connect(lambda: self.summary_text.setPlainText(import_report()))
+        button_layout.addWidget(import_button)
+        button_layout.addStretch()
+        close_button = QPushButton('关闭')
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+        
+        self.setLayout(layout)
+    
+    def add_record(self, record, summary=None):
+        """在表格顶部添加一条记录"""
+        self.table.insertRow(0)
+        self.summaries.insert(0, summary)
+        memory = record.get('memory_delta_mb')
+        values = [
+            record.get('time', ''),
+            record.get('operation', ''),
+            f"{record.get('duration_ms', 0):.1f}",
+            record.get('rows', ''),
+            record.get('cols', ''),
+            '' if memory is None else f'{memory:+.1f}',
+            record.get('status', '') + (' (已分析)' if summary else ''),
+        ]
+        for col, value in enumerate(values):
+            self.table.setItem(0, col, QTableWidgetItem(str(value)))
+        if record.get('error'):
+            self.table.item(0, len(values) - 1).setToolTip(record['error'])
+        # 分析过的操作完成后恢复按钮状态
+        self.profile_button.setChecked(self.tracer.profile_next)
+    
+    def stop_listening(self):
+        if self.add_record in self.tracer.listeners:
+            self.tracer.listeners.remove(self.add_record)
+    
+    def show_summary(self, row, *_):
+        if 0 <= row < len(self.summaries):
+            self.summary_text.setPlainText(self.summaries[row] or '')
+
+class MemoryReportDialog(QDialog):
+    def __init__(self, report, parent=None):
+        super().__init__(parent)
+        self.report = report
+        self.initUI()
+        
+    def initUI(self):
+        self.setWindowTitle('内存优化报告')
+        self.setGeometry(200, 200, 700, 400)
+        
+        layout = QVBoxLayout()
+        
+        # 添加汇总信息
+        total_before = sum(item['bytes_before'] for item in self.report)
+        total_after = sum(item['bytes_after'] for item in self.report)
+        layout.addWidget(QLabel(
+            f'数据集加载成功！内存占用 {total_before / 1024 ** 2:.1f} MB → '
+            f'{total_after / 1024 ** 2:.1f} MB'
+        ))
+        
+        # 创建表格
+        table = QTableWidget()
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.setColumnCount(5)
+        table.setHorizontalHeaderLabels(['字段', '原类型', '新类型', '优化前 (KB)', '优化后 (KB)'])
+        table.setRowCount(len(self.report))
+        for row, item in enumerate(self.report):
+            table.setItem(row, 0, QTableWidgetItem(str(item['column'])))
+            table.setItem(row, 1, QTableWidgetItem(item['dtype_before']))
+            table.setItem(row, 2, QTableWidgetItem(item['dtype_after']))
+            table.setItem(row, 3, QTableWidgetItem(f"{item['bytes_before'] / 1024:.1f}"))
+            table.setItem(row, 4, QTableWidgetItem(f"{item['bytes_after'] / 1024:.1f}"))
+        
+        header = table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        for col in range(1, 5):
             header.setSectionResizeMode(col, QHeaderView.ResizeToContents)
+        layout.addWidget(table)
+        
+        # 添加按钮
+        button_box = QDialogButtonBox(QDialogButtonBox.Ok)
+        button_box.accepted.connect(self.accept)
+        layout.addWidget(button_box)
+        
+        self.setLayout(layout)
 
 class ExportValuesDialog(QDialog):
-    def __init__(self, field_name, values, parent=None):
+    def __init__(self, field_name, value_counts, parent=None):
         super().__init__(parent)
         self.field_name = field_name
-        self.values = values
+        self.value_counts = value_counts
         self.initUI()
     
     def initUI(self):
@@ -271,7 +1041,7 @@ class ExportValuesDialog(QDialog):
         layout = QVBoxLayout()
         
         # 添加说明标签
-        layout.addWidget(QLabel(f'将字段 "{self.field_name}" 的所有唯一值导出为替换规则模板文件'))
+        layout.addWidget(QLabel(f'将字段 "{self.field_name}" 的所有唯一值及出现次数导出为替换规则模板文件'))
         
         # 添加按钮
         button_layout = QHBoxLayout()
@@ -294,9 +1064,11 @@ class ExportValuesDialog(QDialog):
     
     def export_values(self, format_type):
         # 创建数据框
+        values = self.value_counts.index.to_numpy()
         df = pd.DataFrame({
-            '原始值': self.values,
-            '新值': self.values  # 初始时新值与原始值相同
+            '原始值': values,
+            '出现次数': self.value_counts.to_numpy(),
+            '新值': values  # 初始时新值与原始值相同
         })
         
         # 获取保存路径
@@ -338,7 +1110,10 @@ class ImportRulesDialog(QDialog):
         layout = QVBoxLayout()
         
         # 添加说明标签
-        layout.addWidget(QLabel('请选择替换规则文件(Excel或CSV)：\n文件应包含"原始值"和"新值"两列'))
+        layout.addWidget(QLabel(
+            '请选择替换规则文件(Excel或CSV)：\n文件应包含"原始值"和"新值"两列\n'
+            '可选的"匹配方式"列：精确（默认）、包含（替换子串）、正则（正则表达式替换）'
+        ))
         
         # 添加文件选择按钮
         self.file_button = QPushButton('选择规则文件')
@@ -379,7 +1154,7 @@ class ImportRulesDialog(QDialog):
             try:
                 # 读取规则文件
                 if file_name.endswith('.csv'):
-                    self.rules_data = pd.read_csv(file_name)
+                    self.rules_data = dataset_io.read_csv(file_name)
                 else:
                     self.rules_data = pd.read_excel(file_name, engine='openpyxl')
                 
@@ -390,6 +1165,16 @@ class ImportRulesDialog(QDialog):
                     self.rules_data = None
                     return
                 
+                # 检查匹配方式，并预先编译模式规则以便及时报告错误的正则表达式
+                kinds = self.match_kinds()
+                unknown = set(kinds) - {value_mapping.MATCH_EXACT, value_mapping.MATCH_CONTAINS,
+                                        value_mapping.MATCH_REGEX}
+                if unknown:
+                    QMessageBox.warning(self, '警告', f'未知的匹配方式：{"、".join(sorted(unknown))}')
+                    self.rules_data = None
+                    return
+                value_mapping.compile_pattern_rules(self.pattern_rules())
+                
                 self.import_button.setEnabled(True)
                 QMessageBox.information(self, '成功', '规则文件加载成功！')
                 
@@ -397,23 +1182,144 @@ class ImportRulesDialog(QDialog):
                 QMessageBox.critical(self, '错误', f'加载规则文件时出错：{str(e)}')
                 self.rules_data = None
     
+    def match_kinds(self):
+        """每条规则的匹配方式"""
+        if '匹配方式' not in self.rules_data.columns:
+            return pd.Series(value_mapping.MATCH_EXACT, index=self.rules_data.index)
+        kinds = self.rules_data['匹配方式'].fillna(value_mapping.MATCH_EXACT).astype(str).str.strip()
+        return kinds.replace('', value_mapping.MATCH_EXACT)
+    
+    def pattern_rules(self):
+        """包含和正则规则，按文件中的顺序排列，新值为空表示删除匹配的部分"""
+        patterns = self.rules_data[self.match_kinds() != value_mapping.MATCH_EXACT]
+        return list(zip(
+            self.match_kinds()[patterns.index],
+            patterns['原始值'].astype(str),
+            patterns['新值'].fillna('').astype(str)
+        ))
+    
     def get_rules_and_field(self):
         if self.rules_data is not None:
+            exact = self.rules_data[self.match_kinds() == value_mapping.MATCH_EXACT]
             return {
                 'field': self.field_combo.currentText(),
                 'rules': dict(zip(
-                    self.rules_data['原始值'].astype(str),
-                    self.rules_data['新值'].astype(str)
-                ))
+                    exact['原始值'].astype(str),
+                    exact['新值'].astype(str)
+                )),
+                'patterns': self.pattern_rules()
             }
         return None
 
+class ValueCountsModel(QAbstractTableModel):
+    """字段唯一值的分页表格模型，只记录被修改的值"""
+    PAGE_SIZE = 1000
+    HEADERS = ['原始值', '出现次数', '新值']
+    
+    def __init__(self, value_counts, parent=None):
+        super().__init__(parent)
+        self.values = value_counts.index.to_numpy()
+        self.counts = value_counts.to_numpy()
+        # 值的字符串形式，与替换规则的键一致
+        self.keys = pd.Index(self.values).map(str).to_numpy(dtype=object)
+        self.edited_values = {}  # 原始值 -> 新值，只包含修改过的值
+        self.filtered = np.arange(len(self.values))  # 过滤后的唯一值位置
+        self.page = 0
+        self.rows = self.filtered[:self.PAGE_SIZE]  # 当前页的唯一值位置
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        position = self.rows[index.row()]
+        key = self.keys[position]
+        if index.column() == 0:
+            return key
+        if index.column() == 1:
+            return str(self.counts[position])
+        return self.edited_values.get(key, key)
+    
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or index.column() != 2:
+            return False
+        key = self.keys[self.rows[index.row()]]
+        if value == key:
+            self.edited_values.pop(key, None)
+        else:
+            self.edited_values[key] = value
+        self.dataChanged.emit(index, index)
+        return True
+    
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() == 2:
+            flags |= Qt.ItemIsEditable
+        return flags
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return str(self.page * self.PAGE_SIZE + section + 1)
+    
+    def page_count(self):
+        return max(1, -(-len(self.filtered) // self.PAGE_SIZE))
+    
+    def set_page(self, page):
+        self.beginResetModel()
+        self.page = min(max(page, 0), self.page_count() - 1)
+        start = self.page * self.PAGE_SIZE
+        self.rows = self.filtered[start:start + self.PAGE_SIZE]
+        self.endResetModel()
+    
+    def set_filter(self, text):
+        """按包含的文本过滤唯一值"""
+        if text:
+            mask = pd.Series(self.keys).str.contains(text, regex=False).to_numpy()
+            self.filtered = np.flatnonzero(mask)
+        else:
+            self.filtered = np.arange(len(self.values))
+        self.set_page(0)
+    
+    def apply_rules(self, rules, patterns=()):
+        """将替换规则应用到存在的唯一值上，返回被修改的值的数量
+        
+        精确规则按值查找；包含和正则规则编译为一个组合的匹配，只在没有
+        精确规则的非空唯一值上各执行一次，与数据的行数无关。
+        """
+        matched = pd.Index(self.keys).intersection(pd.Index(list(rules)))
+        count = 0
+        for key in matched:
+            if rules[key] != key:
+                self.edited_values[key] = rules[key]
+                count += 1
+        
+        if patterns:
+            substitute = value_mapping.compile_pattern_rules(patterns)
+            for pos in np.flatnonzero(pd.notna(self.values)):
+                key = self.keys[pos]
+                if key in rules:
+                    continue
+                new_value = substitute(key)
+                if new_value != key:
+                    self.edited_values[key] = new_value
+                    count += 1
+        self.set_page(self.page)
+        return count
+
 class EditValuesDialog(QDialog):
-    def __init__(self, field_name, values, parent=None):
+    def __init__(self, field_name, value_counts, parent=None):
         super().__init__(parent)
         self.field_name = field_name
-        self.values = values
-        self.edited_values = {}  # 存储修改后的值映射
+        self.value_counts = value_counts
+        self.model = ValueCountsModel(value_counts, self)
+        self.values = self.model.values
         self.initUI()
         
     def initUI(self):
@@ -423,23 +1329,43 @@ class EditValuesDialog(QDialog):
         layout = QVBoxLayout()
         
         # 添加说明标签
-        layout.addWidget(QLabel(f'字段 "{self.field_name}" 的所有唯一值：'))
+        layout.addWidget(QLabel(f'字段 "{self.field_name}" 共有 {len(self.values)} 个唯一值（按出现次数排序）：'))
+        
+        # 添加搜索框
+        search_layout = QHBoxLayout()
+        search_layout.addWidget(QLabel('搜索:'))
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText('输入要查找的值')
+        self.search_input.textChanged.connect(self.filter_values)
+        search_layout.addWidget(self.search_input)
+        layout.addLayout(search_layout)
         
         # 创建表格
-        self.table = QTableWidget()
-        self.table.setColumnCount(2)
-        self.table.setHorizontalHeaderLabels(['原始值', '新值'])
+        self.table = QTableView()
+        self.table.setModel(self.model)
         
         # 设置表格列宽
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.Stretch)
-        header.setSectionResizeMode(1, QHeaderView.Stretch)
-        
-        # 填充表格
-        self.populate_table()
+        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.Stretch)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         
         layout.addWidget(self.table)
         
+        # 添加分页控件
+        page_layout = QHBoxLayout()
+        self.prev_button = QPushButton('上一页')
+        self.prev_button.clicked.connect(lambda: self.change_page(-1))
+        self.next_button = QPushButton('下一页')
+        self.next_button.clicked.connect(lambda: self.change_page(1))
+        self.page_label = QLabel()
+        page_layout.addWidget(self.prev_button)
+        page_layout.addWidget(self.page_label)
+        page_layout.addWidget(self.next_button)
+        page_layout.addStretch()
+        layout.addLayout(page_layout)
+        
         # 添加按钮布局
         button_layout = QHBoxLayout()
         
@@ -469,54 +1395,53 @@ class EditValuesDialog(QDialog):
         layout.addLayout(confirm_layout)
         
         self.setLayout(layout)
+        
+        self.model.dataChanged.connect(self.update_page_label)
+        self.update_page_label()
+    
+    def update_page_label(self):
+        """更新分页信息"""
+        page_count = self.model.page_count()
+        self.page_label.setText(
+            f'第 {self.model.page + 1}/{page_count} 页，'
+            f'匹配 {len(self.model.filtered)} 个值，已修改 {len(self.model.edited_values)} 个'
+        )
+        self.prev_button.setEnabled(self.model.page > 0)
+        self.next_button.setEnabled(self.model.page < page_count - 1)
+    
+    def change_page(self, step):
+        self.model.set_page(self.model.page + step)
+        self.update_page_label()
+    
+    def filter_values(self, text):
+        self.model.set_filter(text)
+        self.update_page_label()
     
     def export_initial_values(self):
         """导出初始值为替换规则模板"""
-        dialog = ExportValuesDialog(self.field_name, self.values, self)
+        dialog = ExportValuesDialog(self.field_name, self.value_counts, self)
         dialog.exec_()
     
-    def populate_table(self):
-        """填充表格数据"""
-        self.table.setRowCount(len(self.values))
-        for i, value in enumerate(self.values):
-            # 原始值（不可编辑）
-            original_item = QTableWidgetItem(str(value))
-            original_item.setFlags(original_item.flags() & ~Qt.ItemIsEditable)
-            self.table.setItem(i, 0, original_item)
-            
-            # 新值（可编辑）
-            new_value_item = QTableWidgetItem(str(value))
-            self.table.setItem(i, 1, new_value_item)
-    
     def import_rules(self):
         """导入替换规则"""
         dialog = ImportRulesDialog([self.field_name], self)
         if dialog.exec_() == QDialog.Accepted:
             result = dialog.get_rules_and_field()
-            if result and result['rules']:
-                # 更新表格中的值
-                for row in range(self.table.rowCount()):
-                    original_value = self.table.item(row, 0).text()
-                    if original_value in result['rules']:
-                        self.table.item(row, 1).setText(result['rules'][original_value])
-                
-                QMessageBox.information(self, '成功', '替换规则已应用到表格')
+            if result and (result['rules'] or result['patterns']):
+                count = self.model.apply_rules(result['rules'], result['patterns'])
+                self.update_page_label()
+                QMessageBox.information(self, '成功', f'替换规则已应用到表格（{count} 个值被修改）')
     
     def apply_changes(self):
-        # 收集修改后的值
-        for row in range(self.table.rowCount()):
-            original_value = self.table.item(row, 0).text()
-            new_value = self.table.item(row, 1).text()
-            if original_value != new_value:
-                self.edited_values[original_value] = new_value
-        
-        if self.edited_values:
+        # 结束正在进行的编辑
+        self.table.setCurrentIndex(QModelIndex())
+        if self.model.edited_values:
             self.accept()
         else:
             self.reject()
     
     def get_edited_values(self):
-        return self.edited_values
+        return self.model.edited_values
 
 class RenameDialog(QDialog):
     def __init__(self, old_name, parent=None):
@@ -552,51 +1477,197 @@ class RenameDialog(QDialog):
     def get_new_name(self):
         return self.name_input.text()
 
-class FieldListItem(QWidget):
-    def __init__(self, field_name, parent=None):
+class FieldListModel(QAbstractListModel):
+    """字段列表模型，字段顺序、显示名称和勾选状态都保存在普通的数据结构中"""
+    order_changed = pyqtSignal()  # 字段顺序被拖动或移动按钮改变
+    
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.field_name = field_name
-        self.display_name = field_name
-        self.setup_ui()
-        
-    def setup_ui(self):
-        layout = QHBoxLayout()
-        layout.setContentsMargins(5, 2, 5, 2)
-        
-        # 复选框
-        self.checkbox = QCheckBox(self.display_name)
-        layout.addWidget(self.checkbox)
-        
-        # 向上移动按钮
-        self.up_button = QPushButton('↑')
-        self.up_button.setFixedWidth(30)
-        layout.addWidget(self.up_button)
-        
-        # 向下移动按钮
-        self.down_button = QPushButton('↓')
-        self.down_button.setFixedWidth(30)
-        layout.addWidget(self.down_button)
-        
-        # 重命名按钮
-        self.rename_button = QPushButton('重命名')
-        layout.addWidget(self.rename_button)
-        
-        # 编辑值按钮
-        self.edit_values_button = QPushButton('编辑值')
-        layout.addWidget(self.edit_values_button)
-        
-        self.setLayout(layout)
+        self.fields = []  # 按显示顺序排列的字段名
+        self.display_names = {}  # 字段 -> 显示名称，只包含改过名的字段
+        self.checked = set()  # 勾选的字段
+        self.tooltips = {}  # 字段 -> 提示信息
+    
+    def set_fields(self, fields, display_names=None, checked=None, tooltips=None):
+        self.beginResetModel()
+        self.fields = list(fields)
+        self.display_names = dict(display_names or {})
+        self.checked = set(checked or ())
+        if tooltips is not None:
+            self.tooltips = dict(tooltips)
+        self.endResetModel()
+    
+    def display_name(self, field_name):
+        return self.display_names.get(field_name, field_name)
+    
+    def states(self):
+        """按顺序返回每个字段的 (字段名, 显示名称, 是否选中)"""
+        return [(field, self.display_name(field), field in self.checked) for field in self.fields]
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.fields)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        field_name = self.fields[index.row()]
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return str(self.display_name(field_name))
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if field_name in self.checked else Qt.Unchecked
+        if role == Qt.ToolTipRole:
+            return self.tooltips.get(field_name)
+        if role == Qt.UserRole:
+            return field_name
+        return None
+    
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        self.set_checked([self.fields[index.row()]], value == Qt.Checked)
+        return True
+    
+    def flags(self, index):
+        if not index.isValid():
+            # 允许拖放到两个字段之间
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable | Qt.ItemIsDragEnabled
+    
+    def supportedDropActions(self):
+        return Qt.MoveAction
+    
+    def set_checked(self, fields, is_checked):
+        """批量勾选或取消勾选字段"""
+        if is_checked:
+            self.checked.update(fields)
+        else:
+            self.checked.difference_update(fields)
+        if self.fields:
+            self.dataChanged.emit(self.index(0), self.index(len(self.fields) - 1), [Qt.CheckStateRole])
+    
+    def set_display_name(self, field_name, display_name):
+        if display_name == field_name:
+            self.display_names.pop(field_name, None)
+        else:
+            self.display_names[field_name] = display_name
+        row = self.fields.index(field_name)
+        self.dataChanged.emit(self.index(row), self.index(row))
+    
+    def move_rows(self, rows, dest):
+        """将指定行移动到第 dest 行之前，保持它们之间的相对顺序"""
+        rows = sorted(set(rows))
+        moving = set(rows)
+        remaining = [field for row, field in enumerate(self.fields) if row not in moving]
+        dest -= sum(1 for row in rows if row < dest)
+        new_fields = remaining[:dest] + [self.fields[row] for row in rows] + remaining[dest:]
+        if new_fields == self.fields:
+            return False
+        
+        # 只调整布局，视图保留滚动位置和选中的行
+        self.layoutAboutToBeChanged.emit()
+        new_rows = {field: row for row, field in enumerate(new_fields)}
+        old_indexes = self.persistentIndexList()
+        self.changePersistentIndexList(
+            old_indexes, [self.index(new_rows[self.fields[index.row()]]) for index in old_indexes])
+        self.fields = new_fields
+        self.layoutChanged.emit()
+        self.order_changed.emit()
+        return True
+
+class FieldListView(QListView):
+    """字段列表视图，拖动时由模型直接调整字段顺序"""
+    rows_dropped = pyqtSignal(list, int)  # (拖动的行, 目标行)，均为视图中的行号
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setDragDropMode(QAbstractItemView.InternalMove)
+        self.setDropIndicatorShown(True)
+    
+    def dropEvent(self, event):
+        if event.source() is not self:
+            event.ignore()
+            return
+        index = self.indexAt(event.pos())
+        row = index.row() if index.isValid() else self.model().rowCount()
+        if index.isValid() and self.dropIndicatorPosition() == QAbstractItemView.BelowItem:
+            row += 1
+        rows = [index.row() for index in self.selectedIndexes()]
+        self.rows_dropped.emit(rows, row)
+        # 字段已经移动，不让视图再删除被拖动的项
+        event.setDropAction(Qt.CopyAction)
+        event.accept()
+
+class FieldItemDelegate(QStyledItemDelegate):
+    """绘制字段行的复选框、名称和操作按钮，按钮只是绘制出来，不创建控件"""
+    BUTTONS = [('up', '↑', 30), ('down', '↓', 30), ('rename', '重命名', 64), ('edit_values', '编辑值', 64)]
+    ROW_HEIGHT = 28
+    button_clicked = pyqtSignal(int, str)  # (视图中的行, 按钮)
+    
+    def button_rects(self, rect):
+        """从右向左排列按钮，返回 [(按钮, 文字, 区域)]"""
+        rects = []
+        right = rect.right() - 4
+        for action, text, width in reversed(self.BUTTONS):
+            rects.append((action, text, QRect(right - width + 1, rect.top() + 2, width, rect.height() - 4)))
+            right -= width + 4
+        return rects[::-1]
+    
+    def paint(self, painter, option, index):
+        buttons = self.button_rects(option.rect)
+        # 复选框和名称只使用按钮左侧的区域
+        item_option = QStyleOptionViewItem(option)
+        self.initStyleOption(item_option, index)
+        item_option.rect = QRect(option.rect.left(), option.rect.top(),
+                                 buttons[0][2].left() - option.rect.left() - 4, option.rect.height())
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, item_option, painter, option.widget)
+        
+        for _, text, rect in buttons:
+            button_option = QStyleOptionButton()
+            button_option.rect = rect
+            button_option.text = text
+            button_option.state = QStyle.State_Enabled | QStyle.State_Raised
+            style.drawControl(QStyle.CE_PushButton, button_option, painter, option.widget)
+    
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        return QSize(size.width() + sum(width + 4 for _, _, width in self.BUTTONS),
+                     max(size.height(), self.ROW_HEIGHT))
+    
+    def editorEvent(self, event, model, option, index):
+        if event.type() in (QEvent.MouseButtonPress, QEvent.MouseButtonRelease, QEvent.MouseButtonDblClick):
+            for action, _, rect in self.button_rects(option.rect):
+                if rect.contains(event.pos()):
+                    # 点击按钮时不改变选中的行，也不开始拖动
+                    if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+                        self.button_clicked.emit(index.row(), action)
+                    return True
+        return super().editorEvent(event, model, option, index)
 
 class FileInfoSystem(QMainWindow):
     def __init__(self):
         super().__init__()
         self.initUI()
-        self.dataset = None
+        self.dataset = None  # 原始数据，加载后不再修改
+        self.plan = None  # 值替换、重命名、字段顺序和行顺序的变换计划
         self.available_columns = []
-        self.field_mapping = {}  # 用于存储字段重命名映射
-        self.value_mapping = {}  # 用于存储值映射
-        self.configs = {}  # 用于存储配置
-        self.config_file = 'file_info_system_configs.json'
+        self.config_store = None  # 配置存储
+        self.config_file = DEFAULT_CONFIG_DB
+        self.loader = None  # 后台加载线程
+        self.load_span = None  # 正在进行的加载的计时记录
+        self.index_builder = None  # 后台建立列索引的线程
+        self.dataset_file = None  # 当前数据集文件路径
+        self.dataset_files = []  # 当前数据集的所有文件（多个分片时）
+        self.dataset_cache = DatasetCache()  # 已解析数据集的磁盘缓存
+        self.header_only = False  # 是否只加载了表头，列在使用时再读取
+        self.header_fingerprint = None  # 只加载表头时文件的路径、大小和修改时间
+        self.column_dtypes = {}  # 样本推断的列类型
+        self.sort_settings = None  # 上一次的排序设置
+        self.warmup = None  # 后台预加载模块的线程
+        self.export_panel = ExportJobsPanel(self)  # 后台导出任务队列
+        self.reported_imports = 0  # 已写入性能记录的模块导入数量
         
         # 加载已保存的配置
         self.load_configs()
@@ -617,21 +1688,87 @@ class FileInfoSystem(QMainWindow):
         self.load_button.clicked.connect(self.load_dataset)
         file_buttons_layout.addWidget(self.load_button)
         
+        self.load_dir_button = QPushButton('选择文件夹', self)
+        self.load_dir_button.setToolTip('加载文件夹（包括子文件夹）中的所有CSV和Excel文件并合并')
+        self.load_dir_button.clicked.connect(self.load_dataset_directory)
+        file_buttons_layout.addWidget(self.load_dir_button)
+        
+        # 仅加载表头选项
+        self.header_only_checkbox = QCheckBox('仅加载表头（按需读取选中的列）', self)
+        file_buttons_layout.addWidget(self.header_only_checkbox)
+        
+        # 加载后优化内存选项
+        self.optimize_checkbox = QCheckBox('加载后优化内存', self)
+        file_buttons_layout.addWidget(self.optimize_checkbox)
+        
+        # 磁盘列存储选项，文件预计超过内存预算时也会自动使用
+        self.store_checkbox = QCheckBox('磁盘列存储', self)
+        self.store_checkbox.setToolTip('不把数据集完整读入内存，而是在首次加载时建立磁盘上的列存储，'
+                                       '适合超过内存的大文件。文件预计超过内存预算时自动使用')
+        file_buttons_layout.addWidget(self.store_checkbox)
+        file_buttons_layout.addWidget(QLabel('内存预算:', self))
+        self.memory_budget_spin = QSpinBox(self)
+        self.memory_budget_spin.setRange(64, 1024 * 1024)
+        self.memory_budget_spin.setSingleStep(256)
+        self.memory_budget_spin.setSuffix(' MB')
+        # 与 column_store.DEFAULT_MEMORY_BUDGET 相同，这里不导入列存储模块以免拖慢启动
+        self.memory_budget_spin.setValue(1024)
+        file_buttons_layout.addWidget(self.memory_budget_spin)
+        
         # 添加配置按钮
         self.config_button = QPushButton('配置', self)
         self.config_button.setContextMenuPolicy(Qt.CustomContextMenu)
         self.config_button.customContextMenuRequested.connect(self.show_config_menu)
         file_buttons_layout.addWidget(self.config_button)
         
+        # 添加缓存按钮
+        self.cache_button = QPushButton('缓存', self)
+        cache_menu = QMenu(self)
+        cache_menu.addAction('清除当前文件缓存', self.invalidate_dataset_cache)
+        cache_menu.addAction('清空全部缓存', self.clear_dataset_cache)
+        self.cache_button.setMenu(cache_menu)
+        file_buttons_layout.addWidget(self.cache_button)
+        
+        # 添加性能记录按钮
+        self.performance_button = QPushButton('性能', self)
+        self.performance_button.clicked.connect(self.show_performance_panel)
+        file_buttons_layout.addWidget(self.performance_button)
+        
         layout.addLayout(file_buttons_layout)
         
         # 添加可用字段列表标签
         self.fields_label = QLabel('可选信息种类：', self)
         layout.addWidget(self.fields_label)
         
-        # 添加可选字段列表
-        self.fields_list = QListWidget(self)
-        layout.addWidget(self.fields_list)
+        # 添加字段搜索和批量勾选
+        fields_tools_layout = QHBoxLayout()
+        self.field_search_input = QLineEdit(self)
+        self.field_search_input.setPlaceholderText('搜索字段')
+        self.field_search_input.textChanged.connect(self.filter_fields)
+        fields_tools_layout.addWidget(self.field_search_input)
+        
+        check_all_button = QPushButton('全部勾选', self)
+        check_all_button.clicked.connect(lambda: self.check_visible_fields(True))
+        fields_tools_layout.addWidget(check_all_button)
+        
+        uncheck_all_button = QPushButton('全部取消', self)
+        uncheck_all_button.clicked.connect(lambda: self.check_visible_fields(False))
+        fields_tools_layout.addWidget(uncheck_all_button)
+        layout.addLayout(fields_tools_layout)
+        
+        # 添加可选字段列表（可拖动调整顺序）
+        self.field_model = FieldListModel(self)
+        self.field_model.order_changed.connect(self.on_field_order_changed)
+        self.field_proxy = QSortFilterProxyModel(self)
+        self.field_proxy.setSourceModel(self.field_model)
+        self.field_proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.fields_view = FieldListView(self)
+        self.fields_view.setModel(self.field_proxy)
+        self.field_delegate = FieldItemDelegate(self.fields_view)
+        self.field_delegate.button_clicked.connect(self.on_field_button_clicked)
+        self.fields_view.setItemDelegate(self.field_delegate)
+        self.fields_view.rows_dropped.connect(self.on_fields_dropped)
+        layout.addWidget(self.fields_view)
         
         # 添加按钮布局
         button_layout = QHBoxLayout()
@@ -648,15 +1785,43 @@ class FileInfoSystem(QMainWindow):
         self.sort_button.setEnabled(False)
         button_layout.addWidget(self.sort_button)
         
+        # 添加撤销和重做按钮
+        self.undo_button = QPushButton('撤销', self)
+        self.undo_button.clicked.connect(self.undo)
+        self.undo_button.setShortcut(QKeySequence.Undo)
+        button_layout.addWidget(self.undo_button)
+        
+        self.redo_button = QPushButton('重做', self)
+        self.redo_button.clicked.connect(self.redo)
+        self.redo_button.setShortcut(QKeySequence.Redo)
+        button_layout.addWidget(self.redo_button)
+        self.update_undo_buttons()
+        
         # 添加导出按钮
-        self.export_button = QPushButton('导出选中字段到Excel', self)
-        self.export_button.clicked.connect(self.export_to_excel)
+        self.export_button = QPushButton('导出选中字段', self)
+        self.export_button.clicked.connect(self.export_data)
         self.export_button.setEnabled(False)
         button_layout.addWidget(self.export_button)
         
+        export_jobs_button = QPushButton('导出任务', self)
+        export_jobs_button.clicked.connect(self.show_export_jobs)
+        button_layout.addWidget(export_jobs_button)
+        
         layout.addLayout(button_layout)
         
         central_widget.setLayout(layout)
+        
+        # 添加加载进度显示
+        self.load_progress_label = QLabel(self)
+        self.load_progress_bar = QProgressBar(self)
+        self.load_progress_bar.setRange(0, 1000)
+        self.load_progress_bar.setMaximumWidth(300)
+        self.cancel_load_button = QPushButton('取消加载', self)
+        self.cancel_load_button.clicked.connect(self.cancel_loading)
+        self.statusBar().addWidget(self.load_progress_label)
+        self.statusBar().addPermanentWidget(self.load_progress_bar)
+        self.statusBar().addPermanentWidget(self.cancel_load_button)
+        self.set_loading_widgets_visible(False)
     
     def show_config_menu(self, pos):
         """显示配置菜单"""
@@ -677,22 +1842,22 @@ class FileInfoSystem(QMainWindow):
             self.manage_configs()
     
     def load_configs(self):
-        """从文件加载所有配置"""
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    self.configs = json.load(f)
-            except Exception as e:
-                QMessageBox.warning(self, '警告', f'加载配置文件时出错: {str(e)}')
-                self.configs = {}
+        """打开配置数据库，首次打开时导入旧版本的JSON配置文件"""
+        try:
+            self.config_store = ConfigStore(self.config_file, legacy_file=LEGACY_CONFIG_FILE)
+        except Exception as e:
+            QMessageBox.warning(self, '警告', f'加载配置文件时出错: {str(e)}')
+            self.config_store = None
     
-    def save_configs(self):
-        """保存所有配置到文件"""
+    def list_configs(self):
+        """返回所有配置的名称、描述和日期，不读取配置内容"""
+        if self.config_store is None:
+            return []
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.configs, f, ensure_ascii=False, indent=2)
+            return self.config_store.list_configs()
         except Exception as e:
-            QMessageBox.critical(self, '错误', f'保存配置文件时出错: {str(e)}')
+            QMessageBox.warning(self, '警告', f'读取配置时出错: {str(e)}')
+            return []
     
     def save_config(self):
         """保存当前配置"""
@@ -711,58 +1876,50 @@ class FileInfoSystem(QMainWindow):
             return
         
         # 获取当前配置状态
-        selected_fields = []
         field_states = {}
-        
-        for i in range(self.fields_list.count()):
-            item = self.fields_list.item(i)
-            field_widget = self.fields_list.itemWidget(item)
-            
-            if field_widget:
-                field_name = field_widget.field_name
-                display_name = field_widget.display_name
-                is_checked = field_widget.checkbox.isChecked()
-                
-                field_states[field_name] = {
-                    'display_name': display_name,
-                    'is_checked': is_checked,
-                    'order': i
-                }
-                
-                if is_checked:
-                    selected_fields.append(field_name)
+        for i, (field_name, display_name, is_checked) in enumerate(self.current_field_states()):
+            field_states[field_name] = {
+                'display_name': display_name,
+                'is_checked': is_checked,
+                'order': i
+            }
         
         # 创建配置对象
         from datetime import datetime
-        config_id = f"config_{len(self.configs) + 1}_{int(datetime.now().timestamp())}"
         config = {
             'name': config_info['name'],
             'description': config_info['description'],
             'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'field_states': field_states,
-            'value_mapping': self.value_mapping
+            'value_mapping': self.plan.value_mapping if self.plan is not None else {}
         }
         
-        # 添加到配置列表
-        self.configs[config_id] = config
-        
-        # 保存配置
-        self.save_configs()
+        # 保存配置，只写入这一条记录
+        if self.config_store is None:
+            self.load_configs()
+        try:
+            with TRACER.span('save_config', cols=len(field_states),
+                             mapped_fields=len(config['value_mapping'])):
+                self.config_store.save(config)
+        except Exception as e:
+            QMessageBox.critical(self, '错误', f'保存配置文件时出错: {str(e)}')
+            return
         
         QMessageBox.information(self, '成功', f'配置 "{config_info["name"]}" 已保存!')
     
     def load_config(self):
         """加载配置"""
-        if not self.configs:
+        configs = self.list_configs()
+        if not configs:
             QMessageBox.information(self, '提示', '没有保存的配置!')
             return
         
-        if self.dataset is None:
+        if self.plan is None:
             QMessageBox.warning(self, '警告', '请先加载数据集!')
             return
         
         # 显示配置选择对话框
-        dialog = LoadConfigDialog(self.configs, self)
+        dialog = LoadConfigDialog(configs, self)
         if dialog.exec_() != QDialog.Accepted:
             return
         
@@ -770,7 +1927,16 @@ class FileInfoSystem(QMainWindow):
         if not config_id:
             return
         
-        config = self.configs[config_id]
+        # 只读取选中配置的字段状态和值替换规则
+        try:
+            with TRACER.span('load_config', config_count=len(configs)):
+                config = self.config_store.get(config_id)
+        except Exception as e:
+            QMessageBox.warning(self, '警告', f'读取配置时出错: {str(e)}')
+            return
+        if config is None:
+            QMessageBox.warning(self, '警告', '该配置已被删除!')
+            return
         
         # 应用配置
         self.apply_config(config)
@@ -779,55 +1945,25 @@ class FileInfoSystem(QMainWindow):
     
     def apply_config(self, config):
         """应用配置到当前状态"""
-        # 设置值映射
-        self.value_mapping = config.get('value_mapping', {})
-        
-        # 应用值映射到数据集
-        for field_name, mapping in self.value_mapping.items():
-            if field_name in self.dataset.columns:
-                new_data = self.dataset[field_name].copy()
-                for old_val, new_val in mapping.items():
-                    new_data = new_data.replace(old_val, new_val)
-                self.dataset[field_name] = new_data
-        
-        # 重新创建字段列表
-        self.fields_list.clear()
-        
-        # 获取字段状态
-        field_states = config.get('field_states', {})
-        
-        # 创建排序后的字段列表
-        sorted_fields = []
-        for field in self.available_columns:
-            if field in field_states:
-                sorted_fields.append((field, field_states[field]['order']))
-            else:
-                # 对于不在配置中的字段，放在末尾
-                sorted_fields.append((field, 999))
-        
-        # 按顺序排序
-        sorted_fields.sort(key=lambda x: x[1])
-        
-        # 按顺序添加字段
-        for field_name, _ in sorted_fields:
-            # 获取字段状态
-            state = field_states.get(field_name, {})
-            display_name = state.get('display_name', field_name)
-            is_checked = state.get('is_checked', False)
+        with TRACER.profiled_span('apply_config', rows=len(self.plan), cols=len(self.available_columns),
+                                  mapped_fields=len(config.get('value_mapping', {}))):
+            # 值映射、显示名称和字段顺序记录到变换计划中，替换而不是叠加已有的映射
+            self.plan.apply_config(config, self.available_columns)
             
-            # 创建并添加字段项
-            item, widget = self.add_field_item(field_name, display_name, is_checked)
-            self.fields_list.addItem(item)
-            self.fields_list.setItemWidget(item, widget)
+            # 重新创建字段列表
+            field_states = config.get('field_states', {})
+            checked = {field for field, state in field_states.items() if state.get('is_checked', False)}
+            self.refresh_fields_list(checked)
     
     def manage_configs(self):
         """管理配置"""
-        if not self.configs:
+        configs = self.list_configs()
+        if not configs:
             QMessageBox.information(self, '提示', '没有保存的配置!')
             return
         
         # 创建配置列表
-        config_names = [config['name'] for config in self.configs.values()]
+        config_names = [config['name'] for _, config in configs]
         selected, ok = QInputDialog.getItem(
             self, '管理配置', '选择要删除的配置:', 
             config_names, 0, False
@@ -836,7 +1972,7 @@ class FileInfoSystem(QMainWindow):
         if ok and selected:
             # 找到配置ID
             config_id = None
-            for cid, config in self.configs.items():
+            for cid, config in configs:
                 if config['name'] == selected:
                     config_id = cid
                     break
@@ -852,8 +1988,11 @@ class FileInfoSystem(QMainWindow):
                 
                 if reply == QMessageBox.Yes:
                     # 删除配置
-                    del self.configs[config_id]
-                    self.save_configs()
+                    try:
+                        self.config_store.delete(config_id)
+                    except Exception as e:
+                        QMessageBox.critical(self, '错误', f'保存配置文件时出错: {str(e)}')
+                        return
                     QMessageBox.information(self, '成功', f'配置 "{selected}" 已删除!')
 
     def preview_data(self):
@@ -863,189 +2002,473 @@ class FileInfoSystem(QMainWindow):
             QMessageBox.warning(self, '警告', '请至少选择一个字段！')
             return
             
-        # 创建预览数据
-        preview_data = self.dataset[selected_fields].copy()
-        # 重命名列
-        preview_data.columns = display_names
+        if not self.ensure_columns(selected_fields):
+            return
+        
+        # 只计算选中的列，行顺序由变换计划给出，不复制数据
+        with TRACER.profiled_span('preview_data', rows=len(self.plan), cols=len(selected_fields)):
+            columns = self.plan.columns(selected_fields)
+            dialog = PreviewDataDialog(columns, display_names, self.plan.row_order, self)
         
         # 显示预览对话框
-        dialog = PreviewDataDialog(preview_data, self)
         dialog.exec_()
 
-    def create_field_widget(self, field_name, display_name=None, is_checked=False):
-        """创建字段小部件"""
-        widget = FieldListItem(field_name)
-        if display_name:
-            widget.display_name = display_name
-            widget.checkbox.setText(display_name)
-        widget.checkbox.setChecked(is_checked)
-        return widget
-
-    def add_field_item(self, field_name, display_name=None, is_checked=False):
-        """添加字段到列表"""
-        item = QListWidgetItem()
-        widget = self.create_field_widget(field_name, display_name, is_checked)
-        
-        # 连接按钮信号
-        widget.up_button.clicked.connect(lambda: self.move_item_up(self.fields_list.row(item)))
-        widget.down_button.clicked.connect(lambda: self.move_item_down(self.fields_list.row(item)))
-        widget.rename_button.clicked.connect(lambda: self.rename_field(self.fields_list.row(item)))
-        widget.edit_values_button.clicked.connect(lambda: self.edit_field_values(self.fields_list.row(item)))
-        
-        item.setSizeHint(widget.sizeHint())
-        return item, widget
+    def source_row(self, view_row):
+        """将字段列表视图中的行号转换为模型中的行号"""
+        return self.field_proxy.mapToSource(self.field_proxy.index(view_row, 0)).row()
+    
+    def filter_fields(self, text):
+        """按字段显示名称过滤字段列表"""
+        self.field_proxy.setFilterFixedString(text)
+    
+    def check_visible_fields(self, is_checked):
+        """勾选或取消勾选当前显示（搜索过滤后）的所有字段"""
+        fields = [self.field_model.fields[self.source_row(row)] for row in range(self.field_proxy.rowCount())]
+        self.field_model.set_checked(fields, is_checked)
+    
+    def on_field_button_clicked(self, view_row, action):
+        """字段行上的按钮被点击"""
+        row = self.source_row(view_row)
+        if action == 'up':
+            self.move_item_up(row)
+        elif action == 'down':
+            self.move_item_down(row)
+        elif action == 'rename':
+            self.rename_field(row)
+        elif action == 'edit_values':
+            self.edit_field_values(row)
+    
+    def on_fields_dropped(self, view_rows, view_dest):
+        """拖动字段到新的位置"""
+        rows = [self.source_row(row) for row in view_rows]
+        if view_dest < self.field_proxy.rowCount():
+            dest = self.source_row(view_dest)
+        elif self.field_proxy.rowCount() > 0:
+            dest = self.source_row(self.field_proxy.rowCount() - 1) + 1
+        else:
+            dest = self.field_model.rowCount()
+        self.field_model.move_rows(rows, dest)
+    
+    def on_field_order_changed(self):
+        """字段顺序改变后记录到变换计划中，作为一个可撤销的步骤"""
+        if self.plan is not None and self.plan.field_order != self.field_model.fields:
+            self.plan.set_field_order(self.field_model.fields)
+            self.update_undo_buttons()
 
     def edit_field_values(self, row):
         """编辑字段值"""
-        item = self.fields_list.item(row)
-        field_widget = self.fields_list.itemWidget(item)
-        
-        if field_widget and self.dataset is not None:
-            field_name = field_widget.field_name
-            # 获取字段的所有唯一值
-            unique_values = self.dataset[field_name].unique()
+        if self.plan is not None:
+            field_name = self.field_model.fields[row]
+            # 获取字段的所有唯一值及出现次数（从取值计数索引中汇总）
+            if not self.ensure_columns([field_name]):
+                return
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                with TRACER.profiled_span('edit_field_values', rows=len(self.plan), field=field_name) as span:
+                    value_counts = self.plan.value_counts(field_name)
+                    span.set(uniques=len(value_counts))
+            finally:
+                QApplication.restoreOverrideCursor()
             
-            dialog = EditValuesDialog(field_name, unique_values, self)
+            dialog = EditValuesDialog(field_name, value_counts, self)
             if dialog.exec_() == QDialog.Accepted:
                 # 获取修改后的值映射
                 value_mapping = dialog.get_edited_values()
                 if value_mapping:
-                    # 更新数据集中的值
-                    new_data = self.dataset[field_name].copy()
-                    for old_val, new_val in value_mapping.items():
-                        new_data = new_data.replace(old_val, new_val)
-                    self.dataset[field_name] = new_data
-                    
-                    # 保存值映射
-                    if field_name not in self.value_mapping:
-                        self.value_mapping[field_name] = {}
-                    self.value_mapping[field_name].update(value_mapping)
+                    # 记录值映射（与之前的映射合并，始终针对原始数据）
+                    self.plan.edit_values(field_name, value_mapping)
+                    self.update_undo_buttons()
                     
                     QMessageBox.information(self, '成功', f'已更新字段 "{field_name}" 的值')
 
     def load_dataset(self):
-        file_name, _ = QFileDialog.getOpenFileName(self, '选择数据集文件', '', 
-                                                 'CSV files (*.csv);;Excel files (*.xlsx *.xls)')
-        if file_name:
-            try:
-                if file_name.endswith('.csv'):
-                    self.dataset = pd.read_csv(file_name)
-                else:
-                    self.dataset = pd.read_excel(file_name)
-                
-                # 清空并更新可用字段列表
-                self.fields_list.clear()
-                self.available_columns = list(self.dataset.columns)
-                self.field_mapping = {col: col for col in self.available_columns}
-                
-                # 为每个字段创建可选项
-                for column in self.available_columns:
-                    item, widget = self.add_field_item(column)
-                    self.fields_list.addItem(item)
-                    self.fields_list.setItemWidget(item, widget)
-                
-                self.export_button.setEnabled(True)
-                self.preview_button.setEnabled(True)
-                self.sort_button.setEnabled(True)
-                QMessageBox.information(self, '成功', '数据集加载成功！')
-                
-            except Exception as e:
-                QMessageBox.critical(self, '错误', f'加载数据集时出错：{str(e)}')
+        file_names, _ = QFileDialog.getOpenFileNames(
+            self, '选择数据集文件（可多选）', '',
+            'Dataset files (*.csv *.xlsx *.xls);;CSV files (*.csv);;Excel files (*.xlsx *.xls)')
+        if file_names:
+            self.start_loading(file_names)
+    
+    def load_dataset_directory(self):
+        directory = QFileDialog.getExistingDirectory(self, '选择数据集文件夹')
+        if not directory:
+            return
+        file_names = dataset_io.list_dataset_files(directory)
+        if not file_names:
+            QMessageBox.warning(self, '警告', '文件夹中没有CSV或Excel文件!')
+            return
+        self.start_loading(file_names)
+    
+    def start_loading(self, file_names):
+        """加载一个文件，或并行加载多个分片文件并合并"""
+        self.stop_loader()
+        self.stop_index_builder()
+        
+        # 清空当前数据集
+        self.dataset = None
+        self.plan = None
+        self.update_undo_buttons()
+        self.header_only = False
+        self.column_dtypes = {}
+        self.field_model.set_fields([])
+        self.export_button.setEnabled(False)
+        self.preview_button.setEnabled(False)
+        self.sort_button.setEnabled(False)
+        self.dataset_file = file_names[0]
+        self.dataset_files = list(file_names)
+        
+        # 多个文件需要合并，不支持只加载表头
+        if self.header_only_checkbox.isChecked() and len(file_names) == 1:
+            self.load_dataset_header(self.dataset_file)
+            return
+        
+        # 在后台线程中加载数据集，加载在后台线程中完成，不做cProfile分析
+        optimize = self.optimize_checkbox.isChecked()
+        memory_budget = self.memory_budget_spin.value() * 1024 ** 2
+        if len(file_names) == 1 and (self.store_checkbox.isChecked()
+                                     or column_store.needs_store(self.dataset_file, memory_budget)):
+            self.load_span = TRACER.span('load_dataset', file=os.path.basename(self.dataset_file),
+                                         store=True)
+            self.loader = StoreLoader(self.dataset_file, memory_budget, self)
+        elif len(file_names) == 1:
+            self.load_span = TRACER.span('load_dataset', file=os.path.basename(self.dataset_file))
+            self.loader = DatasetLoader(self.dataset_file, self.dataset_cache, optimize, self)
+        else:
+            self.load_span = TRACER.span('load_dataset', file=os.path.basename(self.dataset_file),
+                                         files=len(file_names))
+            self.loader = ShardedDatasetLoader(file_names, self.dataset_cache, optimize, self)
+        self.loader.header_ready.connect(self.on_header_ready)
+        self.loader.progress.connect(self.on_load_progress)
+        self.loader.loaded.connect(self.on_dataset_loaded)
+        self.loader.failed.connect(self.on_load_failed)
+        self.loader.cancelled.connect(self.on_load_cancelled)
+        
+        self.load_progress_label.setText('正在读取表头...')
+        self.load_progress_bar.setValue(0)
+        self.set_loading_widgets_visible(True)
+        self.loader.start()
+    
+    def load_dataset_header(self, file_name):
+        """只读取表头和样本，列数据在需要时再读取"""
+        try:
+            with TRACER.span('load_dataset_header', file=os.path.basename(file_name)) as span:
+                # 之后按需读取列时确认文件没有变化
+                self.header_fingerprint = file_fingerprint(file_name)
+                columns, self.column_dtypes = dataset_io.sniff_schema(file_name)
+                span.set(cols=len(columns))
+        except Exception as e:
+            QMessageBox.critical(self, '错误', f'加载数据集时出错：{str(e)}')
+            return
+        
+        self.header_only = True
+        self.dataset = pd.DataFrame()
+        self.on_header_ready(columns)
+        self.plan = transform_plan.TransformPlan(self.dataset, columns)
+        
+        self.export_button.setEnabled(True)
+        self.preview_button.setEnabled(True)
+        self.sort_button.setEnabled(True)
+        self.statusBar().showMessage(f'已读取表头, 共 {len(columns)} 列（列数据将在使用时读取）')
+    
+    def ensure_columns(self, fields):
+        """只加载表头时按需从文件读取缺少的列，返回是否可以继续
+        
+        完整加载和磁盘列存储都已包含所有列（只加载表头时不使用列存储），
+        不需要读取。文件在加载表头之后被移动、修改，或读出的行数与已读取
+        的列不一致时显示错误并返回False，不会把不同版本的数据拼在一起。
+        """
+        missing = [field for field in dict.fromkeys(fields) if field not in self.dataset.columns]
+        if not missing or not self.header_only:
+            return True
+        
+        error = None
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            if file_fingerprint(self.dataset_file) != self.header_fingerprint:
+                raise ValueError('数据集文件在加载表头之后已被修改，请重新加载数据集')
+            loaded = dataset_io.read_columns(self.dataset_file, missing)
+            if len(self.dataset.columns) and len(loaded) != len(self.dataset):
+                raise ValueError(f'读取到 {len(loaded)} 行，与已读取的 {len(self.dataset)} 行不一致，'
+                                 f'请重新加载数据集')
+        except Exception as e:
+            error = e
+        finally:
+            QApplication.restoreOverrideCursor()
+        if error is not None:
+            QMessageBox.critical(self, '错误', f'读取字段数据时出错：{str(error)}')
+            return False
+        
+        if self.optimize_checkbox.isChecked():
+            loaded, _ = memory_optimizer.optimize_memory(loaded)
+        
+        # 原始数据的行顺序不变，新读取的列按位置追加
+        self.plan.add_columns(loaded)
+        self.dataset = self.plan.base
+        return True
+    
+    def start_warmup(self):
+        """窗口显示后在后台导入pandas等模块，第一次加载数据集时不必再等待"""
+        self.warmup = ModuleWarmup(WARM_UP_MODULES, self)
+        self.warmup.finished.connect(self.report_import_times)
+        self.warmup.start(QThread.LowPriority)
+    
+    def report_import_times(self):
+        """将新的模块导入耗时写入性能记录"""
+        for name, seconds, thread_name in IMPORT_TIMES[self.reported_imports:]:
+            TRACER.record(f'import {name}', seconds, thread=thread_name)
+        self.reported_imports = len(IMPORT_TIMES)
+    
+    def show_performance_panel(self):
+        """显示最近操作的性能记录（非模态）"""
+        panel = PerformancePanel(TRACER, self)
+        panel.setAttribute(Qt.WA_DeleteOnClose)
+        panel.show()
+    
+    def invalidate_dataset_cache(self):
+        """清除当前数据集文件的缓存"""
+        if not self.dataset_file:
+            QMessageBox.information(self, '提示', '当前没有加载数据集!')
+            return
+        for file_name in self.dataset_files:
+            self.dataset_cache.invalidate(file_name)
+            column_store.remove_stores(file_name, keep=self.current_store_dir())
+        QMessageBox.information(self, '成功', '当前文件的缓存已清除，下次加载时将重新解析!')
+    
+    def clear_dataset_cache(self):
+        """清空全部数据集缓存"""
+        size_mb = (self.dataset_cache.total_bytes() + column_store.stores_bytes()) / 1024 ** 2
+        reply = QMessageBox.question(
+            self, '确认清空',
+            f'确定要清空全部缓存吗? (当前占用 {size_mb:.1f} MB)',
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.dataset_cache.clear()
+            column_store.remove_stores(keep=self.current_store_dir())
+            QMessageBox.information(self, '成功', '缓存已清空!')
+    
+    def current_store_dir(self):
+        """当前使用的列存储目录，正在使用的列存储不能删除"""
+        if isinstance(self.dataset, column_store.ColumnStore):
+            return self.dataset.store_dir
+        return None
+    
+    def set_loading_widgets_visible(self, visible):
+        """显示或隐藏加载进度控件"""
+        self.load_progress_label.setVisible(visible)
+        self.load_progress_bar.setVisible(visible)
+        self.cancel_load_button.setVisible(visible)
+    
+    def cancel_loading(self):
+        """取消正在进行的加载"""
+        if self.loader is not None and self.loader.isRunning():
+            self.loader.requestInterruption()
+            self.cancel_load_button.setEnabled(False)
+            self.load_progress_label.setText('正在取消...')
+    
+    def stop_loader(self):
+        """停止并丢弃当前的加载线程"""
+        if self.loader is not None:
+            self.loader.disconnect()
+            self.loader.requestInterruption()
+            self.loader.wait()
+            self.loader.deleteLater()
+            self.loader = None
+        self.finish_load_span('cancelled')
+        self.cancel_load_button.setEnabled(True)
+        self.set_loading_widgets_visible(False)
+    
+    def start_index_builder(self):
+        """在后台为已加载的列建立取值计数索引，编辑值和排序时直接使用"""
+        self.stop_index_builder()
+        self.index_builder = ColumnIndexBuilder(self.plan.index, self.plan.base.columns, self)
+        self.index_builder.start(QThread.LowPriority)
+    
+    def stop_index_builder(self):
+        """停止并丢弃当前的索引线程"""
+        if self.index_builder is not None:
+            self.index_builder.requestInterruption()
+            self.index_builder.wait()
+            self.index_builder.deleteLater()
+            self.index_builder = None
+    
+    def on_header_ready(self, columns):
+        """表头读取完成后立即显示字段列表"""
+        self.available_columns = list(columns)
+        tooltips = {field: f'类型: {dtype}' for field, dtype in self.column_dtypes.items()}
+        self.field_model.set_fields(self.available_columns, tooltips=tooltips)
+        
+        self.load_progress_label.setText('正在读取数据...')
+    
+    def on_load_progress(self, rows_read, done, total):
+        """更新加载进度"""
+        if total > 0:
+            self.load_progress_bar.setValue(int(done * 1000 / total))
+        if len(self.dataset_files) > 1:
+            self.load_progress_label.setText(f'已读取 {done}/{total} 个文件, {rows_read} 行')
+        else:
+            self.load_progress_label.setText(f'已读取 {rows_read} 行')
+    
+    def finish_load_span(self, status, **fields):
+        """结束加载的计时记录"""
+        if self.load_span is not None:
+            self.load_span.finish(status, **fields)
+            self.load_span = None
+    
+    def on_dataset_loaded(self, dataset, report):
+        """数据集加载完成"""
+        self.finish_load_span('ok', rows=len(dataset), cols=len(dataset.columns))
+        self.stop_loader()
+        self.dataset = dataset
+        
+        # 表头与实际数据列不一致时以数据为准
+        if list(dataset.columns) != self.available_columns:
+            self.on_header_ready(list(dataset.columns))
+        
+        # 加载期间用户可能已经调整了字段顺序和名称
+        field_states = self.current_field_states()
+        field_order = [field for field, _, _ in field_states]
+        display_names = {field: name for field, name, _ in field_states if name != field}
+        if isinstance(dataset, column_store.ColumnStore):
+            # 列存储中已有各列的编码和计数，不需要在后台建立索引
+            self.plan = column_store.StorePlan(dataset, field_order, display_names,
+                                               self.memory_budget_spin.value() * 1024 ** 2)
+        else:
+            self.plan = transform_plan.TransformPlan(dataset, field_order, display_names)
+            self.start_index_builder()
+        
+        self.export_button.setEnabled(True)
+        self.preview_button.setEnabled(True)
+        self.sort_button.setEnabled(True)
+        files_text = f'{len(self.dataset_files)} 个文件, ' if len(self.dataset_files) > 1 else ''
+        self.statusBar().showMessage(f'已加载 {files_text}{len(dataset)} 行, {len(dataset.columns)} 列')
+        if report:
+            dialog = MemoryReportDialog(report, self)
+            dialog.exec_()
+        else:
+            QMessageBox.information(self, '成功', '数据集加载成功！')
+    
+    def on_load_failed(self, message):
+        """数据集加载失败"""
+        self.finish_load_span('error', error=message)
+        self.stop_loader()
+        self.field_model.set_fields([])
+        QMessageBox.critical(self, '错误', f'加载数据集时出错：{message}')
+    
+    def on_load_cancelled(self):
+        """数据集加载被取消"""
+        self.finish_load_span('cancelled')
+        self.stop_loader()
+        self.field_model.set_fields([])
+        self.statusBar().showMessage('已取消加载')
+    
+    def closeEvent(self, event):
+        if self.export_panel.has_active_jobs():
+            reply = QMessageBox.question(
+                self, '确认退出', '还有未完成的导出任务，确定要取消这些任务并退出吗?',
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                event.ignore()
+                return
+            self.export_panel.cancel_all()
+        if self.warmup is not None:
+            self.warmup.wait()
+        self.stop_loader()
+        self.stop_index_builder()
+        super().closeEvent(event)
     
     def move_item_up(self, row):
         if row > 0:
-            # 获取当前项和上一项
-            current_item = self.fields_list.item(row)
-            current_widget = self.fields_list.itemWidget(current_item)
-            
-            if current_widget:
-                # 保存当前项的状态
-                field_name = current_widget.field_name
-                display_name = current_widget.display_name
-                is_checked = current_widget.checkbox.isChecked()
-                
-                # 移除当前项
-                self.fields_list.takeItem(row)
-                
-                # 在新位置创建并插入项
-                new_item, new_widget = self.add_field_item(field_name, display_name, is_checked)
-                self.fields_list.insertItem(row - 1, new_item)
-                self.fields_list.setItemWidget(new_item, new_widget)
-                self.fields_list.setCurrentRow(row - 1)
+            self.field_model.move_rows([row], row - 1)
     
     def move_item_down(self, row):
-        if row < self.fields_list.count() - 1:
-            # 获取当前项
-            current_item = self.fields_list.item(row)
-            current_widget = self.fields_list.itemWidget(current_item)
-            
-            if current_widget:
-                # 保存当前项的状态
-                field_name = current_widget.field_name
-                display_name = current_widget.display_name
-                is_checked = current_widget.checkbox.isChecked()
-                
-                # 移除当前项
-                self.fields_list.takeItem(row)
-                
-                # 在新位置创建并插入项
-                new_item, new_widget = self.add_field_item(field_name, display_name, is_checked)
-                self.fields_list.insertItem(row + 1, new_item)
-                self.fields_list.setItemWidget(new_item, new_widget)
-                self.fields_list.setCurrentRow(row + 1)
+        if row < self.field_model.rowCount() - 1:
+            self.field_model.move_rows([row], row + 2)
     
     def rename_field(self, row):
-        item = self.fields_list.item(row)
-        field_widget = self.fields_list.itemWidget(item)
+        field_name = self.field_model.fields[row]
+        dialog = RenameDialog(self.field_model.display_name(field_name), self)
         
-        if field_widget:
-            dialog = RenameDialog(field_widget.display_name, self)
-            
-            if dialog.exec_() == QDialog.Accepted:
-                new_name = dialog.get_new_name()
-                if new_name and new_name.strip():
-                    # 更新显示名称和映射
-                    field_widget.display_name = new_name
-                    field_widget.checkbox.setText(new_name)
-                    self.field_mapping[field_widget.field_name] = new_name
+        if dialog.exec_() == QDialog.Accepted:
+            new_name = dialog.get_new_name()
+            if new_name and new_name.strip():
+                # 更新显示名称和映射
+                self.field_model.set_display_name(field_name, new_name)
+                if self.plan is not None:
+                    self.plan.rename(field_name, new_name)
+                    self.update_undo_buttons()
+    
+    def current_field_states(self):
+        """按列表顺序返回每个字段的 (字段名, 显示名称, 是否选中)"""
+        return self.field_model.states()
+    
+    def refresh_fields_list(self, checked=None):
+        """按变换计划中的字段顺序和显示名称重建字段列表"""
+        if checked is None:
+            checked = self.field_model.checked
+        self.field_model.set_fields(self.plan.field_order, self.plan.display_names, checked)
+    
+    def update_undo_buttons(self):
+        can_undo = getattr(self, 'plan', None) is not None and self.plan.can_undo()
+        can_redo = getattr(self, 'plan', None) is not None and self.plan.can_redo()
+        self.undo_button.setEnabled(can_undo)
+        self.redo_button.setEnabled(can_redo)
+    
+    def undo(self):
+        """撤销上一次值替换、重命名、字段移动或排序"""
+        if self.plan is not None and self.plan.undo():
+            self.refresh_fields_list()
+            self.statusBar().showMessage('已撤销')
+        self.update_undo_buttons()
+    
+    def redo(self):
+        """重做被撤销的操作"""
+        if self.plan is not None and self.plan.redo():
+            self.refresh_fields_list()
+            self.statusBar().showMessage('已重做')
+        self.update_undo_buttons()
     
     def get_selected_fields(self):
-        selected_fields = []
-        field_names = []
-        for i in range(self.fields_list.count()):
-            item = self.fields_list.item(i)
-            field_widget = self.fields_list.itemWidget(item)
-            if field_widget and field_widget.checkbox.isChecked():
-                selected_fields.append(field_widget.field_name)
-                field_names.append(field_widget.display_name)
+        selected_fields = [field for field in self.field_model.fields if field in self.field_model.checked]
+        field_names = [self.field_model.display_name(field) for field in selected_fields]
         return selected_fields, field_names
     
-    def export_to_excel(self):
+    def export_data(self):
+        """将选中的字段加入后台导出队列，可以同时导出多种格式"""
         selected_fields, display_names = self.get_selected_fields()
         if not selected_fields:
             QMessageBox.warning(self, '警告', '请至少选择一个字段！')
             return
-            
-        file_name, _ = QFileDialog.getSaveFileName(self, '保存Excel文件', '', 
-                                                 'Excel files (*.xlsx)')
-        if file_name:
-            try:
-                if not file_name.endswith('.xlsx'):
-                    file_name += '.xlsx'
-                    
-                # 导出选中的字段
-                selected_data = self.dataset[selected_fields].copy()
-                # 重命名列
-                selected_data.columns = display_names
-                selected_data.to_excel(file_name, index=False)
-                QMessageBox.information(self, '成功', '数据导出成功！')
-                
-            except Exception as e:
-                QMessageBox.critical(self, '错误', f'导出数据时出错：{str(e)}')
+        
+        # 只加载表头时先读取选中的列，对话框中显示实际的行数
+        if not self.ensure_columns(selected_fields):
+            return
+        
+        dialog = ExportDialog(len(self.plan), len(selected_fields), self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        
+        try:
+            # 只计算选中的列，按变换计划的行顺序分批写出，不复制数据
+            columns = self.plan.columns(selected_fields)
+        except Exception as e:
+            QMessageBox.critical(self, '错误', f'导出数据时出错：{str(e)}')
+            return
+        
+        job = ExportJob(columns, display_names, dialog.get_outputs(), self.plan.row_order,
+                        dialog.get_split(), self)
+        job_id = self.export_panel.add_job(job)
+        self.show_export_jobs()
+        self.statusBar().showMessage(f'已添加导出任务 {job_id}')
+    
+    def show_export_jobs(self):
+        """显示导出任务队列"""
+        self.export_panel.show()
+        self.export_panel.raise_()
 
     def sort_rows(self):
-        """根据行中有效元素数量排序（无效元素包括NaN和'not performed'）"""
-        if self.dataset is None:
+        """根据行中有效元素数量排序（无效元素包括NaN和设置的无效值）"""
+        if self.plan is None:
             QMessageBox.warning(self, '警告', '请先加载数据集!')
             return
             
@@ -1055,44 +2478,52 @@ class FileInfoSystem(QMainWindow):
             return
         
         # 显示排序设置对话框
-        dialog = SortRowsDialog(self)
+        dialog = SortRowsDialog(selected_fields, display_names, self.sort_settings, self)
         if dialog.exec_() != QDialog.Accepted:
             return
         
-        sort_settings = dialog.get_sort_settings()
-        
-        # 创建用于排序的数据（仅包含选中的字段）
-        sort_data = self.dataset[selected_fields].copy()
-        
-        # 计算每行有效元素数量（非NaN且不等于'not performed'）
-        valid_mask = sort_data.notna() & (sort_data != 'Not performed')
-        valid_counts = valid_mask.sum(axis=1)
+        self.sort_settings = dialog.get_sort_settings()
+        invalid_tokens = dialog.get_invalid_tokens()
         
         # 根据设置确定排序顺序
-        ascending = sort_settings['order'] == 'ascending'
-        
-        # 创建临时列存储有效元素数量
-        self.dataset['__valid_count__'] = valid_counts
+        ascending = self.sort_settings['order'] == 'ascending'
+        sort_keys = [(field, order == 'ascending') for field, order in self.sort_settings['sort_keys']]
         
-        # 使用临时列排序
-        self.dataset = self.dataset.sort_values(
-            by='__valid_count__',
-            ascending=ascending
-        )
+        if not self.ensure_columns(selected_fields + [field for field, _ in sort_keys]):
+            return
         
-        # 删除临时列
-        self.dataset = self.dataset.drop(columns=['__valid_count__'])
+        # 按选中字段中的有效元素数量排序，再依次按次要排序字段排序，只记录行顺序
+        try:
+            with TRACER.profiled_span('sort_rows', rows=len(self.plan), cols=len(selected_fields),
+                                      sort_keys=len(sort_keys)):
+                self.plan.sort_by_valid_count(selected_fields, ascending, invalid_tokens, sort_keys)
+        except MemoryError as e:
+            QMessageBox.warning(self, '警告', f'无法排序：{str(e)}')
+            return
+        self.update_undo_buttons()
         
+        tokens_text = '、'.join(repr(token) for token in self.sort_settings['default_invalid_tokens'])
         QMessageBox.information(
             self, 
             '成功', 
-            f'数据已按行有效元素{"升序" if ascending else "降序"}排序！（无效元素包括NaN和\'not performed\'，仅考虑选中的{len(selected_fields)}个字段）'
+            f'数据已按行有效元素{"升序" if ascending else "降序"}排序！（默认无效元素包括NaN和{tokens_text}，仅考虑选中的{len(selected_fields)}个字段）'
         )
 
 def main():
+    multiprocessing.freeze_support()
+    if '--import-report' in sys.argv:
+        # 不显示窗口，只导入所有延迟导入的模块并输出耗时
+        print(f'显示窗口前的导入耗时: {(time.perf_counter() - STARTUP_TIME) * 1000:.1f} ms')
+        warm_up(WARM_UP_MODULES)
+        print(import_report())
+        return
+    
     app = QApplication(sys.argv)
     ex = FileInfoSystem()
     ex.show()
+    app.processEvents()
+    TRACER.record('startup', time.perf_counter() - STARTUP_TIME)
+    ex.start_warmup()
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
@@ -0,0 +1,68 @@
+import time
+import importlib
+import threading
+
+
+# 已导入模块的耗时记录：(模块名, 秒数, 导入时所在的线程名)
+IMPORT_TIMES = []
+_lock = threading.RLock()
+
+
+class LazyModule:
+    """首次访问属性时才导入的模块代理
+
+    pandas、numpy等库导入需要较长时间，用代理代替模块顶部的导入，
+    程序窗口可以先显示出来，在第一次用到时（或由后台预加载）再导入。
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    IMPORT_TIMES.append((self._name, time.perf_counter() - start,
+                                         threading.current_thread().name))
+                    self._module = module
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = '已导入' if self._module is not None else '未导入'
+        return f'<延迟导入的模块 {self._name} ({state})>'
+
+
+_modules = {}
+
+
+def lazy_import(name):
+    """返回模块的延迟导入代理，同名模块共用一个代理"""
+    with _lock:
+        if name not in _modules:
+            _modules[name] = LazyModule(name)
+        return _modules[name]
+
+
+def warm_up(names):
+    """依次导入模块（通常在后台线程中调用），返回导入失败的模块名"""
+    failed = []
+    for name in names:
+        try:
+            lazy_import(name)._load()
+        except ImportError:
+            failed.append(name)
+    return failed
+
+
+def import_report():
+    """返回导入耗时报告的文本，按耗时从多到少排列"""
+    lines = [f'{"模块":<20}{"耗时 (ms)":>12}  线程']
+    for name, seconds, thread_name in sorted(IMPORT_TIMES, key=lambda item: -item[1]):
+        lines.append(f'{name:<20}{seconds * 1000:>12.1f}  {thread_name}')
+    return '\n'.join(lines)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+
+# 唯一值数量占行数的比例不超过该值时转换为category类型
+DEFAULT_CATEGORY_RATIO = 0.5
+
+
+def _optimize_column(series, category_ratio):
+    """返回优化后的列，无法优化时返回原列"""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return series
+
+    if pd.api.types.is_integer_dtype(dtype):
+        return pd.to_numeric(series, downcast='integer')
+
+    if pd.api.types.is_float_dtype(dtype) and isinstance(dtype, np.dtype):
+        downcast = series.astype(np.float32)
+        # 只有不损失精度时才降为float32
+        values = series.to_numpy()
+        if np.array_equal(downcast.to_numpy().astype(values.dtype), values, equal_nan=True):
+            return downcast
+        return series
+
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        if len(series) == 0:
+            return series
+        n_unique = series.nunique(dropna=True)
+        if n_unique <= len(series) * category_ratio:
+            return series.astype('category')
+    return series
+
+
+def optimize_memory(data, category_ratio=DEFAULT_CATEGORY_RATIO):
+    """将低基数字符串列转换为category类型，并对数值列降精度
+
+    返回 (优化后的数据, 报告)。报告为每列一项的列表，包含列名、
+    优化前后的类型和 memory_usage(deep=True) 字节数。
+    """
+    columns = {}
+    report = []
+    for col in data.columns:
+        series = data[col]
+        optimized = _optimize_column(series, category_ratio)
+        columns[col] = optimized
+        report.append({
+            'column': col,
+            'dtype_before': str(series.dtype),
+            'dtype_after': str(optimized.dtype),
+            'bytes_before': int(series.memory_usage(index=False, deep=True)),
+            'bytes_after': int(optimized.memory_usage(index=False, deep=True)),
+        })
+    optimized_data = pd.DataFrame(columns, index=data.index)
+    optimized_data.columns = data.columns
+    return optimized_data, report
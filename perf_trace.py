@@ -0,0 +1,175 @@
+import os
+import io
+import json
+import time
+import pstats
+import logging
+import cProfile
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+
+DEFAULT_TRACE_LOG = 'file_info_system_trace.log'
+DEFAULT_PROFILE_DIR = 'file_info_system_profiles'
+DEFAULT_MAX_BYTES = 5 * 1024 ** 2
+DEFAULT_BACKUP_COUNT = 3
+RECENT_SPANS = 200  # 在内存中保留的最近操作数量
+PROFILE_LINES = 40  # 性能分析摘要显示的函数数量
+
+
+def current_memory():
+    """返回当前进程占用的物理内存（字节），无法获取时返回None"""
+    if HAS_PSUTIL:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Span:
+    """一次操作的计时记录，结束时写入日志"""
+
+    def __init__(self, tracer, name, fields, profile=False):
+        self.tracer = tracer
+        self.record = {
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'operation': name,
+            **fields,
+        }
+        self.memory_before = current_memory()
+        self.profiler = None
+        if profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.summary = None  # 性能分析摘要，只保留在内存中
+        self.start = time.perf_counter()
+        self.finished = False
+
+    def set(self, **fields):
+        """补充记录的字段，例如行数和列数"""
+        self.record.update(fields)
+
+    def finish(self, status='ok', **fields):
+        if self.finished:
+            return
+        self.finished = True
+        duration = time.perf_counter() - self.start
+        if self.profiler is not None:
+            self.profiler.disable()
+        memory_after = current_memory()
+
+        self.record.update(fields)
+        self.record['status'] = status
+        self.record['duration_ms'] = round(duration * 1000, 1)
+        if self.memory_before is not None and memory_after is not None:
+            self.record['memory_delta_mb'] = round((memory_after - self.memory_before) / 1024 ** 2, 1)
+        if self.profiler is not None:
+            self.record['profile_file'], self.summary = self.tracer.save_profile(self.profiler, self.record)
+        self.tracer.emit(self.record, self.summary)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        else:
+            self.finish('error', error=str(exc))
+        return False
+
+
+class Tracer:
+    """记录主要操作的耗时、数据规模和内存变化
+
+    每个操作结束后以一行JSON写入滚动日志，最近的记录保留在内存中供
+    性能面板显示。request_profile() 之后的下一个操作会用cProfile分析，
+    结果保存为 .prof 文件，耗时最多的函数摘要只保留在内存中。
+    """
+
+    def __init__(self, log_file=DEFAULT_TRACE_LOG, profile_dir=DEFAULT_PROFILE_DIR,
+                 max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT):
+        self.log_file = log_file
+        self.profile_dir = profile_dir
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.recent = deque(maxlen=RECENT_SPANS)
+        self.listeners = []  # 每条记录完成后调用 listener(记录, 性能分析摘要)
+        self.profile_next = False
+        self._logger = None
+
+    def span(self, name, **fields):
+        """开始记录一个操作，可以用作上下文管理器，也可以稍后调用 finish()"""
+        return Span(self, name, fields)
+
+    def profiled_span(self, name, **fields):
+        """与 span() 相同，但在请求了性能分析时用cProfile分析该操作
+
+        cProfile只分析当前线程，因此只用于在主线程中同步完成的操作。
+        """
+        profile = self.profile_next
+        self.profile_next = False
+        return Span(self, name, fields, profile=profile)
+
+    def record(self, name, seconds, **fields):
+        """记录一个已经在别处计时的操作，例如模块导入"""
+        self.emit({
+            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'operation': name,
+            **fields,
+            'status': 'ok',
+            'duration_ms': round(seconds * 1000, 1),
+        })
+
+    def request_profile(self, enabled=True):
+        self.profile_next = enabled
+
+    def emit(self, record, summary=None):
+        self.recent.append((record, summary))
+        try:
+            self.logger().info(json.dumps(record, ensure_ascii=False, default=str))
+        except OSError:
+            # 日志写入失败不影响操作本身
+            pass
+        for listener in list(self.listeners):
+            listener(record, summary)
+
+    def logger(self):
+        """第一次写入时才创建日志文件"""
+        if self._logger is None:
+            logger = logging.getLogger(f'file_info_system.trace.{id(self)}')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(self.log_file, maxBytes=self.max_bytes,
+                                          backupCount=self.backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def save_profile(self, profiler, record):
+        """保存性能分析结果，返回 (.prof文件路径, 摘要文本)"""
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(PROFILE_LINES)
+        file_name = None
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            file_name = os.path.join(self.profile_dir, f"{record['operation']}_{stamp}.prof")
+            stats.dump_stats(file_name)
+        except OSError:
+            file_name = None
+        return file_name, stream.getvalue()
+
+
+# 程序中共用的记录器
+TRACER = Tracer()
@@ -0,0 +1,102 @@
+import os
+import json
+from collections import Counter
+
+from dataset_io import read_dataset, source_names
+from config_store import ConfigStore, LEGACY_CONFIG_FILE
+from transform_plan import TransformPlan
+from export_writers import EXPORT_FORMATS, write_output
+
+
+def read_configs(config_file):
+    """读取配置文件中的所有配置"""
+    if not os.path.exists(config_file):
+        return {}
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def find_config(configs, key):
+    """按配置ID或配置名称查找配置，返回 (配置ID, 配置)"""
+    if key in configs:
+        return key, configs[key]
+    matches = [(cid, config) for cid, config in configs.items() if config.get('name') == key]
+    if not matches:
+        raise ValueError(f'找不到配置 "{key}"')
+    if len(matches) > 1:
+        ids = ', '.join(cid for cid, _ in matches)
+        raise ValueError(f'存在多个名为 "{key}" 的配置，请使用配置ID: {ids}')
+    return matches[0]
+
+
+def load_config(config_file, key):
+    """从配置数据库（或旧版本的JSON配置文件）中查找配置，返回 (配置ID, 配置)"""
+    if config_file.endswith('.json'):
+        return find_config(read_configs(config_file), key)
+    legacy_file = os.path.join(os.path.dirname(config_file), LEGACY_CONFIG_FILE)
+    # 数据库还不存在时，只有同目录下有旧版本的配置文件才创建并导入
+    if not os.path.exists(config_file) and not os.path.exists(legacy_file):
+        raise ValueError(f'配置文件不存在: {config_file}')
+    return ConfigStore(config_file, legacy_file=legacy_file).find(key)
+
+
+def selected_fields_from_config(config, columns):
+    """根据配置中的字段状态返回 (选中的字段, 显示名称)，按配置中的顺序排列"""
+    field_states = config.get('field_states', {})
+    fields = [col for col in columns if field_states.get(col, {}).get('is_checked')]
+    fields.sort(key=lambda col: field_states[col].get('order', 999))
+    display_names = [field_states[col].get('display_name', col) for col in fields]
+    return fields, display_names
+
+
+def output_names(files):
+    """每个输入文件的输出文件名（不含扩展名）
+
+    按相对于所有输入文件共同目录的路径命名，子目录之间用 "__" 连接，
+    例如 in/x/d.csv 和 in/y/d.csv 分别为 x__d 和 y__d。去掉扩展名后
+    重名的文件（例如 d.csv 和 d.xlsx）保留源文件的扩展名：d_csv、d_xlsx。
+    """
+    stems = []
+    for path in source_names(files):
+        # 没有共同目录时为绝对路径，去掉盘符和开头的分隔符
+        path = os.path.splitdrive(path)[1].replace('\\', '/').replace(os.sep, '/').lstrip('/')
+        stem, extension = os.path.splitext(path.replace('/', '__'))
+        stems.append((stem, extension))
+    # Windows和macOS的文件名不区分大小写
+    counts = Counter(stem.lower() for stem, _ in stems)
+    return [stem if counts[stem.lower()] == 1 else f'{stem}_{extension.lstrip(".")}'
+            for stem, extension in stems]
+
+
+def duplicate_outputs(names):
+    """返回重复（不区分大小写）的输出文件名"""
+    counts = Counter(name.lower() for name in names)
+    return sorted({name for name in names if counts[name.lower()] > 1})
+
+
+def process_file(file_name, config, output_dir, sort_order=None, invalid_tokens=None,
+                 output_format='xlsx', output_name=None):
+    """对单个文件执行字段选择、值替换、排序和导出，返回输出文件路径
+
+    invalid_tokens 给出时作为所有选中字段的无效值，否则使用默认的无效值。
+    output_format 为 export_writers.EXPORT_FORMATS 中的格式名。
+    output_name 为输出文件名（不含扩展名），默认为输入文件名。
+    """
+    plan = TransformPlan(read_dataset(file_name))
+    fields, display_names = selected_fields_from_config(config, plan.field_order)
+    if not fields:
+        raise ValueError('配置中选中的字段在文件中都不存在')
+
+    plan.apply_config(config, plan.field_order)
+    if sort_order is not None:
+        if invalid_tokens is not None:
+            invalid_tokens = {field: set(invalid_tokens) for field in fields}
+        plan.sort_by_valid_count(fields, ascending=sort_order == 'ascending',
+                                 invalid_tokens=invalid_tokens)
+
+    if output_name is None:
+        output_name = os.path.splitext(os.path.basename(file_name))[0]
+    output_file = os.path.join(output_dir, output_name + EXPORT_FORMATS[output_format][1])
+    write_output(plan.columns(fields), display_names, output_format, output_file,
+                 row_order=plan.row_order)
+    return output_file
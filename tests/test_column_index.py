@@ -0,0 +1,31 @@
+"""column_index 中有效元素判断的测试"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from column_index import valid_uniques
+from transform_plan import TransformPlan
+
+
+def test_numeric_tokens_match_displayed_values():
+    assert valid_uniques(np.array([-1, 5, 7]), {'-1'}).tolist() == [False, True, True]
+    assert valid_uniques(np.array([1.5, -1.0]), {'-1.0'}).tolist() == [True, False]
+
+
+def test_text_tokens_and_missing_values():
+    uniques = np.array(['Not performed', 'x', None, ''], dtype=object)
+    assert valid_uniques(uniques, {'Not performed', ''}).tolist() == [False, True, False, False]
+
+
+def test_sort_with_numeric_invalid_token():
+    plan = TransformPlan(pd.DataFrame({'a': [-1, 5, -1, 7], 'b': [1, -1, -1, 2]}))
+    plan.sort_by_valid_count(['a', 'b'], ascending=False,
+                             invalid_tokens={'a': {'-1'}, 'b': {'-1'}})
+    counts = plan.index.valid_counts(['a', 'b'], plan.value_mapping,
+                                     {'a': {'-1'}, 'b': {'-1'}})
+    assert counts.tolist() == [1, 1, 0, 2]
+    assert plan.row_order[0] == 3
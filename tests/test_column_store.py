@@ -0,0 +1,105 @@
+"""column_store 的测试：建立、打开、取值计数、排序和导出"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import column_store
+from column_store import StorePlan, open_store
+from export_writers import write_csv_streaming
+from transform_plan import TransformPlan
+
+
+def make_csv(path, rows=500, cols=4, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        f'c{i}': rng.choice(['阳性', '阴性', 'Not performed', None, '1', '2'], rows)
+        for i in range(cols)
+    })
+    data['n'] = rng.integers(0, 7, rows)
+    data.to_csv(path, index=False)
+    return pd.read_csv(path)
+
+
+def test_build_open_counts_sort_export(tmp_path):
+    file_name = str(tmp_path / 'data.csv')
+    data = make_csv(file_name)
+    store_root = str(tmp_path / 'stores')
+    # 内存预算很小，分多块建立
+    store = open_store(file_name, store_root=store_root, memory_budget=64 * 1024)
+    assert len(store) == len(data)
+    assert store.columns == list(data.columns)
+
+    # 再次打开时直接使用已有的列存储
+    reopened = open_store(file_name, store_root=store_root)
+    assert reopened.store_dir == store.store_dir
+
+    plan = StorePlan(reopened, memory_budget=64 * 1024)
+    memory_plan = TransformPlan(data)
+    for field in data.columns:
+        expected = data[field].value_counts(dropna=False)
+        counts = plan.value_counts(field)
+        assert counts.sum() == len(data)
+        assert sorted(counts.tolist()) == sorted(expected.tolist())
+
+    fields = ['c0', 'c1', 'c2']
+    plan.sort_by_valid_count(fields, ascending=False)
+    memory_plan.sort_by_valid_count(fields, ascending=False)
+    assert np.asarray(plan.row_order).tolist() == np.asarray(memory_plan.row_order).tolist()
+
+    out = str(tmp_path / 'out.csv')
+    write_csv_streaming(plan.columns(fields + ['n']), fields + ['n'], out,
+                        row_order=plan.row_order, chunk_rows=100)
+    exported = pd.read_csv(out, encoding='utf-8-sig')
+    expected = data[fields + ['n']].take(memory_plan.row_order).reset_index(drop=True)
+    pd.testing.assert_frame_equal(exported, expected, check_dtype=False)
+
+
+def test_slices_and_take(tmp_path):
+    file_name = str(tmp_path / 'data.csv')
+    data = make_csv(file_name, rows=50)
+    plan = StorePlan(open_store(file_name, store_root=str(tmp_path / 'stores')))
+    column = plan.column('c0')
+    expected = data['c0'].astype(object)
+    for key in (slice(10, 20), slice(5, 40, 7), slice(45, None)):
+        pd.testing.assert_series_equal(column.iloc[key], expected.iloc[key].reset_index(drop=True),
+                                       check_names=False)
+    positions = [49, 0, 7]
+    pd.testing.assert_series_equal(column.take(positions), expected.take(positions).reset_index(drop=True),
+                                   check_names=False)
+
+
+def test_wide_store_within_open_file_limit(tmp_path, monkeypatch):
+    resource = pytest.importorskip('resource')
+    file_name = str(tmp_path / 'wide.csv')
+    cols = 300
+    data = make_csv(file_name, rows=40, cols=cols)
+    monkeypatch.setattr(column_store, 'MAX_MAPPED_COLUMNS', 16)
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    limit = 128
+    if soft != resource.RLIM_INFINITY and soft < limit:
+        pytest.skip('打开文件数的限制已经低于测试使用的值')
+    resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+    try:
+        store = open_store(file_name, store_root=str(tmp_path / 'stores'), memory_budget=64 * 1024)
+        plan = StorePlan(store)
+        fields = list(data.columns)
+        assert len(fields) > limit
+        for field in fields:
+            plan.value_counts(field)
+        plan.sort_by_valid_count(fields, ascending=True)
+        out = str(tmp_path / 'wide_out.csv')
+        write_csv_streaming(plan.columns(fields), fields, out, row_order=plan.row_order)
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    exported = pd.read_csv(out, encoding='utf-8-sig')
+    assert exported.shape == data.shape
+    expected = TransformPlan(data)
+    expected.sort_by_valid_count(fields, ascending=True)
+    assert exported['n'].tolist() == data['n'].take(expected.row_order).tolist()
@@ -0,0 +1,79 @@
+"""config_store 中SQLite配置存储和旧JSON配置导入的测试"""
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_store import ConfigStore
+
+
+def legacy_configs():
+    return {
+        'config_1_100': {
+            'name': '常用字段',
+            'description': '旧配置',
+            'date': '2024-01-01 10:00:00',
+            'field_states': {'姓名': True, '年龄': False},
+            'value_mapping': {'城市': {'北京': '京'}},
+        },
+        'config_2_200': {
+            'name': '全部字段',
+            'date': '2024-01-02 10:00:00',
+            'field_states': {'姓名': True},
+        },
+    }
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    return str(path)
+
+
+def test_legacy_json_imported_once(tmp_path):
+    legacy_file = write_json(tmp_path / 'configs.json', legacy_configs())
+    db_file = str(tmp_path / 'configs.db')
+
+    store = ConfigStore(db_file, legacy_file=legacy_file)
+    assert len(store) == 2
+    assert [config['name'] for _, config in store.list_configs()] == ['常用字段', '全部字段']
+    assert store.get('config_1_100') == legacy_configs()['config_1_100']
+    assert store.get('config_2_200')['description'] == ''
+    assert store.get('config_2_200')['value_mapping'] == {}
+    # 原文件保留
+    assert os.path.exists(legacy_file)
+
+    # 导入之后删除的配置不会在下次打开时重新导入
+    assert store.delete('config_2_200')
+    store = ConfigStore(db_file, legacy_file=legacy_file)
+    assert [config_id for config_id, _ in store.list_configs()] == ['config_1_100']
+    assert store.migrate_json(legacy_file) == 0
+    assert len(store) == 1
+
+
+def test_import_keeps_existing_configs(tmp_path):
+    db_file = str(tmp_path / 'configs.db')
+    store = ConfigStore(db_file)
+    earlier_file = write_json(tmp_path / 'earlier.json', {'config_1_100': {'name': '数据库中的版本'}})
+    assert store.migrate_json(earlier_file) == 1
+
+    legacy_file = write_json(tmp_path / 'configs.json', legacy_configs())
+    assert store.migrate_json(legacy_file) == 2
+    assert store.get('config_1_100')['name'] == '数据库中的版本'
+    assert store.get('config_2_200')['name'] == '全部字段'
+
+
+def test_save_find_delete(tmp_path):
+    store = ConfigStore(str(tmp_path / 'configs.db'))
+    first = store.save({'name': '配置', 'field_states': {'a': True}})
+    second = store.save({'name': '配置', 'field_states': {'b': True}})
+    assert first != second
+    assert store.find(first) == (first, store.get(first))
+    with pytest.raises(ValueError, match='请使用配置ID'):
+        store.find('配置')
+    assert store.delete(first)
+    assert not store.delete(first)
+    assert store.find('配置')[0] == second
@@ -0,0 +1,84 @@
+"""dataset_io 中CSV格式识别和按列读取的测试"""
+import os
+import sys
+import codecs
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset_io import detect_encoding, iter_dataset_chunks, read_columns, sniff_csv, sniff_schema
+
+
+def write_bytes(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+def gbk_tab_file(tmp_path):
+    # 第一行是标题，第二行是说明，第三行才是表头
+    lines = ['人员信息表', '导出日期\t2024-01-01', '姓名\t年龄\t编号\t城市']
+    lines += [f'人员{i}\t{20 + i}\t{i:03d}\t城市{i % 3}' for i in range(10)]
+    # 编号在前几行像数字，最后一行是文本，整列都按文本读取
+    lines.append('人员10\t30\tX10\t城市1')
+    return write_bytes(tmp_path / 'people.csv', ('\r\n'.join(lines) + '\r\n').encode('gbk'))
+
+
+def test_sniff_gbk_tab_title_rows(tmp_path):
+    file_name = gbk_tab_file(tmp_path)
+    sniffed = sniff_csv(file_name)
+    assert sniffed['encoding'] == 'gbk'
+    assert sniffed['sep'] == '\t'
+    assert sniffed['skiprows'] == 2
+    assert sniffed['columns'] == ['姓名', '年龄', '编号', '城市']
+    assert sniffed['dtype'] == {0: str, 2: str, 3: str}
+    columns, dtypes = sniff_schema(file_name)
+    assert columns == ['姓名', '年龄', '编号', '城市']
+    assert dtypes['年龄'] == 'int64'
+
+
+def test_read_columns_uses_positional_dtype_with_usecols(tmp_path):
+    file_name = gbk_tab_file(tmp_path)
+    # 按与文件中不同的顺序读取部分列，位置类型仍对应原来的列
+    data = read_columns(file_name, ['编号', '年龄'])
+    assert list(data.columns) == ['编号', '年龄']
+    assert data['编号'].tolist()[:3] == ['000', '001', '002']
+    assert data['编号'].iloc[-1] == 'X10'
+    assert pd.api.types.is_integer_dtype(data['年龄'])
+    assert data['年龄'].tolist() == list(range(20, 31))
+
+
+def test_chunks_keep_text_columns_consistent(tmp_path):
+    file_name = gbk_tab_file(tmp_path)
+    chunks = [chunk for chunk, _, _ in iter_dataset_chunks(file_name, chunksize=4)]
+    assert sum(len(chunk) for chunk in chunks) == 11
+    assert all(list(chunk.columns) == ['姓名', '年龄', '编号', '城市'] for chunk in chunks)
+    assert all(chunk['编号'].map(type).eq(str).all() for chunk in chunks)
+
+
+def test_utf8_bom_and_comma(tmp_path):
+    text = 'a,b\n1,x\n2,y\n'
+    file_name = write_bytes(tmp_path / 'bom.csv', codecs.BOM_UTF8 + text.encode('utf-8'))
+    sniffed = sniff_csv(file_name)
+    assert sniffed['encoding'] == 'utf-8-sig'
+    assert sniffed['sep'] == ','
+    assert sniffed['skiprows'] == 0
+    assert sniffed['columns'] == ['a', 'b']
+
+
+def test_detect_encoding_ignores_truncated_last_line():
+    data = '名称\n值\n'.encode('utf-8') + '截断'.encode('utf-8')[:-1]
+    assert detect_encoding(data, complete=False) == 'utf-8'
+    with pytest.raises(ValueError):
+        detect_encoding(b'\xff\xfe\xff\n', complete=True)
+
+
+def test_sniff_cache_invalidated_when_file_changes(tmp_path):
+    path = tmp_path / 'data.csv'
+    write_bytes(path, b'a,b\n1,2\n')
+    assert sniff_csv(str(path))['columns'] == ['a', 'b']
+    write_bytes(path, b'a\tb\tc\n1\t2\t3\n')
+    os.utime(path, ns=(0, 0))
+    assert sniff_csv(str(path))['columns'] == ['a', 'b', 'c']
@@ -0,0 +1,108 @@
+"""export_writers 中各导出格式的测试"""
+import os
+import sys
+import json
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export_writers import SPLIT_FILES, SPLIT_SHEETS, split_ranges, write_jsonl_streaming, write_output
+
+
+def sample_columns(rows):
+    data = pd.DataFrame({
+        'a': np.arange(rows),
+        'b': pd.Series(np.where(np.arange(rows) % 3 == 0, None, '值'), dtype=object),
+    })
+    return [data['a'], data['b']]
+
+
+def test_jsonl_has_one_object_per_line_across_blocks(tmp_path):
+    file_name = str(tmp_path / 'out.jsonl')
+    rows = 45
+    write_jsonl_streaming(sample_columns(rows), ['甲', '乙'], file_name, chunk_rows=20)
+
+    with open(file_name, encoding='utf-8') as f:
+        text = f.read()
+    assert text.endswith('\n') and not text.endswith('\n\n')
+    lines = text[:-1].split('\n')
+    assert len(lines) == rows
+    records = [json.loads(line) for line in lines]
+    assert all(isinstance(record, dict) for record in records)
+    assert [record['甲'] for record in records] == list(range(rows))
+    assert records[0]['乙'] is None and records[1]['乙'] == '值'
+
+
+def test_jsonl_row_order(tmp_path):
+    file_name = str(tmp_path / 'out.jsonl')
+    order = np.arange(30)[::-1].copy()
+    write_jsonl_streaming(sample_columns(30), ['甲', '乙'], file_name, row_order=order, chunk_rows=7)
+    with open(file_name, encoding='utf-8') as f:
+        assert [json.loads(line)['甲'] for line in f] == order.tolist()
+
+
+def test_split_ranges():
+    assert split_ranges(0, 10) == [(0, 0)]
+    assert split_ranges(10, 10) == [(0, 10)]
+    assert split_ranges(25, 10) == [(0, 10), (10, 20), (20, 25)]
+
+
+def test_split_files_row_ranges_and_manifest(tmp_path):
+    file_name = str(tmp_path / 'out.csv')
+    order = np.arange(25)[::-1].copy()
+    files = write_output(sample_columns(25), ['甲', '乙'], 'csv', file_name, row_order=order,
+                         split={'mode': SPLIT_FILES, 'rows_per_part': 10})
+
+    parts = [str(tmp_path / f'out_part00{part}.csv') for part in (1, 2, 3)]
+    assert files == parts + [file_name + '.manifest.json']
+    assert not os.path.exists(file_name)
+    written = [pd.read_csv(part, encoding='utf-8-sig') for part in parts]
+    assert [len(data) for data in written] == [10, 10, 5]
+    assert all(list(data.columns) == ['甲', '乙'] for data in written)
+    assert pd.concat(written)['甲'].tolist() == order.tolist()
+
+    with open(files[-1], encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest['file'] == 'out.csv'
+    assert manifest['format'] == 'csv'
+    assert manifest['total_rows'] == 25
+    assert manifest['columns'] == ['甲', '乙']
+    assert manifest['parts'] == [
+        {'name': 'out_part001.csv', 'first_row': 1, 'last_row': 10, 'rows': 10},
+        {'name': 'out_part002.csv', 'first_row': 11, 'last_row': 20, 'rows': 10},
+        {'name': 'out_part003.csv', 'first_row': 21, 'last_row': 25, 'rows': 5},
+    ]
+
+
+def test_split_files_not_needed_writes_single_file(tmp_path):
+    file_name = str(tmp_path / 'out.csv')
+    files = write_output(sample_columns(10), ['甲', '乙'], 'csv', file_name,
+                         split={'mode': SPLIT_FILES, 'rows_per_part': 10})
+    assert files == [file_name]
+    assert not os.path.exists(file_name + '.manifest.json')
+
+
+def test_split_sheets_row_ranges_and_manifest(tmp_path):
+    from openpyxl import load_workbook
+
+    file_name = str(tmp_path / 'out.xlsx')
+    files = write_output(sample_columns(25), ['甲', '乙'], 'xlsx', file_name,
+                         split={'mode': SPLIT_SHEETS, 'rows_per_part': 12})
+    assert files == [file_name, file_name + '.manifest.json']
+
+    workbook = load_workbook(file_name, read_only=True)
+    assert workbook.sheetnames == ['Sheet1', 'Sheet2', 'Sheet3']
+    firsts = []
+    for sheet in workbook.worksheets:
+        rows = list(sheet.iter_rows(values_only=True))
+        assert rows[0] == ('甲', '乙')
+        firsts.append([row[0] for row in rows[1:]])
+    workbook.close()
+    assert firsts == [list(range(0, 12)), list(range(12, 24)), [24]]
+
+    with open(files[-1], encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert [(part['name'], part['first_row'], part['last_row']) for part in manifest['parts']] == [
+        ('Sheet1', 1, 12), ('Sheet2', 13, 24), ('Sheet3', 25, 25)]
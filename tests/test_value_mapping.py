@@ -0,0 +1,97 @@
+"""value_mapping 中包含和正则替换规则的测试
+
+    python -m pytest tests
+"""
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from value_mapping import MATCH_CONTAINS, MATCH_REGEX, compile_pattern_rules
+
+
+def test_backreference_after_other_group_rules():
+    substitute = compile_pattern_rules([
+        (MATCH_REGEX, r'(\d+)mg', r'\g<1> 毫克'),
+        (MATCH_REGEX, r'(\w)\1', '<dbl>'),
+    ])
+    assert substitute('xx') == re.sub(r'(\w)\1', '<dbl>', 'xx')
+    assert substitute('5mg') == '5 毫克'
+    assert substitute('aa 12mg') == '<dbl> 12 毫克'
+
+
+def test_duplicate_group_names():
+    substitute = compile_pattern_rules([
+        (MATCH_REGEX, r'(?P<n>\d+)kg', r'\g<n>公斤'),
+        (MATCH_REGEX, r'(?P<n>\d+)g', r'\g<n>克'),
+    ])
+    assert substitute('3kg 5g') == '3公斤 5克'
+
+
+def test_inline_flags_in_later_rule():
+    substitute = compile_pattern_rules([
+        (MATCH_CONTAINS, '阳', '+'),
+        (MATCH_REGEX, '(?i)positive', '+'),
+    ])
+    assert substitute('POSITIVE 阳性') == '+ +性'
+
+
+def test_earlier_rule_wins_at_same_position():
+    substitute = compile_pattern_rules([
+        (MATCH_CONTAINS, 'ab', '1'),
+        (MATCH_REGEX, r'(a)b', '2'),
+        (MATCH_CONTAINS, 'abc', '3'),
+    ])
+    assert substitute('abc') == '1c'
+    substitute = compile_pattern_rules([
+        (MATCH_REGEX, r'(a)b', r'[\1]'),
+        (MATCH_CONTAINS, 'ab', '1'),
+    ])
+    assert substitute('abab') == '[a][a]'
+
+
+def test_leftmost_match_wins_over_rule_order():
+    substitute = compile_pattern_rules([
+        (MATCH_REGEX, r'(c)', 'C'),
+        (MATCH_CONTAINS, 'a', 'A'),
+    ])
+    assert substitute('abc') == 'AbC'
+
+
+def test_literal_and_regex_interleaving():
+    rules = [
+        (MATCH_CONTAINS, '阴性', 'neg'),
+        (MATCH_REGEX, r'\d+', '#'),
+        (MATCH_CONTAINS, '阳性', 'pos'),
+        (MATCH_REGEX, r'(x+)y', r'\1Y'),
+        (MATCH_CONTAINS, 'x', '-'),
+    ]
+    substitute = compile_pattern_rules(rules)
+    assert substitute('阴性12阳性xxy x') == 'neg#posxxY -'
+
+
+def test_replacements_are_not_chained():
+    substitute = compile_pattern_rules([
+        (MATCH_CONTAINS, 'a', 'b'),
+        (MATCH_CONTAINS, 'b', 'c'),
+        (MATCH_REGEX, r'(c)', 'd'),
+    ])
+    assert substitute('abc') == 'bcd'
+
+
+def test_whole_match_reference_in_simple_regex():
+    substitute = compile_pattern_rules([
+        (MATCH_CONTAINS, '未', ''),
+        (MATCH_REGEX, r'\d+', r'<\g<0>>'),
+    ])
+    assert substitute('未检测 12') == '检测 <12>'
+
+
+def test_empty_matches_follow_re_sub():
+    substitute = compile_pattern_rules([
+        (MATCH_REGEX, r'(b)*', '-'),
+    ])
+    assert substitute('abc') == re.sub(r'(b)*', '-', 'abc')
+    substitute = compile_pattern_rules([(MATCH_REGEX, r'b*', '-')])
+    assert substitute('abc') == re.sub(r'b*', '-', 'abc')
@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+from value_mapping import apply_value_mapping, compose_mappings
+from column_index import ColumnIndex
+
+
+class TransformPlan:
+    """对原始数据的变换计划
+
+    原始数据保持不变。值替换、字段重命名、字段顺序和行顺序都只记录在
+    状态中，预览和导出时只对用到的列按需计算。每次修改都生成新的状态，
+    旧状态进入撤销栈，因此撤销和重做不需要复制数据。
+    """
+
+    def __init__(self, base, columns=None, display_names=None, history_limit=100):
+        self.base = base
+        self.history_limit = history_limit
+        self.state = {
+            'value_mapping': {},  # 字段 -> {原始值: 新值}，针对原始数据
+            'display_names': dict(display_names or {}),  # 字段 -> 显示名称
+            'field_order': list(base.columns) if columns is None else list(columns),
+            'row_order': None,  # 行在原始数据中的位置，None表示原始顺序
+        }
+        self.undo_stack = []
+        self.redo_stack = []
+        self._column_cache = {}  # 字段 -> (替换规则, 替换后的列)
+        self.index = ColumnIndex(base)  # 各列的编码和有效性位图
+
+    @property
+    def value_mapping(self):
+        return self.state['value_mapping']
+
+    @property
+    def display_names(self):
+        return self.state['display_names']
+
+    @property
+    def field_order(self):
+        return self.state['field_order']
+
+    @property
+    def row_order(self):
+        return self.state['row_order']
+
+    def __len__(self):
+        return len(self.base)
+
+    # ---- 修改状态 ----
+
+    def update(self, **changes):
+        """用修改后的新状态替换当前状态"""
+        self.undo_stack.append(self.state)
+        if len(self.undo_stack) > self.history_limit:
+            del self.undo_stack[0]
+        self.redo_stack.clear()
+        self.state = {**self.state, **changes}
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self):
+        if not self.undo_stack:
+            return False
+        self.redo_stack.append(self.state)
+        self.state = self.undo_stack.pop()
+        return True
+
+    def redo(self):
+        if not self.redo_stack:
+            return False
+        self.undo_stack.append(self.state)
+        self.state = self.redo_stack.pop()
+        return True
+
+    def edit_values(self, field_name, edits):
+        """在当前值的基础上追加值替换规则"""
+        value_mapping = dict(self.value_mapping)
+        value_mapping[field_name] = compose_mappings(value_mapping.get(field_name, {}), edits)
+        self.update(value_mapping=value_mapping)
+
+    def rename(self, field_name, display_name):
+        display_names = dict(self.display_names)
+        display_names[field_name] = display_name
+        self.update(display_names=display_names)
+
+    def set_field_order(self, field_order):
+        self.update(field_order=list(field_order))
+
+    def apply_config(self, config, columns):
+        """按配置设置值替换规则、显示名称和字段顺序（替换而不是叠加）"""
+        field_states = config.get('field_states', {})
+        # 对于不在配置中的字段，放在末尾
+        field_order = sorted(columns, key=lambda field: field_states.get(field, {}).get('order', 999))
+        display_names = {
+            field: state['display_name']
+            for field, state in field_states.items()
+            if state.get('display_name', field) != field
+        }
+        self.update(
+            value_mapping=dict(config.get('value_mapping', {})),
+            display_names=display_names,
+            field_order=field_order,
+        )
+
+    def sort_by_valid_count(self, fields, ascending=False, invalid_tokens=None, sort_keys=()):
+        """按指定字段中的有效元素数量排序，只记录行的排列顺序
+
+        invalid_tokens 为 {字段: 无效值集合}。sort_keys 为有效元素数量相同时
+        依次使用的 (字段, 是否升序) 排序键。所有排序键通过一次稳定的
+        lexsort完成，排序键都相同的行保持当前顺序。
+        """
+        counts = self.index.valid_counts(fields, self.value_mapping, invalid_tokens)
+        order = self.row_order
+        if order is None:
+            order = np.arange(len(counts))
+
+        # lexsort以最后一个键为主键
+        keys = [
+            self.index.sort_key(field, self.value_mapping.get(field), field_ascending)[order]
+            for field, field_ascending in reversed(list(sort_keys))
+        ]
+        keys.append(counts[order] if ascending else -counts[order])
+        self.update(row_order=order[np.lexsort(keys)])
+
+    # ---- 按需计算 ----
+
+    def add_columns(self, data):
+        """向原始数据追加新读取的列（按位置对齐）"""
+        if len(self.base.columns) == 0:
+            self.base = data.reset_index(drop=True)
+        else:
+            self.base = pd.concat([self.base, data.reset_index(drop=True)], axis=1)
+        self.index.set_base(self.base)
+
+    def display_name(self, field_name):
+        return self.display_names.get(field_name, field_name)
+
+    def column(self, field_name):
+        """返回应用值替换后的列，行顺序与原始数据一致"""
+        mapping = self.value_mapping.get(field_name)
+        if not mapping:
+            return self.base[field_name]
+        cached = self._column_cache.get(field_name)
+        if cached is not None and cached[0] is mapping:
+            return cached[1]
+        column = apply_value_mapping(self.base[field_name], mapping)
+        self._column_cache[field_name] = (mapping, column)
+        return column
+
+    def value_counts(self, field_name):
+        """返回应用值替换后每个取值的出现次数，从索引中汇总，不扫描数据"""
+        return self.index.value_counts(field_name, self.value_mapping.get(field_name))
+
+    def columns(self, fields):
+        return [self.column(field) for field in fields]
+
+    def materialize(self, fields):
+        """按当前行顺序和显示名称生成数据框"""
+        data = pd.concat(self.columns(fields), axis=1, keys=range(len(fields)))
+        if self.row_order is not None:
+            data = data.take(self.row_order)
+        data.columns = [self.display_name(field) for field in fields]
+        return data.reset_index(drop=True)
@@ -0,0 +1,188 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# 替换规则文件中"匹配方式"列的取值，未填写时为精确匹配
+MATCH_EXACT = '精确'
+MATCH_CONTAINS = '包含'
+MATCH_REGEX = '正则'
+
+
+def map_unique_values(uniques, mapping):
+    """对唯一值逐个查找替换规则，返回替换后的唯一值数组
+
+    替换规则的键是值的字符串形式（与编辑界面中显示的一致）。
+    """
+    new_values = np.empty(len(uniques), dtype=object)
+    changed = False
+    for i, value in enumerate(uniques):
+        key = value if isinstance(value, str) else str(value)
+        if key in mapping:
+            new_values[i] = mapping[key]
+            changed = True
+        else:
+            new_values[i] = value
+    return new_values, changed
+
+
+def apply_value_mapping(series, mapping):
+    """一次性对整列应用值替换规则
+
+    先将列分解为唯一值和编码，只在唯一值上查找替换，再通过编码
+    还原为整列。每个值只替换一次，规则之间不会链式生效
+    （a→b 和 b→c 同时存在时，a 变为 b 而不是 c）。
+    """
+    if not mapping:
+        return series
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return _apply_categorical_mapping(series, mapping)
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    new_uniques, changed = map_unique_values(uniques, mapping)
+    if not changed:
+        return series
+
+    new_data = pd.Series(new_uniques.take(codes), index=series.index, name=series.name)
+    return new_data.infer_objects()
+
+
+def _apply_categorical_mapping(series, mapping):
+    """category类型的列只需替换类别，再重新映射编码"""
+    categories = series.cat.categories
+    codes = series.cat.codes.to_numpy()
+    new_categories, changed = map_unique_values(categories, mapping)
+
+    # 缺失值的编码为-1，有针对缺失值的规则时为其增加一个类别
+    nan_key = str(np.nan)
+    if nan_key in mapping and (codes < 0).any():
+        new_categories = np.append(new_categories, np.array([mapping[nan_key]], dtype=object))
+        codes = np.where(codes < 0, len(categories), codes)
+        changed = True
+    if not changed:
+        return series
+
+    uniques = pd.unique(new_categories)
+    recode = pd.Index(uniques).get_indexer(new_categories)
+    new_codes = np.where(codes >= 0, recode[codes], -1)
+    new_data = pd.Categorical.from_codes(new_codes, categories=uniques)
+    return pd.Series(new_data, index=series.index, name=series.name)
+
+
+def compose_mappings(first, second):
+    """合并两组替换规则，效果等同于先应用 first 再应用 second"""
+    combined = {old_val: second.get(new_val, new_val) for old_val, new_val in first.items()}
+    for old_val, new_val in second.items():
+        combined.setdefault(old_val, new_val)
+    return combined
+
+
+_DEFAULT_FLAGS = re.compile('').flags
+
+
+def _is_simple_regex(compiled):
+    """没有分组（也就没有分组引用）和全局内联标志的正则，可以放进组合表达式"""
+    return compiled.groups == 0 and compiled.flags == _DEFAULT_FLAGS
+
+
+def compile_pattern_rules(rules):
+    """将 (匹配方式, 模式, 新值) 规则编译为一个替换函数
+
+    返回 substitute(text)，对文本扫描一次即完成所有规则的替换：包含规则
+    把匹配的子串替换为新值，正则规则的新值可以使用 \\g<1> 等分组引用。
+    每次取最靠前的匹配，同一位置有多个规则匹配时，排在前面的规则优先；
+    替换后的文本不会再被其他规则匹配。
+
+    包含规则和没有分组、内联标志的正则规则合并为一个组合表达式，每个
+    规则（相邻的包含规则合为一项）放在一个分组中，由匹配的分组确定规则。
+    带分组的正则规则合并后分组编号会改变、同名分组会冲突，(?i) 等
+    全局标志也只能放在表达式开头，这些规则单独搜索，再与组合表达式的
+    匹配按位置和规则顺序合并。
+    """
+    compiled_rules = []  # (正则表达式, 新值, 包含规则的子串)
+    for kind, pattern, replacement in rules:
+        if not pattern:
+            continue
+        if kind == MATCH_REGEX:
+            compiled_rules.append((re.compile(pattern), replacement, None))
+        elif kind == MATCH_CONTAINS:
+            compiled_rules.append((re.compile(re.escape(pattern)), replacement, pattern))
+        else:
+            raise ValueError(f'未知的匹配方式: {kind}')
+    if not compiled_rules:
+        return lambda text: text
+
+    # 组合表达式的每个分组对应一个规则序号，或相邻包含规则的 {子串: 规则序号}；
+    # 合并相邻的包含规则，正则引擎可以提取公共前缀和开头字符一起预筛选
+    alternatives = []
+    group_rules = [None]
+    separate = []  # 单独搜索的规则序号
+    for i, (compiled, _, literal) in enumerate(compiled_rules):
+        if literal is not None:
+            if not isinstance(group_rules[-1], dict):
+                alternatives.append([])
+                group_rules.append({})
+            alternatives[-1].append(compiled.pattern)
+            group_rules[-1].setdefault(literal, i)
+        elif _is_simple_regex(compiled):
+            alternatives.append([compiled.pattern])
+            group_rules.append(i)
+        else:
+            separate.append(i)
+    combined = None
+    if alternatives:
+        combined = re.compile('|'.join('(' + '|'.join(patterns) + ')' for patterns in alternatives))
+
+    def combined_rule(match):
+        rule = group_rules[match.lastindex]
+        if isinstance(rule, dict):
+            return rule[match.group()]
+        return rule
+
+    def replacement_for(i, match):
+        compiled, replacement, literal = compiled_rules[i]
+        if literal is not None or '\\' not in replacement:
+            return replacement
+        if match.re is not compiled:
+            # 组合表达式中的匹配，单独匹配一次以展开 \g<0> 等引用
+            match = compiled.match(match.string, match.start())
+        return match.expand(replacement)
+
+    if not separate:
+        return lambda text: combined.sub(
+            lambda match: replacement_for(combined_rule(match), match), text)
+
+    sources = [(compiled_rules[i][0], i) for i in separate]
+    if combined is not None:
+        sources.append((combined, None))
+
+    def substitute(text):
+        pieces = []
+        pos = 0
+        found = {}  # 每个表达式从当前位置之后的下一个匹配，没有时为None
+        while pos <= len(text):
+            best = None
+            for compiled, rule in sources:
+                match = found.get(compiled, False)
+                if match is False or (match is not None and match.start() < pos):
+                    match = found[compiled] = compiled.search(text, pos)
+                if match is None:
+                    continue
+                key = (match.start(), combined_rule(match) if rule is None else rule)
+                if best is None or key < best[0]:
+                    best = (key, match)
+            if best is None:
+                break
+            (start, i), match = best
+            pieces.append(text[pos:start])
+            pieces.append(replacement_for(i, match))
+            pos = match.end()
+            if match.end() == start:
+                # 空匹配之后前进一个字符，避免在同一位置重复匹配
+                pieces.append(text[start:start + 1])
+                pos = start + 1
+        pieces.append(text[pos:])
+        return ''.join(pieces)
+
+    return substitute